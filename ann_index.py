@@ -0,0 +1,257 @@
+import numpy as np
+import time
+from sklearn.decomposition import TruncatedSVD
+from typing import Callable, Optional, Tuple
+from similarity import top_k_rows
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbor index.
+
+    Items are embedded with TruncatedSVD, L2-normalized and clustered with
+    spherical k-means into ``n_lists`` inverted lists. A query only scans the
+    ``n_probe`` lists whose centroids are closest to it and re-ranks those
+    candidates with exact dot products on the original matrix, so query time
+    grows with ``n_probe / n_lists`` of the catalog and recall is tuned with
+    ``n_probe``.
+    """
+
+    def __init__(
+        self,
+        n_components: int = 64,
+        n_lists: Optional[int] = None,
+        n_probe: int = 16,
+        n_iterations: int = 10,
+        sample_size: int = 100000,
+        random_state: int = 42
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            n_components (int): Embedding dimensions from TruncatedSVD
+            n_lists (int): Number of inverted lists, None for 4 * sqrt(n_items)
+            n_probe (int): Number of lists scanned per query
+            n_iterations (int): k-means iterations
+            sample_size (int): Number of items used to train the centroids
+            random_state (int): Seed for the SVD and k-means initialization
+        """
+        self.n_components = n_components
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iterations = n_iterations
+        self.sample_size = sample_size
+        self.random_state = random_state
+
+        self.matrix = None
+        self.components: Optional[np.ndarray] = None
+        self.embeddings: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+        self.list_indptr: Optional[np.ndarray] = None
+        self.list_rows: Optional[np.ndarray] = None
+
+    def embed(self, matrix) -> np.ndarray:
+        """
+        Project rows into the normalized embedding space.
+
+        Args:
+            matrix: Sparse item x feature matrix
+
+        Returns:
+            np.ndarray: float32 L2-normalized embeddings
+        """
+        embeddings = np.asarray(matrix @ self.components.T, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+
+    def _assign(self, embeddings: np.ndarray, block_size: int = 65536) -> np.ndarray:
+        """
+        Assign embeddings to their nearest centroid, block by block.
+        """
+        labels = np.empty(len(embeddings), dtype=np.int32)
+        for start in range(0, len(embeddings), block_size):
+            block = embeddings[start:start + block_size]
+            labels[start:start + block_size] = np.argmax(block @ self.centroids.T, axis=1)
+        return labels
+
+    def build(self, matrix) -> 'IVFIndex':
+        """
+        Fit the embedding and the coarse quantizer, and fill the inverted lists.
+
+        Args:
+            matrix: Sparse item x feature matrix with L2-normalized rows
+
+        Returns:
+            IVFIndex: The built index
+        """
+        rng = np.random.default_rng(self.random_state)
+        n_items = matrix.shape[0]
+        n_components = max(1, min(self.n_components, matrix.shape[1] - 1, n_items - 1))
+
+        svd = TruncatedSVD(n_components=n_components, random_state=self.random_state)
+        svd.fit(matrix)
+        self.matrix = matrix
+        self.components = svd.components_.astype(np.float32)
+        self.embeddings = self.embed(matrix)
+
+        # Spherical k-means on a sample of the items
+        n_lists = self.n_lists or int(4 * np.sqrt(n_items))
+        n_lists = max(1, min(n_lists, n_items))
+        sample = self.embeddings
+        if n_items > self.sample_size:
+            sample = self.embeddings[rng.choice(n_items, self.sample_size, replace=False)]
+        self.centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+
+        for _ in range(self.n_iterations):
+            labels = self._assign(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Keep the previous centroid for empty clusters
+            filled = norms[:, 0] > 0
+            self.centroids[filled] = sums[filled] / norms[filled]
+
+        # Inverted lists as CSR-style arrays
+        labels = self._assign(self.embeddings)
+        self.list_rows = np.argsort(labels, kind='stable').astype(np.int32)
+        self.list_indptr = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_lists), out=self.list_indptr[1:])
+        return self
+
+    def add(self, matrix):
+        """
+        Index rows appended to the end of the matrix.
+
+        New rows are embedded with the fitted components and assigned to the
+        existing lists; the centroids are not retrained.
+
+        Args:
+            matrix: The item x feature matrix including the new rows
+        """
+        first_row = len(self.embeddings)
+        new_embeddings = self.embed(matrix[first_row:])
+        labels = self._assign(new_embeddings)
+
+        self.matrix = matrix
+        self.embeddings = np.vstack([self.embeddings, new_embeddings])
+
+        # Insert each new row at the end of its list
+        order = np.argsort(labels, kind='stable')
+        self.list_rows = np.insert(
+            self.list_rows, self.list_indptr[labels[order] + 1], (first_row + order).astype(np.int32)
+        )
+        self.list_indptr = self.list_indptr.copy()
+        self.list_indptr[1:] += np.cumsum(np.bincount(labels, minlength=len(self.centroids)))
+
+    def _candidates(self, row: int, n_probe: int) -> np.ndarray:
+        """
+        Collect the items of the lists closest to a row.
+        """
+        closeness = self.centroids @ self.embeddings[row]
+        if n_probe < len(closeness):
+            lists = np.argpartition(-closeness, n_probe - 1)[:n_probe]
+        else:
+            lists = np.arange(len(closeness))
+        return np.concatenate([
+            self.list_rows[self.list_indptr[i]:self.list_indptr[i + 1]] for i in lists
+        ])
+
+    def search(
+        self,
+        row: int,
+        k: int,
+        n_probe: Optional[int] = None,
+        eligible: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the approximate top-K neighbors of an item.
+
+        If fewer than K probed candidates pass ``eligible``, the number of
+        probed lists is doubled until K pass or every list has been scanned.
+
+        Args:
+            row (int): Row of the query item
+            k (int): Number of neighbors to return
+            n_probe (int): Number of lists to scan, defaults to the index setting
+            eligible (np.ndarray): Optional boolean mask of allowed rows
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (rows, exact similarity scores) ordered
+            by descending score, excluding the query item
+        """
+        n_probe = n_probe or self.n_probe
+        query = self.matrix[row]
+
+        while True:
+            candidates = self._candidates(row, n_probe)
+            candidates = candidates[candidates != row]
+            if eligible is not None:
+                candidates = candidates[eligible[candidates]]
+
+            if len(candidates) >= k or n_probe >= len(self.centroids):
+                break
+            n_probe *= 2
+
+        if len(candidates) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        # Re-rank the candidates with exact similarities
+        scores = np.asarray((self.matrix[candidates] @ query.T).todense()).ravel().astype(np.float32)
+        top, top_scores = top_k_rows(scores[np.newaxis, :], k)
+        keep = top_scores[0] > 0
+        return candidates[top[0][keep]], top_scores[0][keep]
+
+    def recall(
+        self,
+        exact_search: Callable[[int, int], Tuple[np.ndarray, np.ndarray]],
+        k: int = 10,
+        n_queries: int = 200,
+        n_probe: Optional[int] = None
+    ) -> dict:
+        """
+        Measure recall@K and latency against an exact search.
+
+        Items tied with the K-th exact score count as hits, since many movies
+        share identical title/genre vectors and the exact top-K is then only
+        one of several equally correct answers.
+
+        Args:
+            exact_search (Callable): exact_search(row, k) -> (top-K rows, scores)
+            k (int): Number of neighbors compared per query
+            n_queries (int): Number of random query items
+            n_probe (int): Number of lists to scan, defaults to the index setting
+
+        Returns:
+            dict: recall, n_probe, mean ANN and exact query time in milliseconds
+        """
+        rng = np.random.default_rng(self.random_state)
+        rows = rng.choice(self.matrix.shape[0], min(n_queries, self.matrix.shape[0]), replace=False)
+
+        hits = 0
+        total = 0
+        ann_time = 0.0
+        exact_time = 0.0
+        for row in rows:
+            start = time.perf_counter()
+            _, approximate_scores = self.search(row, k, n_probe)
+            ann_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            _, exact_scores = exact_search(row, k)
+            exact_time += time.perf_counter() - start
+
+            if len(exact_scores):
+                hits += min(
+                    int((approximate_scores >= exact_scores[-1] - 1e-6).sum()),
+                    len(exact_scores)
+                )
+            total += len(exact_scores)
+
+        return {
+            'recall': hits / total if total else 1.0,
+            'n_probe': n_probe or self.n_probe,
+            'n_lists': len(self.centroids),
+            'ann_ms': ann_time / len(rows) * 1000,
+            'exact_ms': exact_time / len(rows) * 1000
+        }
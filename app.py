@@ -9,6 +9,7 @@ import requests
 import json
 from PIL import Image
 import io
+import os
 
 # Page configuration
 st.set_page_config(
@@ -287,11 +288,11 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
+@st.cache_resource
 def load_data():
-    """Load and cache the movie data."""
+    """Load the movie data once and share it (read-only) across sessions."""
     try:
-        analyzer = MovieDataAnalyzer()
+        analyzer = MovieDataAnalyzer(compact=True, cache=True)
         movies_df, ratings_df, movies_with_ratings = analyzer.load_data()
         
         # Check if data was loaded successfully
@@ -306,9 +307,17 @@ def load_data():
         return None, None, None, None
 
 @st.cache_resource
-def create_recommender(movies_df, ratings_df):
-    """Create and cache the movie recommender."""
-    return MovieRecommender(movies_df, ratings_df)
+def create_recommender(movies_path, ratings_path, _dataset=None):
+    """Load the saved movie recommender, rebuilding it when the data changed.
+    
+    The recommender shares the analyzer's already loaded dataset instead of
+    reading and aggregating the CSV files a second time.
+    """
+    model_dir = os.path.join(os.path.dirname(os.path.abspath(movies_path)), 'recommender_model')
+    return MovieRecommender.load(
+        model_dir, movies_path, ratings_path, dataset=_dataset,
+        on_rebuild=lambda reason: print(f"🔄 Rebuilding recommender model ({reason})")
+    )
 
 def get_movie_poster(movie_title, api_key=None):
     """Get movie poster from TMDB API with better error handling."""
@@ -435,7 +444,7 @@ def main():
         return
     
     # Create recommender
-    recommender = create_recommender(movies_df, ratings_df)
+    recommender = create_recommender(analyzer.movies_path, analyzer.ratings_path, analyzer.dataset)
     stats = recommender.get_dataset_stats()
     
     # Sidebar
@@ -0,0 +1,426 @@
+import argparse
+import json
+import numpy as np
+import os
+import pandas as pd
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, List, Optional, Tuple
+from generate_synthetic_data import GENRES, generate_dataset
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Synthetic dataset sizes: name -> (movies, ratings)
+SIZES = {
+    '10k': (10_000, 1_000_000),
+    '100k': (100_000, 10_000_000),
+    '1m': (1_000_000, 100_000_000)
+}
+
+# Benchmark groups, each run in a fresh process
+GROUPS = {
+    'recommender': (
+        'recommender_init', 'get_recommendations', 'search_movies',
+        'get_movies_by_genre', 'get_movies_by_rating_range'
+    ),
+    'analyzer': ('load_data', 'load_data_compact', 'load_data_cached', 'get_basic_insights')
+}
+
+# Groups whose cases share no setup and each run in their own process, so
+# memory freed by one load is not reused by the next
+ISOLATED_GROUPS = ('analyzer',)
+
+# Slowdown (in time or peak RSS) at which compare mode reports a regression
+DEFAULT_THRESHOLD = 0.2
+
+def _proc_status_mb(field: str) -> Optional[float]:
+    """
+    Read a memory field (e.g. VmRSS) of /proc/self/status in megabytes, None where unavailable.
+    """
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def current_rss_mb() -> Optional[float]:
+    """
+    Resident set size of this process in megabytes, None where unsupported.
+    """
+    return _proc_status_mb('VmRSS')
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process in megabytes, None where unsupported.
+
+    The peak is the one since the last reset_peak_rss() where the kernel
+    supports resetting it, otherwise since the process started.
+    """
+    peak = _proc_status_mb('VmHWM')
+    if peak is not None or resource is None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def reset_peak_rss() -> bool:
+    """
+    Reset the peak RSS of this process to its current RSS (Linux only).
+
+    Returns:
+        bool: Whether the peak was reset
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _start_case() -> Optional[float]:
+    """
+    Start measuring the memory of one benchmark case.
+
+    Returns:
+        float: RSS the case starts from. Where the peak cannot be reset this
+        is the peak so far, so only new peaks count towards the case
+    """
+    if reset_peak_rss():
+        return current_rss_mb()
+    return peak_rss_mb()
+
+def _case_memory(baseline: Optional[float]) -> dict:
+    """
+    Peak RSS of a case started with _start_case() and its increase over the baseline.
+    """
+    peak = peak_rss_mb()
+    if peak is None or baseline is None:
+        return {'peak_rss_mb': peak, 'rss_increase_mb': None}
+    return {'peak_rss_mb': peak, 'rss_increase_mb': max(peak - baseline, 0.0)}
+
+def parse_size(size: str) -> Tuple[int, int]:
+    """
+    Resolve a size preset name or a MOVIES:RATINGS pair.
+    """
+    if size in SIZES:
+        return SIZES[size]
+    try:
+        n_movies, n_ratings = size.split(':')
+        return int(n_movies), int(n_ratings)
+    except ValueError:
+        raise ValueError(f"Unknown size '{size}', expected one of {list(SIZES)} or MOVIES:RATINGS")
+
+def write_synthetic_dataset(path: str, n_movies: int, n_ratings: int, seed: int = 42) -> Tuple[str, str]:
+    """
+    Generate (or reuse) a MovieLens-shaped dataset of the given size.
+
+    Args:
+        path (str): Directory to write to
+        n_movies (int): Number of movies
+        n_ratings (int): Target number of ratings
+        seed (int): Random seed
+
+    Returns:
+        Tuple[str, str]: Paths of movies.csv and ratings.csv
+    """
+    marker = os.path.join(path, 'dataset.json')
+    spec = {'n_movies': n_movies, 'n_ratings': n_ratings, 'seed': seed}
+
+    if os.path.exists(marker):
+        with open(marker, encoding='utf-8') as f:
+            if json.load(f) == spec:
+                return os.path.join(path, 'movies.csv'), os.path.join(path, 'ratings.csv')
+
+    paths = generate_dataset(path, n_movies, n_ratings, seed=seed)['paths']
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(spec, f)
+    return paths['movies'], paths['ratings']
+
+def _time_calls(function: Callable, arguments: list) -> dict:
+    """
+    Call a function once per argument tuple and summarize the wall times.
+    """
+    times = np.zeros(len(arguments))
+    for i, args in enumerate(arguments):
+        start = time.perf_counter()
+        function(*args)
+        times[i] = time.perf_counter() - start
+
+    return {
+        'wall_s': float(times.sum()),
+        'calls': len(arguments),
+        'mean_ms': float(times.mean() * 1000),
+        'p50_ms': float(np.percentile(times, 50) * 1000),
+        'p95_ms': float(np.percentile(times, 95) * 1000)
+    }
+
+def _run_recommender_group(movies_path: str, ratings_path: str, repeat: int, seed: int, cases: List[str]) -> dict:
+    from movie_recommender import MovieRecommender
+
+    movies_df = pd.read_csv(movies_path)
+    ratings_df = pd.read_csv(ratings_path)
+    results = {}
+
+    # Every query case needs the recommender, so it is built (and measured) once
+    baseline = _start_case()
+    start = time.perf_counter()
+    recommender = MovieRecommender(movies_df, ratings_df)
+    if 'recommender_init' in cases:
+        results['recommender_init'] = {'wall_s': time.perf_counter() - start, 'calls': 1, **_case_memory(baseline)}
+
+    # Query arguments drawn from the catalog itself
+    rng = np.random.default_rng(seed)
+    clean_titles = recommender.movies_with_ratings['title_clean'].to_numpy()
+    picks = rng.integers(0, len(clean_titles), repeat)
+    words = [title.split()[0] for title in clean_titles[picks] if title]
+    lows = rng.uniform(0.5, 4.0, repeat)
+
+    queries = {
+        'get_recommendations': (recommender.get_recommendations, [(title, 10) for title in clean_titles[picks]]),
+        'search_movies': (recommender.search_movies, [(word, 10) for word in words]),
+        'get_movies_by_genre': (recommender.get_movies_by_genre, [(GENRES[i % len(GENRES)], 20) for i in range(repeat)]),
+        'get_movies_by_rating_range': (recommender.get_movies_by_rating_range, [(low, low + 1.0) for low in lows])
+    }
+    for name, (function, arguments) in queries.items():
+        if name in cases:
+            baseline = _start_case()
+            results[name] = {**_time_calls(function, arguments), **_case_memory(baseline)}
+
+    return results
+
+def _run_analyzer_group(movies_path: str, ratings_path: str, repeat: int, seed: int, cases: List[str]) -> dict:
+    from data_analysis import MovieDataAnalyzer
+
+    results = {}
+    loads = {
+        'load_data': {},
+        'load_data_compact': {'compact': True},
+        'load_data_cached': {'compact': True, 'cache': True}
+    }
+    for name, options in loads.items():
+        if name not in cases:
+            continue
+        if name == 'load_data_cached':
+            # Warm start: the first load builds the column cache, the second maps it
+            MovieDataAnalyzer(movies_path, ratings_path, **options).load_data()
+
+        analyzer = MovieDataAnalyzer(movies_path, ratings_path, **options)
+        baseline = _start_case()
+        start = time.perf_counter()
+        analyzer.load_data()
+        results[name] = {
+            'wall_s': time.perf_counter() - start, 'calls': 1, **_case_memory(baseline),
+            'frames_mb': analyzer.load_report['movies_mb'] + analyzer.load_report['ratings_mb']
+        }
+        del analyzer
+
+    if 'get_basic_insights' in cases:
+        analyzer = MovieDataAnalyzer(movies_path, ratings_path)
+        analyzer.load_data()
+        baseline = _start_case()
+        results['get_basic_insights'] = {
+            **_time_calls(analyzer.get_basic_insights, [()] * repeat),
+            **_case_memory(baseline)
+        }
+    return results
+
+def _run_group_in_subprocess(
+    group: str,
+    movies_path: str,
+    ratings_path: str,
+    repeat: int,
+    seed: int,
+    timeout: Optional[float],
+    cases: Optional[List[str]] = None
+) -> dict:
+    """
+    Run benchmark cases of one group in a fresh interpreter and collect its JSON result.
+    """
+    cases = list(cases or GROUPS[group])
+    command = [
+        sys.executable, os.path.abspath(__file__), '_group', group,
+        '--movies', movies_path, '--ratings', ratings_path,
+        '--repeat', str(repeat), '--seed', str(seed), '--cases', *cases
+    ]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {name: {'error': f'timeout after {timeout}s'} for name in cases}
+
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else f'exit code {completed.returncode}'
+        return {name: {'error': error} for name in cases}
+
+    # The result is the last stdout line; the methods may print progress before it
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def run(
+    sizes: List[str],
+    groups: List[str],
+    data_dir: str,
+    repeat: int = 100,
+    seed: int = 42,
+    timeout: Optional[float] = None
+) -> dict:
+    """
+    Run the benchmark groups on every synthetic dataset size.
+
+    Args:
+        sizes (List[str]): Size presets or MOVIES:RATINGS pairs
+        groups (List[str]): Benchmark groups to run (keys of GROUPS)
+        data_dir (str): Directory holding the generated datasets
+        repeat (int): Number of calls per query benchmark
+        seed (int): Random seed of the datasets and query arguments
+        timeout (float): Seconds after which a group is abandoned
+
+    Returns:
+        dict: Environment information and results[size][benchmark]
+    """
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__
+        },
+        'config': {'repeat': repeat, 'seed': seed},
+        'results': {}
+    }
+
+    for size in sizes:
+        n_movies, n_ratings = parse_size(size)
+        print(f"🔄 Generating {n_movies} movies / {n_ratings} ratings...")
+        movies_path, ratings_path = write_synthetic_dataset(
+            os.path.join(data_dir, f'{n_movies}_{n_ratings}_{seed}'), n_movies, n_ratings, seed
+        )
+
+        results = {}
+        for group in groups:
+            print(f"🔄 Running '{group}' benchmarks on {size}...")
+            runs = [[name] for name in GROUPS[group]] if group in ISOLATED_GROUPS else [GROUPS[group]]
+            for cases in runs:
+                results.update(_run_group_in_subprocess(group, movies_path, ratings_path, repeat, seed, timeout, cases))
+        report['results'][size] = {'n_movies': n_movies, 'n_ratings': n_ratings, 'benchmarks': results}
+
+    return report
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """
+    Find benchmarks that got slower or use more memory than the baseline.
+
+    Args:
+        baseline (dict): Report written by a previous run
+        current (dict): Report of the run under test
+        threshold (float): Relative increase reported as a regression
+
+    Returns:
+        List[dict]: One entry per regressed (size, benchmark, metric)
+    """
+    regressions = []
+    for size, entry in current['results'].items():
+        base_entry = baseline['results'].get(size)
+        if base_entry is None:
+            continue
+
+        for name, result in entry['benchmarks'].items():
+            base_result = base_entry['benchmarks'].get(name, {})
+            if 'error' in result and 'error' not in base_result:
+                regressions.append({'size': size, 'benchmark': name, 'metric': 'error', 'current': result['error']})
+                continue
+
+            for metric in ('wall_s', 'peak_rss_mb'):
+                old, new = base_result.get(metric), result.get(metric)
+                if old and new is not None and new > old * (1 + threshold):
+                    regressions.append({
+                        'size': size,
+                        'benchmark': name,
+                        'metric': metric,
+                        'baseline': old,
+                        'current': new,
+                        'change': new / old - 1
+                    })
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MovieRecommender and MovieDataAnalyzer on synthetic datasets.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Run the benchmarks and write a JSON report")
+    run_parser.add_argument('--sizes', nargs='+', default=['10k'], help=f"Size presets {list(SIZES)} or MOVIES:RATINGS pairs")
+    run_parser.add_argument('--groups', nargs='+', default=list(GROUPS), choices=list(GROUPS), help="Benchmark groups to run")
+    run_parser.add_argument('--data-dir', default=os.path.join('data', 'benchmark'), help="Where the synthetic datasets are written")
+    run_parser.add_argument('--repeat', type=int, default=100, help="Calls per query benchmark")
+    run_parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    run_parser.add_argument('--timeout', type=float, help="Seconds after which a benchmark group is abandoned")
+    run_parser.add_argument('--output', default='benchmark_results.json', help="JSON report to write")
+
+    compare_parser = subparsers.add_parser('compare', help="Flag regressions against a baseline report")
+    compare_parser.add_argument('baseline', help="Baseline JSON report")
+    compare_parser.add_argument('current', help="JSON report to check")
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Relative increase treated as a regression")
+
+    group_parser = subparsers.add_parser('_group')
+    group_parser.add_argument('group', choices=list(GROUPS))
+    group_parser.add_argument('--movies', required=True)
+    group_parser.add_argument('--ratings', required=True)
+    group_parser.add_argument('--repeat', type=int, default=100)
+    group_parser.add_argument('--seed', type=int, default=42)
+    group_parser.add_argument('--cases', nargs='+')
+
+    args = parser.parse_args()
+
+    if args.command == '_group':
+        runner = _run_recommender_group if args.group == 'recommender' else _run_analyzer_group
+        print(json.dumps(runner(args.movies, args.ratings, args.repeat, args.seed, args.cases or list(GROUPS[args.group]))))
+        return
+
+    if args.command == 'run':
+        report = run(args.sizes, args.groups, args.data_dir, args.repeat, args.seed, args.timeout)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+        for size, entry in report['results'].items():
+            print(f"\n{size}: {entry['n_movies']} movies, {entry['n_ratings']} ratings")
+            for name, result in entry['benchmarks'].items():
+                if 'error' in result:
+                    print(f"   ❌ {name}: {result['error']}")
+                else:
+                    print(
+                        f"   {name}: {result['wall_s']:.3f}s, peak RSS {result['peak_rss_mb'] or 0:.0f} MB "
+                        f"(+{result.get('rss_increase_mb') or 0:.0f} MB)"
+                    )
+        print(f"✅ Report written to {args.output}")
+        return
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+
+    regressions = compare(baseline, current, args.threshold)
+    if not regressions:
+        print(f"✅ No regressions above {args.threshold:.0%}")
+        return
+
+    for regression in regressions:
+        if regression['metric'] == 'error':
+            print(f"❌ {regression['size']} {regression['benchmark']}: now fails ({regression['current']})")
+        else:
+            print(
+                f"⚠️ {regression['size']} {regression['benchmark']} {regression['metric']}: "
+                f"{regression['baseline']:.3f} -> {regression['current']:.3f} ({regression['change']:+.0%})"
+            )
+    sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+import numpy as np
+import os
+import pandas as pd
+import scipy.sparse as sp
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from similarity import NeighborIndex, build_neighbor_index, top_k_rows
+from user_history import UserHistoryIndex
+
+class ItemItemCF:
+    """
+    Item-item collaborative filtering on mean-centered ratings.
+
+    Ratings are centered by each user's mean (adjusted cosine), arranged as an
+    item x user CSR matrix aligned with the catalog rows, and only the top-K
+    most similar items per item are kept.
+    """
+
+    def __init__(
+        self,
+        n_neighbors: int = 50,
+        memory_budget_mb: float = 256,
+        n_jobs: Optional[int] = None
+    ):
+        """
+        Initialize the engine.
+
+        Args:
+            n_neighbors (int): Number of neighbors kept per item
+            memory_budget_mb (float): Memory budget for the dense similarity blocks
+            n_jobs (int): Number of worker threads, None for one per CPU
+        """
+        self.n_neighbors = n_neighbors
+        self.memory_budget_mb = memory_budget_mb
+        self.n_jobs = n_jobs
+        self.item_matrix = None
+        self.neighbor_index: Optional[NeighborIndex] = None
+
+    def fit(self, user_history: UserHistoryIndex) -> 'ItemItemCF':
+        """
+        Build the item x user matrix and the item neighbor index.
+
+        Args:
+            user_history (UserHistoryIndex): Rating histories aligned with the catalog rows
+
+        Returns:
+            ItemItemCF: The fitted engine
+        """
+        # Center every rating by its user's mean
+        ratings = user_history.ratings.astype(np.float64)
+        counts = np.diff(user_history.indptr)
+        owners = user_history.owners()
+        user_sums = np.bincount(owners, weights=ratings, minlength=user_history.n_users)
+        user_means = user_sums / np.maximum(counts, 1)
+        centered = (ratings - user_means[owners]).astype(np.float32)
+
+        matrix = user_history.user_matrix(centered).T.tocsr()
+
+        # L2-normalize item rows so the dot product is the cosine similarity
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self.item_matrix = sp.diags((1.0 / norms).astype(np.float32)) @ matrix
+        self.item_matrix = self.item_matrix.tocsr()
+
+        self.neighbor_index = build_neighbor_index(
+            self.item_matrix,
+            k=self.n_neighbors,
+            memory_budget_mb=self.memory_budget_mb,
+            n_jobs=self.n_jobs
+        )
+        return self
+
+    def similarity_row(self, row: int) -> np.ndarray:
+        """
+        Compute the exact similarity of one item against every item.
+
+        Args:
+            row (int): Catalog row of the item
+
+        Returns:
+            np.ndarray: float32 similarity scores for every item
+        """
+        scores = self.item_matrix[row] @ self.item_matrix.T
+        return scores.toarray().ravel().astype(np.float32)
+
+class MatrixFactorization:
+    """
+    Latent-factor rating model trained with alternating least squares (ALS).
+
+    Ratings are modelled as ``global_mean + user_factors[u] . item_factors[i]``.
+    Each half-step solves one small ridge regression per user (or item); the
+    normal equations of a batch of users are assembled with batched matrix
+    products over their zero-padded rated items and solved in one call, with
+    batches spread over a thread pool. Only
+    sparse rating matrices and (users + items) x n_factors arrays are held.
+    """
+
+    def __init__(
+        self,
+        n_factors: int = 32,
+        regularization: float = 0.1,
+        n_iterations: int = 20,
+        validation_fraction: float = 0.05,
+        patience: int = 2,
+        tol: float = 1e-4,
+        chunk_memory_mb: float = 64,
+        n_jobs: Optional[int] = None,
+        random_state: int = 42
+    ):
+        """
+        Initialize the model.
+
+        Args:
+            n_factors (int): Number of latent factors
+            regularization (float): Ridge penalty, scaled by each row's rating count
+            n_iterations (int): Maximum number of ALS iterations
+            validation_fraction (float): Share of ratings held out for early stopping
+            patience (int): Iterations without validation improvement before stopping
+            tol (float): Minimum validation RMSE improvement that counts
+            chunk_memory_mb (float): Memory budget for one chunk of normal equations
+            n_jobs (int): Number of worker threads, None for one per CPU
+            random_state (int): Seed for the initialization and validation split
+        """
+        self.n_factors = n_factors
+        self.regularization = regularization
+        self.n_iterations = n_iterations
+        self.validation_fraction = validation_fraction
+        self.patience = patience
+        self.tol = tol
+        self.chunk_memory_mb = chunk_memory_mb
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+        self.global_mean = 0.0
+        self.rating_range = (0.5, 5.0)
+        self.user_index: Optional[pd.Index] = None
+        self.movie_index: Optional[pd.Index] = None
+        self.user_factors: Optional[np.ndarray] = None
+        self.item_factors: Optional[np.ndarray] = None
+        self.user_items = None
+        self.item_counts: Optional[np.ndarray] = None
+        self.history: List[dict] = []
+
+    def _tasks(self, indptr: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+        """
+        Group rows into padded batches whose normal equations fit the budget.
+        
+        Rows are bucketed by rating count rounded up to a power of two, so the
+        padding wastes at most half of every batch.
+        
+        Returns:
+            List[Tuple[int, np.ndarray]]: (padded length, rows) per batch
+        """
+        counts = np.diff(indptr)
+        rows = np.flatnonzero(counts)
+        lengths = 1 << np.ceil(np.log2(counts[rows])).astype(np.int64)
+        bytes_per_slot = self.n_factors * np.dtype(np.float32).itemsize
+        budget = self.chunk_memory_mb * 1024 * 1024
+        
+        tasks = []
+        for length in np.unique(lengths):
+            bucket = rows[lengths == length]
+            batch_size = max(1, int(budget // (int(length) * bytes_per_slot)))
+            for start in range(0, len(bucket), batch_size):
+                tasks.append((int(length), bucket[start:start + batch_size]))
+        return tasks
+
+    def _solve(self, matrix: sp.csr_matrix, fixed: np.ndarray) -> np.ndarray:
+        """
+        Solve the ridge regression of every row of ``matrix`` against ``fixed``.
+
+        Args:
+            matrix (sp.csr_matrix): Rows to solve for x columns, centered ratings
+            fixed (np.ndarray): Factors of the columns (held fixed)
+
+        Returns:
+            np.ndarray: float32 factors for every row
+        """
+        result = np.zeros((matrix.shape[0], self.n_factors), dtype=np.float32)
+        eye = np.eye(self.n_factors, dtype=np.float32)
+
+        def solve_batch(task):
+            length, rows = task
+            counts = matrix.indptr[rows + 1] - matrix.indptr[rows]
+            slots = np.arange(length)
+            valid = slots[np.newaxis, :] < counts[:, np.newaxis]
+            positions = np.where(valid, matrix.indptr[rows][:, np.newaxis] + slots, 0)
+
+            # Zero-padded factors and ratings of every row: (rows x length x factors)
+            factors = fixed[matrix.indices[positions]] * valid[:, :, np.newaxis]
+            ratings = np.where(valid, matrix.data[positions], 0).astype(np.float32)
+
+            # Normal equations (F'F + lambda * n * I) x = F'r for the whole batch
+            factors_t = factors.transpose(0, 2, 1)
+            gram = factors_t @ factors + (self.regularization * counts)[:, None, None] * eye
+            rhs = factors_t @ ratings[:, :, np.newaxis]
+            result[rows] = np.linalg.solve(gram, rhs)[:, :, 0]
+
+        tasks = self._tasks(matrix.indptr)
+        n_jobs = self.n_jobs or os.cpu_count() or 1
+        if n_jobs > 1 and len(tasks) > 1:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                list(executor.map(solve_batch, tasks))
+        else:
+            for task in tasks:
+                solve_batch(task)
+
+        return result
+
+    def _predict_codes(self, user_codes: np.ndarray, item_codes: np.ndarray) -> np.ndarray:
+        scores = np.einsum('ij,ij->i', self.user_factors[user_codes], self.item_factors[item_codes])
+        return np.clip(scores + self.global_mean, *self.rating_range)
+
+    def fit(self, user_history: UserHistoryIndex) -> 'MatrixFactorization':
+        """
+        Train the model with early stopping on a held-out validation sample.
+
+        Once early stopping has picked the best iteration, the validation
+        ratings are folded back in with a final sweep over all ratings.
+
+        Args:
+            user_history (UserHistoryIndex): Rating histories aligned with the catalog rows
+
+        Returns:
+            MatrixFactorization: The fitted model
+        """
+        rng = np.random.default_rng(self.random_state)
+
+        self.movie_index = pd.Index(user_history.movie_ids)
+        self.user_index = pd.Index(user_history.user_ids)
+        user_codes = user_history.owners()
+        item_codes = user_history.items
+        ratings = user_history.ratings.astype(np.float64)
+
+        self.rating_range = (float(ratings.min()), float(ratings.max())) if len(ratings) else (0.5, 5.0)
+        n_users, n_items = user_history.n_users, user_history.n_items
+
+        # Hold out a validation sample for early stopping
+        is_valid = rng.random(len(ratings)) < self.validation_fraction
+        train = ~is_valid
+        self.global_mean = float(ratings[train].mean()) if train.any() else 0.0
+        centered = (ratings - self.global_mean).astype(np.float32)
+
+        self.user_items = sp.csr_matrix(
+            (centered[train], (user_codes[train], item_codes[train])), shape=(n_users, n_items)
+        )
+        item_users = self.user_items.T.tocsr()
+        self.item_counts = np.diff(item_users.indptr)
+
+        scale = 0.1 / np.sqrt(self.n_factors)
+        self.user_factors = (rng.standard_normal((n_users, self.n_factors)) * scale).astype(np.float32)
+        self.item_factors = (rng.standard_normal((n_items, self.n_factors)) * scale).astype(np.float32)
+
+        best_rmse = np.inf
+        best = (self.user_factors, self.item_factors)
+        stale = 0
+        self.history = []
+
+        for iteration in range(self.n_iterations):
+            self.user_factors = self._solve(self.user_items, self.item_factors)
+            self.item_factors = self._solve(item_users, self.user_factors)
+
+            if not is_valid.any():
+                continue
+
+            predictions = self._predict_codes(user_codes[is_valid], item_codes[is_valid])
+            rmse = float(np.sqrt(np.mean((predictions - ratings[is_valid]) ** 2)))
+            self.history.append({'iteration': iteration + 1, 'validation_rmse': rmse})
+
+            if rmse < best_rmse - self.tol:
+                best_rmse = rmse
+                best = (self.user_factors, self.item_factors)
+                stale = 0
+            else:
+                stale += 1
+                if stale >= self.patience:
+                    break
+
+        if is_valid.any():
+            self.user_factors, self.item_factors = best
+
+            # Fold the held-out ratings back in with one more sweep over all
+            # ratings, so they shape the factors and count as seen
+            self.global_mean = float(ratings.mean())
+            centered = (ratings - self.global_mean).astype(np.float32)
+            self.user_items = sp.csr_matrix((centered, (user_codes, item_codes)), shape=(n_users, n_items))
+            item_users = self.user_items.T.tocsr()
+            self.item_counts = np.diff(item_users.indptr)
+            self.user_factors = self._solve(self.user_items, self.item_factors)
+            self.item_factors = self._solve(item_users, self.user_factors)
+        return self
+
+    def predict(self, user_ids, movie_ids) -> np.ndarray:
+        """
+        Predict ratings for (user, movie) pairs in one vectorized pass.
+
+        Unknown users or movies get the global mean rating.
+
+        Args:
+            user_ids: userId of every pair
+            movie_ids: movieId of every pair
+
+        Returns:
+            np.ndarray: float32 predicted rating per pair
+        """
+        user_codes = self.user_index.get_indexer(np.asarray(user_ids))
+        item_codes = self.movie_index.get_indexer(np.asarray(movie_ids))
+        known = (user_codes >= 0) & (item_codes >= 0)
+
+        predictions = np.full(len(user_codes), self.global_mean, dtype=np.float32)
+        predictions[known] = self._predict_codes(user_codes[known], item_codes[known])
+        return predictions
+
+    def recommend(
+        self,
+        user_id,
+        n: int = 10,
+        exclude_seen: bool = True,
+        eligible: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the top-N catalog rows for a user with one matrix-vector product.
+
+        Args:
+            user_id: userId to recommend for
+            n (int): Number of movies to return
+            exclude_seen (bool): Skip movies the user rated when the model was fit
+            eligible (np.ndarray): Optional boolean mask of allowed catalog rows
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (catalog rows, predicted ratings);
+            empty for unknown users
+        """
+        code = self.user_index.get_indexer([user_id])[0]
+        if code < 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        scores = self.item_factors @ self.user_factors[code] + np.float32(self.global_mean)
+
+        # Movies without training ratings have no learned factors
+        scores[self.item_counts == 0] = -np.inf
+        if eligible is not None:
+            scores[~eligible] = -np.inf
+        if exclude_seen:
+            start, end = self.user_items.indptr[code], self.user_items.indptr[code + 1]
+            scores[self.user_items.indices[start:end]] = -np.inf
+
+        rows, top = top_k_rows(scores[np.newaxis, :], n)
+        keep = np.isfinite(top[0])
+        return rows[0][keep], np.clip(top[0][keep], *self.rating_range)
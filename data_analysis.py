@@ -5,6 +5,9 @@ import seaborn as sns
 from collections import Counter
 import warnings
 import os
+import time
+from movie_dataset import MovieDataset, read_csv, COMPACT_MOVIES_DTYPES
+from streaming_stats import aggregate_ratings
 warnings.filterwarnings('ignore')
 
 def get_data_file_path(filename):
@@ -37,13 +40,20 @@ def get_data_file_path(filename):
     return None
 
 class MovieDataAnalyzer:
-    def __init__(self, movies_path=None, ratings_path=None):
+    def __init__(self, movies_path=None, ratings_path=None, compact=False, cache=False, streaming=False):
         """
         Initialize the MovieDataAnalyzer with dataset paths.
         
         Args:
             movies_path (str): Path to movies.csv file
             ratings_path (str): Path to ratings.csv file
+            compact (bool): Load with narrow dtypes (int32 ids, float32 ratings,
+                categorical genres) and the pyarrow CSV engine when installed
+            cache (bool): Keep a memory-mapped column cache next to the CSV
+                files and load from it while the files are unchanged
+            streaming (bool): Aggregate ratings.csv in bounded chunks on a
+                process pool instead of loading it; ratings_df stays None and
+                the insights come from the streamed statistics
         """
         # Try multiple possible paths for the data files
         if movies_path is None:
@@ -84,9 +94,15 @@ class MovieDataAnalyzer:
             
         self.movies_path = movies_path
         self.ratings_path = ratings_path
+        self.compact = compact
+        self.cache = cache
+        self.streaming = streaming
+        self.rating_aggregates = None
+        self.load_report = None
         self.movies_df = None
         self.ratings_df = None
         self.movies_with_ratings = None
+        self.dataset = None
         
         print(f"🔍 Data paths initialized:")
         print(f"   🎬 Movies: {self.movies_path}")
@@ -114,32 +130,27 @@ class MovieDataAnalyzer:
                 print(f"Current working directory: {os.getcwd()}")
                 return None, None, None
             
+            if self.streaming:
+                return self._load_streaming()
+            
             # Load datasets
-            self.movies_df = pd.read_csv(self.movies_path)
-            self.ratings_df = pd.read_csv(self.ratings_path)
+            self.movies_df, self.ratings_df, self.load_report = MovieDataset.read_frames(
+                self.movies_path, self.ratings_path, compact=self.compact, cache=self.cache
+            )
+            report = self.load_report
             
             print(f"✅ Data loaded successfully!")
             print(f"   Movies: {len(self.movies_df)} records from {self.movies_path}")
             print(f"   Ratings: {len(self.ratings_df)} records from {self.ratings_path}")
+            print(f"   Memory: {report['movies_mb'] + report['ratings_mb']:.1f} MB "
+                  f"({'compact' if report['compact'] else 'default'} dtypes), "
+                  f"loaded in {report['seconds']:.2f}s with the {report['engine']} engine")
+            if report['cache'] is not None:
+                print(f"   Column cache: movies {report['cache']['movies']}, ratings {report['cache']['ratings']}")
             
-            # Calculate average ratings and rating counts
-            rating_stats = self.ratings_df.groupby('movieId').agg({
-                'rating': ['mean', 'count']
-            }).reset_index()
-            
-            # Flatten column names
-            rating_stats.columns = ['movieId', 'avg_rating', 'rating_count']
-            
-            # Merge movies with ratings to get average ratings
-            self.movies_with_ratings = self.movies_df.merge(
-                rating_stats,
-                on='movieId',
-                how='left'
-            )
-            
-            # Fill NaN values
-            self.movies_with_ratings['avg_rating'] = self.movies_with_ratings['avg_rating'].fillna(0)
-            self.movies_with_ratings['rating_count'] = self.movies_with_ratings['rating_count'].fillna(0)
+            # Average ratings and rating counts, shared with MovieRecommender.from_dataset
+            self.dataset = MovieDataset(self.movies_df, self.ratings_df)
+            self.movies_with_ratings = self.dataset.movies_with_ratings
             
             return self.movies_df, self.ratings_df, self.movies_with_ratings
             
@@ -152,6 +163,28 @@ class MovieDataAnalyzer:
             print(f"❌ Unexpected error loading data: {e}")
             return None, None, None
     
+    def _load_streaming(self):
+        """
+        Load the movies and stream the ratings into per-movie statistics.
+        
+        Returns:
+            tuple: (movies_df, None, movies_with_ratings)
+        """
+        start = time.perf_counter()
+        self.movies_df = read_csv(self.movies_path, self.compact, COMPACT_MOVIES_DTYPES)
+        self.ratings_df = None
+        self.rating_aggregates = aggregate_ratings(self.ratings_path)
+        
+        print(f"✅ Data loaded successfully!")
+        print(f"   Movies: {len(self.movies_df)} records from {self.movies_path}")
+        print(f"   Ratings: {self.rating_aggregates.n_rows} records streamed from {self.ratings_path} "
+              f"in {time.perf_counter() - start:.2f}s")
+        
+        self.dataset = MovieDataset.from_aggregates(self.movies_df, self.rating_aggregates)
+        self.movies_with_ratings = self.dataset.movies_with_ratings
+        
+        return self.movies_df, self.ratings_df, self.movies_with_ratings
+    
     def get_basic_insights(self):
         """
         Extract basic insights from the dataset.
@@ -159,15 +192,27 @@ class MovieDataAnalyzer:
         Returns:
             dict: Dictionary containing basic insights
         """
-        if self.movies_df is None or self.ratings_df is None:
+        if self.movies_df is None or (self.ratings_df is None and self.rating_aggregates is None):
             return None
             
+        if self.ratings_df is None:
+            aggregates = self.rating_aggregates
+            total_ratings, unique_users = aggregates.n_rows, aggregates.n_users
+            avg_rating, rating_std = aggregates.mean, aggregates.std
+        else:
+            total_ratings = len(self.ratings_df)
+            unique_users = self.ratings_df['userId'].nunique()
+            # float64 even for compact float32 ratings, like the default loader
+            ratings = self.ratings_df['rating'].astype(np.float64)
+            avg_rating = ratings.mean()
+            rating_std = ratings.std()
+            
         insights = {
             'total_movies': len(self.movies_df),
-            'total_ratings': len(self.ratings_df),
-            'unique_users': self.ratings_df['userId'].nunique(),
-            'avg_rating': self.ratings_df['rating'].mean(),
-            'rating_std': self.ratings_df['rating'].std(),
+            'total_ratings': total_ratings,
+            'unique_users': unique_users,
+            'avg_rating': avg_rating,
+            'rating_std': rating_std,
             'top_5_popular': self.get_top_popular_movies(5),
             'top_5_rated': self.get_top_rated_movies(5),
             'genre_distribution': self.get_genre_distribution(),
@@ -241,12 +286,20 @@ class MovieDataAnalyzer:
         Returns:
             dict: Rating distribution
         """
-        if self.ratings_df is None:
+        rating_counts = self._rating_counts()
+        if rating_counts is None:
             return None
             
-        rating_counts = self.ratings_df['rating'].value_counts().sort_index()
         return dict(rating_counts)
     
+    def _rating_counts(self):
+        """Number of ratings per rating value, from the ratings or the streamed histogram."""
+        if self.ratings_df is not None:
+            return self.ratings_df['rating'].value_counts().sort_index()
+        if self.rating_aggregates is not None:
+            return self.rating_aggregates.rating_distribution()
+        return None
+    
     def create_visualizations(self):
         """
         Create various visualizations for the dataset.
@@ -254,7 +307,7 @@ class MovieDataAnalyzer:
         Returns:
             dict: Dictionary containing matplotlib figures
         """
-        if self.movies_df is None or self.ratings_df is None:
+        if self.movies_df is None or self._rating_counts() is None:
             return None
             
         figures = {}
@@ -264,7 +317,7 @@ class MovieDataAnalyzer:
         
         # 1. Rating Distribution
         fig1, ax1 = plt.subplots(figsize=(10, 6))
-        rating_counts = self.ratings_df['rating'].value_counts().sort_index()
+        rating_counts = self._rating_counts()
         ax1.bar(rating_counts.index, rating_counts.values, color='skyblue', alpha=0.7)
         ax1.set_title('Distribution of Movie Ratings', fontsize=14, fontweight='bold')
         ax1.set_xlabel('Rating', fontsize=12)
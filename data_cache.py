@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from typing import Callable, Optional, Tuple
+
+# Directory created next to the source CSVs that holds the column caches
+CACHE_DIR = '.column_cache'
+
+# Bump whenever the layout written by write_column_cache changes
+CACHE_FORMAT_VERSION = 1
+
+def file_fingerprint(path: str) -> dict:
+    """
+    Fingerprint a data file by size, modification time and content hash.
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        dict: {'size', 'mtime_ns', 'sha256'}
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+
+def fingerprint_matches(recorded: Optional[dict], path: str) -> bool:
+    """
+    Check a file against a recorded fingerprint.
+
+    Size and modification time are compared first; the content hash is only
+    recomputed when the file was touched without changing size.
+
+    Args:
+        recorded (dict): Fingerprint from file_fingerprint, or None
+        path (str): Path to the file
+
+    Returns:
+        bool: True if the file still matches the fingerprint
+    """
+    if recorded is None or not os.path.exists(path):
+        return False
+
+    stat = os.stat(path)
+    if stat.st_size != recorded['size']:
+        return False
+    if stat.st_mtime_ns == recorded['mtime_ns']:
+        return True
+
+    return file_fingerprint(path)['sha256'] == recorded['sha256']
+
+def _encode_strings(values: np.ndarray) -> tuple:
+    """
+    Pack strings into one UTF-8 byte blob, the byte offsets of every value
+    and a mask of the missing values.
+    """
+    missing = pd.isna(values)
+    encoded = [b'' if empty else str(value).encode('utf-8') for value, empty in zip(values, missing)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return blob, offsets, missing
+
+def _decode_strings(blob: np.ndarray, offsets: np.ndarray, missing: Optional[np.ndarray]) -> list:
+    data = blob.tobytes()
+    values = [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+    if missing is not None:
+        for position in np.flatnonzero(missing):
+            values[position] = np.nan
+    return values
+
+def cache_path(source_path: str, key: str) -> str:
+    """
+    Directory of the column cache of a source file.
+
+    Args:
+        source_path (str): Path to the source CSV
+        key (str): Name of the load mode, so that differently typed loads of
+            the same file get separate caches
+
+    Returns:
+        str: Cache directory next to the source file
+    """
+    directory, name = os.path.split(os.path.abspath(source_path))
+    return os.path.join(directory, CACHE_DIR, f'{name}.{key}')
+
+def write_column_cache(frame: pd.DataFrame, path: str, source: Optional[dict] = None):
+    """
+    Write every column of a frame as .npy files plus a manifest.
+
+    Numeric columns are stored as they are, string columns as a UTF-8 blob with
+    int64 offsets, and categorical columns as codes plus their categories. The
+    cache is written into a temporary directory and moved into place, so
+    readers never see a partial cache.
+
+    Args:
+        frame (pd.DataFrame): Frame to store
+        path (str): Cache directory
+        source (dict): Fingerprint of the source file, see file_fingerprint()
+    """
+    staging = f'{path}.tmp{os.getpid()}'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    def save(name: str, array: np.ndarray):
+        np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(array))
+
+    columns = []
+    for position, (name, column) in enumerate(frame.items()):
+        stem = f'c{position}'
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            kind = 'category'
+            save(f'{stem}.codes', column.cat.codes.to_numpy())
+            categories = column.cat.categories.to_numpy(dtype=object)
+            blob, offsets, _ = _encode_strings(categories)
+            save(f'{stem}.blob', blob)
+            save(f'{stem}.offsets', offsets)
+            has_missing = False
+        elif column.dtype.kind in 'biuf':
+            kind = 'numeric'
+            save(stem, column.to_numpy())
+            has_missing = False
+        else:
+            kind = 'string'
+            blob, offsets, missing = _encode_strings(column.to_numpy(dtype=object))
+            save(f'{stem}.blob', blob)
+            save(f'{stem}.offsets', offsets)
+            has_missing = bool(missing.any())
+            if has_missing:
+                save(f'{stem}.missing', missing)
+        columns.append({'name': name, 'file': stem, 'kind': kind, 'missing': has_missing})
+
+    manifest = {
+        'format_version': CACHE_FORMAT_VERSION,
+        'rows': len(frame),
+        'columns': columns,
+        'source': source
+    }
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+
+def read_column_cache(path: str, mmap: bool = True) -> pd.DataFrame:
+    """
+    Load a frame written by write_column_cache().
+
+    Numeric columns are memory-mapped and wrapped without copying; string and
+    categorical columns are decoded from their blobs.
+
+    Args:
+        path (str): Cache directory
+        mmap (bool): Memory-map the numeric columns instead of reading them
+
+    Returns:
+        pd.DataFrame: The cached frame
+    """
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    mmap_mode = 'r' if mmap else None
+
+    def load(name: str) -> np.ndarray:
+        # A plain ndarray view keeps the mapping alive without the memmap subclass
+        return np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode).view(np.ndarray)
+
+    data = {}
+    for column in manifest['columns']:
+        stem = column['file']
+        if column['kind'] == 'numeric':
+            data[column['name']] = load(stem)
+        elif column['kind'] == 'category':
+            categories = _decode_strings(load(f'{stem}.blob'), load(f'{stem}.offsets'), None)
+            data[column['name']] = pd.Categorical.from_codes(np.asarray(load(f'{stem}.codes')), categories=categories)
+        else:
+            missing = load(f'{stem}.missing') if column['missing'] else None
+            values = _decode_strings(load(f'{stem}.blob'), load(f'{stem}.offsets'), missing)
+            data[column['name']] = pd.Series(values) if values else pd.Series([], dtype=object)
+
+    frame = pd.DataFrame(data, copy=False)
+    frame.index = pd.RangeIndex(manifest['rows'])
+    return frame
+
+def cache_is_valid(path: str, source_path: str) -> bool:
+    """
+    Check that a cache exists, has the current format and matches its source.
+
+    Args:
+        path (str): Cache directory
+        source_path (str): Source CSV the cache was built from
+
+    Returns:
+        bool: True if the cache can be used
+    """
+    try:
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    source = manifest.get('source')
+    if manifest.get('format_version') != CACHE_FORMAT_VERSION or not fingerprint_matches(source, source_path):
+        return False
+
+    # A touched but unchanged file matched by hash: record the new mtime so
+    # later loads skip hashing it again
+    mtime_ns = os.stat(source_path).st_mtime_ns
+    if source['mtime_ns'] != mtime_ns:
+        manifest['source'] = {**source, 'mtime_ns': mtime_ns}
+        try:
+            with open(os.path.join(path, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+        except OSError:
+            pass
+    return True
+
+def load_cached(source_path: str, key: str, reader: Callable[[], pd.DataFrame], mmap: bool = True) -> Tuple[pd.DataFrame, str]:
+    """
+    Load a frame from the column cache of a source file, building it on a miss.
+
+    On a miss (no cache, or the source changed size, mtime and hash) the frame
+    is parsed with ``reader`` and written to the cache for the next load. A
+    cache that cannot be written (e.g. a read-only data directory) only costs
+    the speed-up.
+
+    Args:
+        source_path (str): Path to the source CSV
+        key (str): Name of the load mode, see cache_path()
+        reader (Callable[[], pd.DataFrame]): Parses the source file
+        mmap (bool): Memory-map the numeric columns of a cached frame
+
+    Returns:
+        Tuple[pd.DataFrame, str]: (frame, 'hit', 'built' or 'unwritable')
+    """
+    path = cache_path(source_path, key)
+    if cache_is_valid(path, source_path):
+        try:
+            return read_column_cache(path, mmap=mmap), 'hit'
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Could not read the column cache at {path}: {e}")
+
+    # Fingerprint before parsing, so a file replaced mid-parse is not recorded as parsed
+    source = file_fingerprint(source_path)
+    frame = reader()
+    try:
+        write_column_cache(frame, path, source)
+    except OSError as e:
+        print(f"⚠️ Could not write the column cache at {path}: {e}")
+        return frame, 'unwritable'
+    return frame, 'built'
@@ -0,0 +1,417 @@
+import argparse
+import json
+import multiprocessing
+import numpy as np
+import os
+import pandas as pd
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from data_analysis import get_data_file_path
+from movie_dataset import MovieDataset
+from movie_recommender import FEATURE_BUILDERS, MovieRecommender
+
+# Recommenders that can be evaluated, with the similarity backend they need
+METHODS = {
+    'content_neighbors': 'neighbors',
+    'content_dense': 'dense',
+    'content_ann': 'ann',
+    'user_profile': 'neighbors',
+    'collaborative': 'neighbors',
+    'hybrid': 'neighbors',
+    'latent_factors': 'neighbors',
+    'popularity': 'neighbors'
+}
+
+# Extra engines built on top of the backend, counted in the build cost
+ENGINES = {
+    'collaborative': 'collaborative',
+    'hybrid': 'collaborative',
+    'latent_factors': 'latent_factors'
+}
+
+# State inherited by the forked workers of evaluate()
+_EVAL_STATE = None
+
+def temporal_split(
+    ratings_df: pd.DataFrame,
+    test_fraction: float = 0.2,
+    min_ratings: int = 5
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Split ratings per user by time: each user's latest ratings become the test set.
+
+    Users with fewer than ``min_ratings`` ratings keep all of them in the
+    training set. Ties in ``timestamp`` are broken by movieId so the split is
+    deterministic.
+
+    Args:
+        ratings_df (pd.DataFrame): Ratings with userId, movieId, rating and timestamp columns
+        test_fraction (float): Fraction of every user's ratings held out
+        min_ratings (int): Minimum number of ratings for a user to be tested
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: (train ratings, test ratings)
+    """
+    order = np.lexsort((
+        ratings_df['movieId'].to_numpy(),
+        ratings_df['timestamp'].to_numpy(),
+        ratings_df['userId'].to_numpy()
+    ))
+    ordered = ratings_df.iloc[order].reset_index(drop=True)
+
+    # Position of every rating within its user's history
+    codes, _ = pd.factorize(ordered['userId'], sort=True)
+    counts = np.bincount(codes)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    position = np.arange(len(ordered)) - starts[codes]
+
+    n_test = np.where(counts >= min_ratings, np.ceil(counts * test_fraction), 0).astype(np.int64)
+    test = position >= counts[codes] - n_test[codes]
+    return ordered[~test].reset_index(drop=True), ordered[test].reset_index(drop=True)
+
+def ranking_metrics(hits: np.ndarray, n_relevant: np.ndarray, k: int) -> dict:
+    """
+    Compute precision@K, recall@K and NDCG@K with binary relevance.
+
+    Args:
+        hits (np.ndarray): (n_users x k) boolean matrix, True where the
+            recommendation at that rank is relevant
+        n_relevant (np.ndarray): Number of relevant movies per user
+        k (int): Cut-off rank
+
+    Returns:
+        dict: Mean precision, recall and ndcg over the users
+    """
+    if len(hits) == 0:
+        return {'precision': 0.0, 'recall': 0.0, 'ndcg': 0.0}
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = (hits * discounts).sum(axis=1)
+    idcg = np.cumsum(discounts)[np.minimum(n_relevant, k) - 1]
+    n_hits = hits.sum(axis=1)
+
+    return {
+        'precision': float(np.mean(n_hits / k)),
+        'recall': float(np.mean(n_hits / n_relevant)),
+        'ndcg': float(np.mean(dcg / idcg))
+    }
+
+def measure_build(build: Callable[[], object], memory: bool = True) -> Tuple[object, float, float]:
+    """
+    Run a build step and measure its wall time and peak traced memory.
+
+    Tracing slows allocation-heavy builds down, so the peak memory comes from
+    a separate traced run whose result is discarded, and the build is timed
+    untraced.
+
+    Args:
+        build (Callable): Function performing the build
+        memory (bool): Whether to do the traced run (the peak is NaN otherwise)
+
+    Returns:
+        Tuple[object, float, float]: (result of the timed run, seconds, peak megabytes)
+    """
+    peak = float('nan')
+    if memory:
+        tracemalloc.start()
+        try:
+            build()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak /= 1024 * 1024
+
+    start = time.perf_counter()
+    result = build()
+    return result, time.perf_counter() - start, peak
+
+def _recommend(
+    method: str,
+    recommender: MovieRecommender,
+    user_id,
+    seed: int,
+    seen: np.ndarray,
+    k: int,
+    min_rating_count: int
+) -> np.ndarray:
+    """
+    Get the top-K unseen catalog rows one method recommends to a user.
+    """
+    # Seeded methods recommend nothing to users without a seed movie in the catalog
+    if seed < 0 and method in ('content_neighbors', 'content_dense', 'content_ann', 'collaborative', 'hybrid'):
+        return np.zeros(0, dtype=np.int64)
+
+    # The seen movies are filtered out while selecting, so exactly K are requested
+    if method in ('content_neighbors', 'content_dense', 'content_ann'):
+        indices, _ = recommender._top_similar(seed, k, min_rating_count, 0.0, exclude=seen)
+    elif method == 'collaborative':
+        indices, _ = recommender._top_similar(
+            seed, k, min_rating_count, 0.0,
+            neighbor_index=recommender.item_cf.neighbor_index,
+            similarity_row=recommender.item_cf.similarity_row,
+            exclude=seen
+        )
+    elif method == 'hybrid':
+        indices, _ = recommender._hybrid_top(seed, k, min_rating_count, 0.0, exclude=seen)
+    elif method == 'user_profile':
+        # Already excludes the user's history
+        indices = recommender.get_user_recommendations(user_id, k, min_rating_count, columnar=True).indices
+    elif method == 'latent_factors':
+        # Already excludes the user's history
+        indices = recommender.get_latent_factor_recommendations(user_id, k, min_rating_count, columnar=True).indices
+    else:
+        eligible = recommender._rating_count >= min_rating_count
+        eligible[seen] = False
+        order = recommender._popularity_order
+        indices = order[eligible[order]][:k]
+
+    return indices
+
+def _evaluate_block(task: Tuple[str, int, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Evaluate one method on one block of users in a worker.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (hits matrix, recommended rows, latencies in seconds)
+    """
+    recommenders, user_ids, seeds, test_indptr, test_rows, k, min_rating_count = _EVAL_STATE
+    method, start, end = task
+    recommender = recommenders[method]
+
+    hits = np.zeros((end - start, k), dtype=bool)
+    recommended = []
+    latencies = np.zeros(end - start)
+    for i, user in enumerate(range(start, end)):
+        seen, _ = recommender.user_history.history(user_ids[user])
+        began = time.perf_counter()
+        indices = _recommend(method, recommender, user_ids[user], seeds[user], seen, k, min_rating_count)
+        latencies[i] = time.perf_counter() - began
+
+        relevant = test_rows[test_indptr[user]:test_indptr[user + 1]]
+        hits[i, :len(indices)] = np.isin(indices, relevant)
+        recommended.append(indices)
+
+    return hits, np.unique(np.concatenate(recommended)) if recommended else np.zeros(0, dtype=np.int64), latencies
+
+def _seed_rows(train_df: pd.DataFrame, movie_rows: pd.Index, relevance_threshold: float) -> pd.Series:
+    """
+    Catalog row of every user's latest liked training rating (latest rating if none is liked).
+
+    Ratings of movies outside the catalog are not considered.
+    """
+    train_df = train_df[movie_rows.get_indexer(train_df['movieId']) >= 0]
+    latest = (
+        train_df.assign(liked=train_df['rating'] >= relevance_threshold)
+        .sort_values(['userId', 'liked', 'timestamp', 'movieId'])
+        .drop_duplicates('userId', keep='last')
+    )
+    return pd.Series(movie_rows.get_indexer(latest['movieId']), index=latest['userId'].to_numpy())
+
+def evaluate(
+    movies_df: pd.DataFrame,
+    ratings_df: pd.DataFrame,
+    methods: Optional[List[str]] = None,
+    k: int = 10,
+    test_fraction: float = 0.2,
+    relevance_threshold: float = 4.0,
+    min_rating_count: int = 0,
+    max_users: Optional[int] = None,
+    n_jobs: Optional[int] = None,
+    tfidf_params: Optional[dict] = None,
+    feature_builder: str = 'tfidf',
+    random_state: int = 42,
+    measure_memory: bool = True
+) -> pd.DataFrame:
+    """
+    Evaluate recommenders on a per-user temporal split of the ratings.
+
+    Every method is built on the training ratings and asked for K unseen
+    movies per test user; movies the user rated at least
+    ``relevance_threshold`` in the test period are the relevant ones. Seed
+    based methods (content, collaborative, hybrid) start from the user's
+    latest liked training movie. Users are scored on a pool of forked worker
+    processes, so the latencies are per query inside one worker.
+
+    Args:
+        movies_df (pd.DataFrame): Movie catalog
+        ratings_df (pd.DataFrame): Ratings with a timestamp column
+        methods (List[str]): Methods to evaluate, defaults to all of METHODS
+        k (int): Number of recommendations per user
+        test_fraction (float): Fraction of every user's ratings held out
+        relevance_threshold (float): Minimum test rating of a relevant movie
+        min_rating_count (int): Minimum number of ratings of a recommended movie
+        max_users (int): Evaluate a random sample of this many users
+        n_jobs (int): Number of worker processes, None for one per CPU
+        tfidf_params (dict): Vectorizer settings overriding the builder's defaults
+        feature_builder (str): 'tfidf' or 'hashing', see MovieRecommender
+        random_state (int): Seed of the user sample
+        measure_memory (bool): Run every build a second time under tracemalloc
+            to report its peak_mb (NaN otherwise)
+
+    Returns:
+        pd.DataFrame: One row per method with precision, recall, ndcg,
+        coverage, users, build_s, peak_mb, p50_ms, p95_ms and p99_ms
+    """
+    global _EVAL_STATE
+
+    methods = list(methods or METHODS)
+    unknown = [method for method in methods if method not in METHODS]
+    if unknown:
+        raise ValueError(f"Unknown methods {unknown}, expected some of {list(METHODS)}")
+
+    train_df, test_df = temporal_split(ratings_df, test_fraction)
+    dataset = MovieDataset(movies_df, train_df)
+
+    # Build each backend once on the shared dataset, and the extra engines on
+    # the neighbors backend
+    recommenders, builds = {}, {}
+    for backend in dict.fromkeys(METHODS[method] for method in methods):
+        print(f"🔄 Building '{backend}' recommender...")
+        recommenders[backend], seconds, peak = measure_build(lambda: MovieRecommender.from_dataset(
+            dataset, similarity_backend=backend, tfidf_params=tfidf_params, feature_builder=feature_builder
+        ), measure_memory)
+        builds[backend] = (seconds, peak)
+
+    base = recommenders.get('neighbors')
+    if 'collaborative' in methods or 'hybrid' in methods:
+        print("🔄 Building collaborative index...")
+        _, seconds, peak = measure_build(base.build_collaborative_index, measure_memory)
+        builds['collaborative'] = (seconds, peak)
+    if 'latent_factors' in methods:
+        print("🔄 Training matrix factorization...")
+        _, seconds, peak = measure_build(base.build_matrix_factorization, measure_memory)
+        builds['latent_factors'] = (seconds, peak)
+
+    # Test users: known in training, with at least one relevant test movie
+    reference = next(iter(recommenders.values()))
+    relevant_df = test_df[test_df['rating'] >= relevance_threshold]
+    relevant_df = relevant_df.assign(row=reference._movie_rows.get_indexer(relevant_df['movieId']))
+    relevant_df = relevant_df[relevant_df['row'] >= 0]
+    user_ids = np.intersect1d(relevant_df['userId'].unique(), reference.user_history.user_ids)
+    if max_users is not None and max_users < len(user_ids):
+        rng = np.random.default_rng(random_state)
+        user_ids = np.sort(rng.choice(user_ids, max_users, replace=False))
+
+    relevant_df = relevant_df[relevant_df['userId'].isin(user_ids)].sort_values(['userId', 'row'])
+    test_indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+    np.cumsum(relevant_df.groupby('userId').size().reindex(user_ids).to_numpy(), out=test_indptr[1:])
+    test_rows = relevant_df['row'].to_numpy()
+    seeds = _seed_rows(train_df, reference._movie_rows, relevance_threshold).reindex(user_ids, fill_value=-1).to_numpy()
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        n_jobs = 1
+    block_size = max(1, -(-len(user_ids) // (n_jobs * 4)))
+    tasks = [
+        (method, start, min(start + block_size, len(user_ids)))
+        for method in methods for start in range(0, len(user_ids), block_size)
+    ]
+
+    _EVAL_STATE = (
+        {method: recommenders[METHODS[method]] for method in methods},
+        user_ids, seeds, test_indptr, test_rows, k, min_rating_count
+    )
+    try:
+        print(f"🔄 Evaluating {len(methods)} methods on {len(user_ids)} users...")
+        if n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context('fork')) as executor:
+                blocks = list(executor.map(_evaluate_block, tasks))
+        else:
+            blocks = [_evaluate_block(task) for task in tasks]
+    finally:
+        _EVAL_STATE = None
+
+    n_relevant = np.diff(test_indptr)
+    n_movies = len(reference._titles)
+    rows = []
+    for method in methods:
+        method_blocks = [block for task, block in zip(tasks, blocks) if task[0] == method]
+        hits = np.concatenate([block[0] for block in method_blocks]) if method_blocks else np.zeros((0, k), dtype=bool)
+        recommended = np.unique(np.concatenate([block[1] for block in method_blocks])) if method_blocks else []
+        latencies = np.concatenate([block[2] for block in method_blocks]) * 1000 if method_blocks else np.zeros(1)
+
+        # Build cost of the backend plus the extra engine the method needs
+        seconds, peak = builds[METHODS[method]]
+        engine = ENGINES.get(method)
+        if engine is not None:
+            seconds, peak = seconds + builds[engine][0], max(peak, builds[engine][1])
+
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        rows.append({
+            'method': method,
+            **ranking_metrics(hits, n_relevant, k),
+            'coverage': len(recommended) / n_movies if n_movies else 0.0,
+            'users': len(hits),
+            'build_s': seconds,
+            'peak_mb': peak,
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'p99_ms': p99
+        })
+
+    return pd.DataFrame(rows).set_index('method')
+
+def _parse_tfidf_params(items: List[str]) -> dict:
+    """
+    Parse KEY=VALUE overrides, reading values as JSON when possible.
+    """
+    params = {}
+    for item in items:
+        key, _, value = item.partition('=')
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            pass
+        params[key] = tuple(value) if isinstance(value, list) else value
+    return params
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the movie recommenders on a temporal split of the ratings.")
+    parser.add_argument('--movies', default=get_data_file_path('movies.csv'), help="Path to movies.csv")
+    parser.add_argument('--ratings', default=get_data_file_path('ratings.csv'), help="Path to ratings.csv")
+    parser.add_argument('--methods', nargs='+', choices=list(METHODS), help="Methods to evaluate (default: all)")
+    parser.add_argument('-k', type=int, default=10, help="Number of recommendations per user")
+    parser.add_argument('--test-fraction', type=float, default=0.2, help="Fraction of each user's latest ratings held out")
+    parser.add_argument('--relevance-threshold', type=float, default=4.0, help="Minimum test rating of a relevant movie")
+    parser.add_argument('--min-rating-count', type=int, default=0, help="Minimum number of ratings of a recommended movie")
+    parser.add_argument('--max-users', type=int, help="Evaluate a random sample of users")
+    parser.add_argument('--n-jobs', type=int, help="Number of worker processes (default: one per CPU)")
+    parser.add_argument('--tfidf', nargs='*', default=[], metavar='KEY=VALUE', help="Vectorizer overrides, e.g. max_features=10000 ngram_range=[1,1] (n_features=... for hashing)")
+    parser.add_argument('--feature-builder', choices=FEATURE_BUILDERS, default='tfidf', help="Content feature builder")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced build runs that measure peak memory")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.movies is None or args.ratings is None:
+        parser.error("movies.csv / ratings.csv not found, pass --movies and --ratings")
+
+    results = evaluate(
+        pd.read_csv(args.movies),
+        pd.read_csv(args.ratings),
+        methods=args.methods,
+        k=args.k,
+        test_fraction=args.test_fraction,
+        relevance_threshold=args.relevance_threshold,
+        min_rating_count=args.min_rating_count,
+        max_users=args.max_users,
+        n_jobs=args.n_jobs,
+        tfidf_params=_parse_tfidf_params(args.tfidf),
+        feature_builder=args.feature_builder,
+        measure_memory=not args.no_memory
+    )
+
+    pd.set_option('display.width', 200)
+    print(results.round(4).to_string())
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'config': {key: value for key, value in vars(args).items() if key != 'output'},
+                'results': results.to_dict(orient='index')
+            }, f, indent=2, default=float)
+        print(f"✅ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
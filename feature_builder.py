@@ -0,0 +1,142 @@
+import os
+import numpy as np
+import scipy.sparse as sp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from typing import Iterator, Optional, Sequence
+
+# Hasher of the worker processes, set by _init_worker
+_WORKER_HASHER = None
+
+def _init_worker(hasher: HashingVectorizer):
+    global _WORKER_HASHER
+    _WORKER_HASHER = hasher
+
+def _hash_chunk(texts: list) -> sp.csr_matrix:
+    return _WORKER_HASHER.transform(texts)
+
+class HashingTfidfVectorizer:
+    """
+    TF-IDF features over hashed terms, built in parallel chunks.
+
+    Terms are hashed into ``n_features`` buckets, so no vocabulary is fitted
+    or stored and terms first seen after the fit are still represented. Texts
+    are hashed in chunks of ``chunk_size`` on a process pool; the document
+    frequencies are accumulated as the chunks arrive and the IDF weights are
+    applied once all are in. The weighting matches TfidfVectorizer (raw term
+    counts, smoothed IDF, L2-normalized rows), and the output is float32.
+    """
+
+    def __init__(
+        self,
+        n_features: int = 2 ** 18,
+        ngram_range: tuple = (1, 2),
+        stop_words: Optional[str] = 'english',
+        n_jobs: Optional[int] = None,
+        chunk_size: int = 20000
+    ):
+        """
+        Args:
+            n_features (int): Number of hash buckets (columns of the output)
+            ngram_range (tuple): Range of word n-gram sizes
+            stop_words (str): Stop word list passed to the tokenizer
+            n_jobs (int): Worker processes (defaults to the CPU count, 1 hashes inline)
+            chunk_size (int): Texts hashed per task
+        """
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.stop_words = stop_words
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.idf_: Optional[np.ndarray] = None
+
+    def _hasher(self) -> HashingVectorizer:
+        return HashingVectorizer(
+            n_features=self.n_features,
+            ngram_range=self.ngram_range,
+            stop_words=self.stop_words,
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float32
+        )
+
+    def build_analyzer(self):
+        """Tokenizer and n-gram generator applied to every text."""
+        return self._hasher().build_analyzer()
+
+    def _hash(self, texts: list) -> Iterator[sp.csr_matrix]:
+        """
+        Yield the term counts of consecutive chunks of texts, in order.
+
+        Only two chunks per worker are in flight, so the texts are never
+        copied as a whole into the workers.
+        """
+        hasher = self._hasher()
+        chunks = (texts[start:start + self.chunk_size] for start in range(0, len(texts), self.chunk_size))
+        n_jobs = self.n_jobs or os.cpu_count() or 1
+        if n_jobs == 1 or len(texts) <= self.chunk_size:
+            for chunk in chunks:
+                yield hasher.transform(chunk)
+            return
+
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(hasher,)) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_hash_chunk, chunk))
+                if len(pending) >= 2 * n_jobs:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _stack(self, counts: list) -> sp.csr_matrix:
+        if not counts:
+            return sp.csr_matrix((0, self.n_features), dtype=np.float32)
+        return sp.vstack(counts, format='csr')
+
+    def _weight(self, counts: sp.csr_matrix) -> sp.csr_matrix:
+        counts.data *= self.idf_[counts.indices]
+        return normalize(counts, copy=False)
+
+    def fit_transform(self, texts: Sequence[str]) -> sp.csr_matrix:
+        """
+        Compute the IDF weights of the texts and return their TF-IDF matrix.
+
+        Args:
+            texts: Documents, e.g. a list or a pandas Series of strings
+
+        Returns:
+            sp.csr_matrix: (n_texts x n_features) float32 TF-IDF matrix
+        """
+        texts = texts.tolist() if hasattr(texts, 'tolist') else list(texts)
+        document_frequency = np.zeros(self.n_features, dtype=np.int64)
+        counts = []
+        for chunk in self._hash(texts):
+            # One entry per (document, bucket), so the indices count documents
+            document_frequency += np.bincount(chunk.indices, minlength=self.n_features)
+            counts.append(chunk)
+
+        n_documents = len(texts)
+        self.idf_ = (np.log((1 + n_documents) / (1 + document_frequency)) + 1).astype(np.float32)
+        return self._weight(self._stack(counts))
+
+    def fit(self, texts: Sequence[str]) -> 'HashingTfidfVectorizer':
+        self.fit_transform(texts)
+        return self
+
+    def transform(self, texts: Sequence[str]) -> sp.csr_matrix:
+        """
+        TF-IDF matrix of texts with the fitted IDF weights.
+
+        Args:
+            texts: Documents, e.g. a list or a pandas Series of strings
+
+        Returns:
+            sp.csr_matrix: (n_texts x n_features) float32 TF-IDF matrix
+        """
+        if self.idf_ is None:
+            raise ValueError("HashingTfidfVectorizer is not fitted")
+
+        texts = texts.tolist() if hasattr(texts, 'tolist') else list(texts)
+        return self._weight(self._stack(list(self._hash(texts))))
@@ -0,0 +1,380 @@
+import argparse
+import io
+import numpy as np
+import os
+import pandas as pd
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+# Share of movies listing each genre, roughly as in MovieLens
+GENRE_WEIGHTS = {
+    'Drama': 0.22, 'Comedy': 0.17, 'Thriller': 0.08, 'Action': 0.08, 'Romance': 0.07,
+    'Adventure': 0.05, 'Crime': 0.05, 'Horror': 0.05, 'Sci-Fi': 0.04, 'Fantasy': 0.03,
+    'Children': 0.03, 'Animation': 0.03, 'Mystery': 0.025, 'Documentary': 0.025, 'War': 0.015,
+    'Musical': 0.01, 'Western': 0.01, 'IMAX': 0.01, 'Film-Noir': 0.005
+}
+GENRES = list(GENRE_WEIGHTS)
+
+# Genre pairs that appear together far more often than chance
+GENRE_AFFINITY = [
+    ('Action', 'Adventure'), ('Action', 'Sci-Fi'), ('Action', 'Thriller'), ('Action', 'Crime'),
+    ('Adventure', 'Fantasy'), ('Adventure', 'Children'), ('Animation', 'Children'), ('Animation', 'Comedy'),
+    ('Comedy', 'Romance'), ('Comedy', 'Drama'), ('Crime', 'Thriller'), ('Crime', 'Drama'),
+    ('Drama', 'Romance'), ('Drama', 'War'), ('Horror', 'Thriller'), ('Mystery', 'Thriller'),
+    ('Sci-Fi', 'Thriller'), ('Musical', 'Romance'), ('Film-Noir', 'Crime'), ('Western', 'Action')
+]
+AFFINITY_BOOST = 8.0
+
+# Probability of listing 1, 2, 3 or 4 genres
+GENRE_COUNT_WEIGHTS = [0.4, 0.35, 0.18, 0.07]
+
+TAGS = [
+    'atmospheric', 'funny', 'twist ending', 'dark comedy', 'visually appealing', 'thought-provoking',
+    'classic', 'quirky', 'surreal', 'psychology', 'sci-fi', 'based on a book', 'violence', 'satire',
+    'time travel', 'philosophical', 'dystopia', 'space', 'nonlinear', 'great soundtrack', 'romance',
+    'superhero', 'mindfuck', 'cult film', 'comedy', 'stylized', 'action', 'heist', 'disturbing',
+    'true story', 'predictable', 'overrated', 'cute', 'Pixar', 'slow', 'beautiful', 'music',
+    'dialogue', 'imdb top 250', 'remake'
+]
+
+SYLLABLES = ['ka', 'ro', 'mi', 'ten', 'sha', 'lo', 'dar', 'vi', 'nu', 'bel', 'cor', 'ax', 'el', 'fi', 'gan', 'zu', 'po', 'ri', 'mar', 'tes']
+
+# Rating period: 1996-01-01 to 2023-10-01
+FIRST_TIMESTAMP = 820454400
+LAST_TIMESTAMP = 1696118400
+
+# Seed streams, so each part of the output gets independent random numbers
+CATALOG_STREAM, MOVIES_STREAM, RATINGS_STREAM = 0, 1, 2
+
+# Catalog-wide arrays inherited by every worker
+_WORKER_STATE = None
+
+def _rng(seed: int, stream: int, chunk: int = 0) -> np.random.Generator:
+    """
+    Random generator of one chunk of one output stream.
+
+    Seeding from (seed, stream, chunk) makes every chunk reproducible no
+    matter which process generates it or in which order.
+    """
+    return np.random.default_rng(np.random.SeedSequence([seed, stream, chunk]))
+
+def _init_worker(state: dict):
+    global _WORKER_STATE
+    _WORKER_STATE = state
+
+def build_catalog(n_movies: int, seed: int) -> dict:
+    """
+    Draw the catalog-wide movie properties the ratings depend on.
+
+    Args:
+        n_movies (int): Number of movies
+        seed (int): Random seed
+
+    Returns:
+        dict: popularity CDF, quality, release timestamp and vocabulary
+    """
+    rng = _rng(seed, CATALOG_STREAM)
+
+    # Zipf popularity over a random permutation of the movies
+    weights = 1.0 / np.arange(1, n_movies + 1) ** 0.9
+    popularity_cdf = np.cumsum(rng.permutation(weights))
+    popularity_cdf /= popularity_cdf[-1]
+
+    # Release years skewed towards recent decades
+    years = np.clip(2023 - np.floor(rng.exponential(18, n_movies)), 1902, 2023).astype(np.int64)
+    release = (years - 1970).astype('datetime64[Y]').astype('datetime64[s]').astype(np.int64)
+
+    # Distinct words in random order, so the Zipf word ranks are not alphabetical
+    vocabulary = rng.permutation(np.unique([
+        ''.join(rng.choice(SYLLABLES, rng.integers(2, 4))).capitalize()
+        for _ in range(max(2000, min(n_movies // 10, 200000)))
+    ]))
+
+    return {
+        'n_movies': n_movies,
+        'seed': seed,
+        'popularity_cdf': popularity_cdf,
+        'quality': rng.normal(3.5, 0.45, n_movies).astype(np.float32),
+        'years': years,
+        'release': np.maximum(release, FIRST_TIMESTAMP),
+        'vocabulary': vocabulary
+    }
+
+def _genre_cdfs() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    CDF of the first genre, and of the next genre given the first one.
+    """
+    weights = np.array(list(GENRE_WEIGHTS.values()))
+    pair = np.outer(np.ones(len(GENRES)), weights)
+    for a, b in GENRE_AFFINITY:
+        i, j = GENRES.index(a), GENRES.index(b)
+        pair[i, j] *= AFFINITY_BOOST
+        pair[j, i] *= AFFINITY_BOOST
+    np.fill_diagonal(pair, 0)
+
+    first = np.cumsum(weights) / weights.sum()
+    following = np.cumsum(pair, axis=1) / pair.sum(axis=1, keepdims=True)
+    return first, following
+
+def _movies_chunk(task: Tuple[int, int, int]) -> str:
+    """
+    Generate the movies.csv rows of movies [start, end) as CSV text.
+    """
+    chunk, start, end = task
+    state = _WORKER_STATE
+    rng = _rng(state['seed'], MOVIES_STREAM, chunk)
+    n = end - start
+    vocabulary = state['vocabulary']
+
+    # Titles: 1-4 Zipf-distributed vocabulary words plus the release year
+    word_weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    word_cdf = np.cumsum(word_weights) / word_weights.sum()
+    n_words = rng.integers(1, 5, n)
+    words = vocabulary[np.minimum(np.searchsorted(word_cdf, rng.random(n_words.sum())), len(vocabulary) - 1)]
+    offsets = np.concatenate([[0], np.cumsum(n_words)])
+    years = state['years'][start:end]
+    titles = [f"{' '.join(words[offsets[i]:offsets[i + 1]])} ({years[i]})" for i in range(n)]
+
+    # Genre mixes: a first genre, then genres that go with it
+    first_cdf, following_cdf = _genre_cdfs()
+    n_genres = np.searchsorted(np.cumsum(GENRE_COUNT_WEIGHTS), rng.random(n) * sum(GENRE_COUNT_WEIGHTS)) + 1
+    first = np.minimum(np.searchsorted(first_cdf, rng.random(n)), len(GENRES) - 1)
+    extra = np.minimum(
+        np.array([np.searchsorted(following_cdf[g], rng.random(3)) for g in first]).reshape(n, 3),
+        len(GENRES) - 1
+    )
+    genres = []
+    for i in range(n):
+        picked = dict.fromkeys([first[i], *extra[i, :n_genres[i] - 1]])
+        genres.append('|'.join(GENRES[g] for g in sorted(picked)))
+    no_genres = rng.random(n) < 0.01
+    for i in np.flatnonzero(no_genres):
+        genres[i] = '(no genres listed)'
+
+    buffer = io.StringIO()
+    pd.DataFrame({
+        'movieId': np.arange(start + 1, end + 1),
+        'title': titles,
+        'genres': genres
+    }).to_csv(buffer, header=False, index=False)
+    return buffer.getvalue()
+
+def _sample_histories(rng: np.random.Generator, counts: np.ndarray, popularity_cdf: np.ndarray) -> np.ndarray:
+    """
+    Draw distinct popularity-weighted movies for every user of a chunk.
+
+    Returns:
+        np.ndarray: Sorted keys user * n_movies + movie, up to counts[user] per user
+    """
+    n_movies = len(popularity_cdf)
+    keys = np.zeros(0, dtype=np.int64)
+    have = np.zeros(len(counts), dtype=np.int64)
+
+    # Draw with replacement and drop repeats; a few rounds refill users left short
+    for _ in range(8):
+        need = counts - have
+        if not need.any():
+            break
+        draws = np.ceil(need * 1.3).astype(np.int64) + (need > 0)
+        users = np.repeat(np.arange(len(counts)), draws)
+        movies = np.minimum(np.searchsorted(popularity_cdf, rng.random(len(users))), n_movies - 1)
+        candidates = np.concatenate([keys, users * n_movies + movies])
+
+        # First occurrence of every key, in draw order, capped per user
+        _, first = np.unique(candidates, return_index=True)
+        candidates = candidates[np.sort(first)]
+        owners = candidates // n_movies
+        order = np.argsort(owners, kind='stable')
+        candidates, owners = candidates[order], owners[order]
+        starts = np.searchsorted(owners, np.arange(len(counts)))
+        rank = np.arange(len(candidates)) - starts[owners]
+        keys = candidates[rank < counts[owners]]
+        have = np.bincount(keys // n_movies, minlength=len(counts))
+
+    return np.sort(keys)
+
+def _ratings_chunk(task: Tuple[int, int, int, float]) -> Tuple[str, str, int, int]:
+    """
+    Generate the ratings.csv and tags.csv rows of users [start, end) as CSV text.
+    """
+    chunk, start, end, mean_activity = task
+    state = _WORKER_STATE
+    rng = _rng(state['seed'], RATINGS_STREAM, chunk)
+    n_users = end - start
+    n_movies = state['n_movies']
+
+    # Zipf-like user activity: at least 20 ratings (as in MovieLens) plus a
+    # Pareto tail scaled to mean 1 (the Lomax mean is 1 / (1.8 - 1))
+    floor = min(20, n_movies)
+    extra = rng.pareto(1.8, n_users) * 0.8 * max(mean_activity - floor, 0)
+    counts = np.minimum(floor + np.round(extra).astype(np.int64), n_movies)
+    keys = _sample_histories(rng, counts, state['popularity_cdf'])
+    users, movies = keys // n_movies, keys % n_movies
+
+    # Rating = movie quality + user bias + noise, mostly whole stars
+    bias = rng.normal(0, 0.4, n_users)
+    raw = state['quality'][movies] + bias[users] + rng.normal(0, 0.85, len(keys))
+    whole = rng.random(len(keys)) < 0.7
+    ratings = np.clip(np.where(whole, np.round(raw), np.round(raw * 2) / 2), 0.5, 5.0)
+
+    # Every user rates within an active window, never before the release
+    window_start = rng.integers(FIRST_TIMESTAMP, LAST_TIMESTAMP, n_users)
+    window_length = np.minimum(rng.exponential(2 * 365 * 86400, n_users), LAST_TIMESTAMP - window_start)
+    timestamps = window_start[users] + (rng.random(len(keys)) * window_length[users]).astype(np.int64)
+    # Movies released after a rating would fall get rated some time after release
+    release = state['release'][movies]
+    late = timestamps < release
+    timestamps[late] = release[late] + (rng.random(late.sum()) * 0.2 * (LAST_TIMESTAMP - release[late])).astype(np.int64)
+
+    ratings_buffer = io.StringIO()
+    pd.DataFrame({
+        'userId': users + start + 1,
+        'movieId': movies + 1,
+        'rating': ratings,
+        'timestamp': timestamps
+    }).to_csv(ratings_buffer, header=False, index=False)
+
+    # A minority of users tag some of the movies they rated
+    taggers = rng.random(n_users) < 0.1
+    n_tags = np.where(taggers, rng.geometric(0.25, n_users), 0)
+    counts = np.bincount(users, minlength=n_users)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    tagged = np.concatenate([
+        offsets[u] + rng.integers(0, counts[u], n_tags[u]) for u in np.flatnonzero((n_tags > 0) & (counts > 0))
+    ] or [np.zeros(0, dtype=np.int64)])
+    tagged = np.sort(tagged)
+    tag_weights = 1.0 / np.arange(1, len(TAGS) + 1)
+    tag_cdf = np.cumsum(tag_weights) / tag_weights.sum()
+
+    tags_buffer = io.StringIO()
+    pd.DataFrame({
+        'userId': users[tagged] + start + 1,
+        'movieId': movies[tagged] + 1,
+        'tag': np.array(TAGS)[np.searchsorted(tag_cdf, rng.random(len(tagged)))],
+        'timestamp': np.minimum(timestamps[tagged] + rng.integers(0, 30 * 86400, len(tagged)), LAST_TIMESTAMP)
+    }).to_csv(tags_buffer, header=False, index=False)
+
+    return ratings_buffer.getvalue(), tags_buffer.getvalue(), len(keys), len(tagged)
+
+def _ordered_results(executor: Optional[ProcessPoolExecutor], function, tasks: list, window: int):
+    """
+    Yield the results of the tasks in order, keeping at most ``window`` in flight.
+    """
+    if executor is None:
+        for task in tasks:
+            yield function(task)
+        return
+
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(function, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def generate_dataset(
+    output_dir: str,
+    n_movies: int,
+    n_ratings: int,
+    n_users: Optional[int] = None,
+    seed: int = 42,
+    n_jobs: Optional[int] = None,
+    chunk_users: int = 1000,
+    chunk_movies: int = 100000
+) -> dict:
+    """
+    Write MovieLens-shaped movies.csv, ratings.csv and tags.csv.
+
+    Users and movies are generated in fixed-size chunks on a process pool and
+    written in order as they complete, with at most a few chunks in memory.
+    Every chunk draws from its own seed stream, so the files only depend on
+    the arguments (not on ``n_jobs``). Ratings are unique per (user, movie)
+    and sorted by userId then movieId; the total is close to, not exactly,
+    ``n_ratings``.
+
+    Args:
+        output_dir (str): Directory to write the files to
+        n_movies (int): Number of movies
+        n_ratings (int): Target number of ratings
+        n_users (int): Number of users, defaults to one per 150 ratings
+        seed (int): Random seed
+        n_jobs (int): Number of worker processes, None for one per CPU
+        chunk_users (int): Users generated per chunk
+        chunk_movies (int): Movies generated per chunk
+
+    Returns:
+        dict: Paths and row counts of the written files
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n_users = n_users or max(1, n_ratings // 150)
+    mean_activity = n_ratings / n_users
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    state = build_catalog(n_movies, seed)
+    movie_tasks = [
+        (chunk, start, min(start + chunk_movies, n_movies))
+        for chunk, start in enumerate(range(0, n_movies, chunk_movies))
+    ]
+    user_tasks = [
+        (chunk, start, min(start + chunk_users, n_users), mean_activity)
+        for chunk, start in enumerate(range(0, n_users, chunk_users))
+    ]
+
+    paths = {name: os.path.join(output_dir, f'{name}.csv') for name in ('movies', 'ratings', 'tags')}
+    counts = {'movies': n_movies, 'ratings': 0, 'tags': 0, 'users': n_users}
+
+    if n_jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(state,))
+    else:
+        executor = None
+        _init_worker(state)
+
+    try:
+        with open(paths['movies'], 'w', newline='', encoding='utf-8') as f:
+            f.write('movieId,title,genres\n')
+            for text in _ordered_results(executor, _movies_chunk, movie_tasks, 2 * n_jobs):
+                f.write(text)
+
+        with open(paths['ratings'], 'w', newline='', encoding='utf-8') as ratings_file, \
+                open(paths['tags'], 'w', newline='', encoding='utf-8') as tags_file:
+            ratings_file.write('userId,movieId,rating,timestamp\n')
+            tags_file.write('userId,movieId,tag,timestamp\n')
+            for ratings_text, tags_text, n_chunk_ratings, n_chunk_tags in _ordered_results(
+                executor, _ratings_chunk, user_tasks, 2 * n_jobs
+            ):
+                ratings_file.write(ratings_text)
+                tags_file.write(tags_text)
+                counts['ratings'] += n_chunk_ratings
+                counts['tags'] += n_chunk_tags
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return {'paths': paths, 'counts': counts}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a MovieLens-shaped synthetic dataset.")
+    parser.add_argument('--movies', type=int, default=100000, help="Number of movies")
+    parser.add_argument('--ratings', type=int, default=10000000, help="Target number of ratings")
+    parser.add_argument('--users', type=int, help="Number of users (default: one per 150 ratings)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--n-jobs', type=int, help="Number of worker processes (default: one per CPU)")
+    parser.add_argument('--chunk-users', type=int, default=1000, help="Users generated per chunk")
+    parser.add_argument('--output', default=os.path.join('data', 'synthetic'), help="Output directory")
+    args = parser.parse_args()
+
+    print(f"🔄 Generating {args.movies} movies and ~{args.ratings} ratings into {args.output}...")
+    start = time.perf_counter()
+    result = generate_dataset(
+        args.output, args.movies, args.ratings, n_users=args.users, seed=args.seed,
+        n_jobs=args.n_jobs, chunk_users=args.chunk_users
+    )
+    counts = result['counts']
+    print(f"✅ Wrote {counts['movies']} movies, {counts['ratings']} ratings from {counts['users']} users "
+          f"and {counts['tags']} tags in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+import time
+from typing import Optional, Tuple
+from data_cache import load_cached
+from streaming_stats import RatingAggregates
+
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+# Narrow dtypes of the compact load mode; half-star ratings are exact in float32
+COMPACT_MOVIES_DTYPES = {'movieId': 'int32', 'genres': 'category'}
+COMPACT_RATINGS_DTYPES = {'userId': 'int32', 'movieId': 'int32', 'rating': 'float32'}
+
+def read_csv(path: str, compact: bool = False, dtypes: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Read a CSV file, optionally with narrow dtypes.
+
+    In compact mode the multithreaded pyarrow engine is used when pyarrow is
+    installed, and the given columns are converted to the narrow dtypes.
+
+    Args:
+        path (str): Path to the CSV file
+        compact (bool): Whether to apply ``dtypes`` and the fast engine
+        dtypes (dict): Column dtypes used in compact mode
+
+    Returns:
+        pd.DataFrame: The loaded frame
+    """
+    if not compact:
+        return pd.read_csv(path)
+
+    dtypes = dtypes or {}
+    if CSV_ENGINE == 'pyarrow':
+        frame = pd.read_csv(path, engine='pyarrow')
+        return frame.astype({column: dtype for column, dtype in dtypes.items() if column in frame.columns})
+    return pd.read_csv(path, dtype=dtypes)
+
+def frame_memory_mb(frame: pd.DataFrame) -> float:
+    """
+    Memory used by a frame in megabytes, including the string contents.
+    """
+    return float(frame.memory_usage(deep=True).sum()) / (1024 * 1024)
+
+class MovieDataset:
+    """
+    Movies, ratings and per-movie rating statistics, computed once and shared.
+
+    MovieDataAnalyzer and MovieRecommender both read from one instance instead
+    of aggregating the ratings themselves. The frames are held by reference
+    (never copied), and the statistics are read-only arrays aligned with the
+    rows of ``movies_df``; consumers that need to modify them take their own
+    copy.
+    """
+
+    def __init__(self, movies_df: pd.DataFrame, ratings_df: pd.DataFrame):
+        """
+        Compute the per-movie rating statistics.
+
+        Args:
+            movies_df (pd.DataFrame): Movies with movieId, title and genres columns
+            ratings_df (pd.DataFrame): Ratings with userId, movieId and rating columns
+        """
+        self.movies_df = movies_df
+        self.ratings_df = ratings_df
+
+        # Sum and count of the ratings per movie, accumulated in float64 so
+        # float32 ratings give the same statistics, aligned with the catalog rows
+        values = ratings_df['rating'].to_numpy()
+        valid = ~np.isnan(values)
+        ids = ratings_df['movieId'].to_numpy()
+        if not valid.all():
+            ids, values = ids[valid], values[valid]
+        catalog_ids = movies_df['movieId'].to_numpy()
+
+        if self._dense_ids(ids, catalog_ids):
+            # Small non-negative integer ids index the bins directly
+            size = int(max(ids.max(initial=-1), catalog_ids.max(initial=-1))) + 1
+            sums = np.bincount(ids, weights=values, minlength=size)
+            counts = np.bincount(ids, minlength=size).astype(np.float64)
+            rows = catalog_ids.astype(np.int64)
+        else:
+            codes, movie_ids = pd.factorize(ids)
+            sums = np.bincount(codes, weights=values, minlength=len(movie_ids))
+            counts = np.bincount(codes, minlength=len(movie_ids)).astype(np.float64)
+            rows = pd.Index(movie_ids).get_indexer(catalog_ids)
+        rated = rows >= 0
+
+        rating_sum = np.zeros(len(movies_df))
+        rating_count = np.zeros(len(movies_df))
+        rating_sum[rated] = sums[rows[rated]]
+        rating_count[rated] = counts[rows[rated]]
+        self._set_statistics(rating_sum, rating_count)
+
+    def _set_statistics(self, rating_sum: np.ndarray, rating_count: np.ndarray):
+        avg_rating = np.divide(rating_sum, rating_count, out=np.zeros(len(rating_sum)), where=rating_count > 0)
+        self.avg_rating = self._read_only(avg_rating)
+        self.rating_count = self._read_only(rating_count)
+        self.rating_sum = self._read_only(rating_sum)
+        self._movies_with_ratings: Optional[pd.DataFrame] = None
+
+    @classmethod
+    def from_aggregates(cls, movies_df: pd.DataFrame, aggregates: RatingAggregates) -> 'MovieDataset':
+        """
+        Build a dataset from streamed rating statistics instead of a ratings table.
+
+        The per-movie statistics equal those of the in-memory path, but
+        ``ratings_df`` is None, so consumers that need the individual ratings
+        (such as MovieRecommender) cannot use the dataset.
+
+        Args:
+            movies_df (pd.DataFrame): Movies with movieId, title and genres columns
+            aggregates (RatingAggregates): Statistics from streaming_stats.aggregate_ratings
+
+        Returns:
+            MovieDataset: Dataset without a ratings table
+        """
+        dataset = cls.__new__(cls)
+        dataset.movies_df = movies_df
+        dataset.ratings_df = None
+        rating_sum, rating_count, _ = aggregates.per_movie(movies_df['movieId'].to_numpy())
+        dataset._set_statistics(rating_sum, rating_count)
+        return dataset
+
+    @staticmethod
+    def _dense_ids(ids: np.ndarray, catalog_ids: np.ndarray) -> bool:
+        """
+        Whether the movie ids are integers small enough to be bincount bins.
+        """
+        if ids.dtype.kind not in 'iu' or catalog_ids.dtype.kind not in 'iu':
+            return False
+        limit = max(1 << 22, 4 * len(ids))
+        for array in (ids, catalog_ids):
+            if len(array) and (array.min() < 0 or array.max() >= limit):
+                return False
+        return True
+
+    @staticmethod
+    def _read_only(array: np.ndarray) -> np.ndarray:
+        array.flags.writeable = False
+        return array
+
+    @staticmethod
+    def read_frames(
+        movies_path: str,
+        ratings_path: str,
+        compact: bool = False,
+        cache: bool = False
+    ) -> Tuple[pd.DataFrame, pd.DataFrame, dict]:
+        """
+        Read movies.csv and ratings.csv and measure the load.
+
+        Args:
+            movies_path (str): Path to movies.csv
+            ratings_path (str): Path to ratings.csv
+            compact (bool): Use narrow dtypes (int32 ids, float32 ratings,
+                categorical genres) and the fastest available CSV engine
+            cache (bool): Load from a column cache next to the CSV files,
+                building it on the first load (see data_cache.load_cached);
+                numeric columns are then memory-mapped and read-only
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame, dict]: (movies, ratings, report with
+            seconds, engine, cache status and the memory of each frame in MB)
+        """
+        start = time.perf_counter()
+        engine = CSV_ENGINE if compact else 'c'
+        sources = ((movies_path, COMPACT_MOVIES_DTYPES), (ratings_path, COMPACT_RATINGS_DTYPES))
+        if cache:
+            key = 'compact' if compact else 'default'
+            loaded = [
+                load_cached(path, key, lambda path=path, dtypes=dtypes: read_csv(path, compact, dtypes))
+                for path, dtypes in sources
+            ]
+            (movies_df, movies_status), (ratings_df, ratings_status) = loaded
+            cache_status = {'movies': movies_status, 'ratings': ratings_status}
+            if movies_status == ratings_status == 'hit':
+                engine = 'cache'
+        else:
+            movies_df, ratings_df = [read_csv(path, compact, dtypes) for path, dtypes in sources]
+            cache_status = None
+
+        report = {
+            'seconds': time.perf_counter() - start,
+            'engine': engine,
+            'compact': compact,
+            'cache': cache_status,
+            'movies_mb': frame_memory_mb(movies_df),
+            'ratings_mb': frame_memory_mb(ratings_df)
+        }
+        return movies_df, ratings_df, report
+
+    @classmethod
+    def from_csv(cls, movies_path: str, ratings_path: str, compact: bool = False, cache: bool = False) -> 'MovieDataset':
+        """
+        Read movies.csv and ratings.csv and compute the statistics.
+
+        Args:
+            movies_path (str): Path to movies.csv
+            ratings_path (str): Path to ratings.csv
+            compact (bool): Load with narrow dtypes, see read_frames()
+            cache (bool): Load through the column cache, see read_frames()
+
+        Returns:
+            MovieDataset: The loaded dataset
+        """
+        movies_df, ratings_df, _ = cls.read_frames(movies_path, ratings_path, compact, cache)
+        return cls(movies_df, ratings_df)
+
+    @property
+    def movies_with_ratings(self) -> pd.DataFrame:
+        """
+        The movies with avg_rating and rating_count columns (0 for unrated movies).
+
+        Built on first access; the movie columns are shared with ``movies_df``
+        and rows are labelled by position.
+        """
+        if self._movies_with_ratings is None:
+            frame = self.movies_df.copy(deep=False)
+            frame.index = pd.RangeIndex(len(frame))
+            frame['avg_rating'] = self.avg_rating
+            frame['rating_count'] = self.rating_count
+            self._movies_with_ratings = frame
+        return self._movies_with_ratings
@@ -0,0 +1,960 @@
+import numpy as np
+import os
+import pandas as pd
+from collections import defaultdict
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+def popularity_order(rating_count: np.ndarray, avg_rating: np.ndarray) -> np.ndarray:
+    """
+    Order movies by popularity (rating count, then average rating, both descending).
+
+    Args:
+        rating_count (np.ndarray): Number of ratings per movie
+        avg_rating (np.ndarray): Average rating per movie
+
+    Returns:
+        np.ndarray: Row positions from most to least popular, ties broken by position
+    """
+    return np.lexsort((np.arange(len(rating_count)), -avg_rating, -rating_count))
+
+def inverse_permutation(order: np.ndarray) -> np.ndarray:
+    """
+    Get the rank of every row from an ordering of rows.
+
+    Args:
+        order (np.ndarray): Row positions in ranked order
+
+    Returns:
+        np.ndarray: rank[row] such that order[rank[row]] == row
+    """
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return rank
+
+def _precedes(a: np.ndarray, b: np.ndarray, keys: Sequence[np.ndarray], descending: bool) -> np.ndarray:
+    """
+    Element-wise lexicographic "row a sorts before row b" over keys, then row.
+    """
+    result = np.zeros(len(a), dtype=bool)
+    decided = np.zeros(len(a), dtype=bool)
+    for key in keys:
+        key_a, key_b = key[a], key[b]
+        before = key_a > key_b if descending else key_a < key_b
+        after = key_a < key_b if descending else key_a > key_b
+        result |= ~decided & before
+        decided |= before | after
+    return result | (~decided & (a < b))
+
+def reinsert_rows(
+    order: np.ndarray,
+    rank: np.ndarray,
+    rows: np.ndarray,
+    keys: Sequence[np.ndarray],
+    descending: bool = True
+) -> np.ndarray:
+    """
+    Move rows whose sort keys changed to their new place in an order.
+
+    ``order`` must be sorted by ``keys`` (primary key first) with ties broken
+    by ascending row position, as produced by ``np.lexsort``. The changed rows
+    are taken out and their insertion points are found with a binary search
+    run for all of them at once, so only the changed rows are compared instead
+    of sorting the whole order again.
+
+    Args:
+        order (np.ndarray): Row positions sorted by the old keys
+        rank (np.ndarray): rank[row] position of every row in ``order``
+        rows (np.ndarray): Rows whose keys changed (the keys already hold the new values)
+        keys (Sequence[np.ndarray]): Sort keys per row, primary key first
+        descending (bool): Whether the keys are sorted in descending order
+
+    Returns:
+        np.ndarray: The order sorted by the new keys
+    """
+    rows = np.unique(rows)
+    if len(rows) == 0:
+        return order
+
+    remaining = np.delete(order, rank[rows])
+
+    # Sort the changed rows among themselves so equal insertion points keep their order
+    sort_keys = [-key[rows] if descending else key[rows] for key in reversed(keys)]
+    rows = rows[np.lexsort([rows] + sort_keys)]
+
+    # Vectorized binary search: number of remaining rows sorting before each row
+    lo = np.zeros(len(rows), dtype=np.int64)
+    hi = np.full(len(rows), len(remaining), dtype=np.int64)
+    while True:
+        active = lo < hi
+        if not active.any():
+            break
+        mid = (lo + hi) // 2
+        before = _precedes(remaining[np.minimum(mid, len(remaining) - 1)], rows, keys, descending)
+        lo = np.where(active & before, mid + 1, lo)
+        hi = np.where(active & ~before, mid, hi)
+
+    return np.insert(remaining, lo, rows)
+
+def _lower_bound(order: np.ndarray, rank: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Vectorized binary search: number of entries of ``order`` ranked before each value.
+
+    ``order`` must be sorted by ``rank``. Only the probed entries are ranked,
+    so the cost is logarithmic in the length of ``order``.
+    """
+    lo = np.zeros(len(values), dtype=np.int64)
+    hi = np.full(len(values), len(order), dtype=np.int64)
+    while True:
+        active = lo < hi
+        if not active.any():
+            break
+        mid = (lo + hi) // 2
+        before = rank[order[np.minimum(mid, len(order) - 1)]] < values
+        lo = np.where(active & before, mid + 1, lo)
+        hi = np.where(active & ~before, mid, hi)
+    return lo
+
+def _move_positions(
+    order: np.ndarray,
+    rows: np.ndarray,
+    old_rank: np.ndarray,
+    new_rank: np.ndarray,
+    keep: np.ndarray = None
+):
+    """
+    Locate the rows to take out of a ranked subset and where to put them back.
+
+    Args:
+        order (np.ndarray): Subset of rows sorted by ``old_rank``
+        rows (np.ndarray): Unique rows whose rank changed; rows missing from
+            ``order`` are only inserted
+        old_rank (np.ndarray): Rank of every row before the change
+        new_rank (np.ndarray): Rank of every row after the change
+        keep (np.ndarray): Which of ``rows`` belong to the subset after the
+            change, or None for all of them
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Positions to delete from
+        ``order``, the rows to insert sorted by ``new_rank`` and their
+        insertion points in the order left after the deletion
+    """
+    positions = _lower_bound(order, old_rank, old_rank[rows])
+    present = positions < len(order)
+    present[present] = order[positions[present]] == rows[present]
+    removed = positions[present]
+
+    inserted = rows if keep is None else rows[keep]
+    inserted = inserted[np.argsort(new_rank[inserted], kind='stable')]
+    remaining = np.delete(order, removed)
+    return removed, inserted, _lower_bound(remaining, new_rank, new_rank[inserted])
+
+def move_rows(order: np.ndarray, rows: np.ndarray, old_rank: np.ndarray, new_rank: np.ndarray) -> np.ndarray:
+    """
+    Re-sort a ranked subset of rows after the rank of some rows changed.
+
+    The rows keep their relative order unless they are among ``rows``, so
+    only those are taken out and put back with a binary search instead of
+    sorting the subset again.
+
+    Args:
+        order (np.ndarray): Subset of rows sorted by ``old_rank``
+        rows (np.ndarray): Rows whose rank changed; rows missing from ``order`` are inserted
+        old_rank (np.ndarray): Rank of every row before the change
+        new_rank (np.ndarray): Rank of every row after the change
+
+    Returns:
+        np.ndarray: The subset sorted by ``new_rank``
+    """
+    rows = np.unique(rows)
+    if len(rows) == 0:
+        return order
+
+    removed, inserted, points = _move_positions(order, rows, old_rank, new_rank)
+    return np.insert(np.delete(order, removed), points, inserted.astype(order.dtype))
+
+def order_by_rank(rows: np.ndarray, rank: np.ndarray, limit: int = None) -> np.ndarray:
+    """
+    Order matching rows by rank, optionally keeping only the first few.
+
+    Only the matches are touched, so the cost depends on the number of matches
+    rather than on the size of the catalog.
+
+    Args:
+        rows (np.ndarray): Matching row positions
+        rank (np.ndarray): Rank of every row (lower is better)
+        limit (int): Number of rows to keep, or None to keep all
+
+    Returns:
+        np.ndarray: Matching rows from best to worst rank
+    """
+    rows = np.asarray(rows)
+    if limit is not None and len(rows) > limit:
+        rows = rows[np.argpartition(rank[rows], limit - 1)[:limit]]
+
+    return rows[np.argsort(rank[rows], kind='stable')]
+
+def _save_arrays(path: str, prefix: str, arrays: Dict[str, np.ndarray]):
+    """
+    Write arrays as .npy files named ``{prefix}{name}.npy`` into a directory.
+    """
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{prefix}{name}.npy'), np.ascontiguousarray(array), allow_pickle=False)
+
+def _load_arrays(path: str, prefix: str, names: Sequence[str], mmap: bool) -> Dict[str, np.ndarray]:
+    """
+    Load arrays written by _save_arrays(), memory-mapped if requested.
+    """
+    mmap_mode = 'r' if mmap else None
+    return {name: np.load(os.path.join(path, f'{prefix}{name}.npy'), mmap_mode=mmap_mode) for name in names}
+
+def _flatten(lists: Sequence[np.ndarray], dtype) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Concatenate arrays into CSR form: (indptr, values).
+    """
+    indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum([len(values) for values in lists], out=indptr[1:])
+    values = np.concatenate(lists).astype(dtype, copy=False) if lists else np.zeros(0, dtype=dtype)
+    return indptr, values
+
+def _split(indptr: np.ndarray, values: np.ndarray) -> List[np.ndarray]:
+    """
+    Slice CSR values back into one array per entry, without copying.
+    """
+    return [values[indptr[i]:indptr[i + 1]] for i in range(len(indptr) - 1)]
+
+class _Postings:
+    """
+    Ascending row lists per string key, flattened into one CSR array pair.
+
+    The rows of ``keys[i]`` are ``rows[indptr[i]:indptr[i + 1]]``. Rows added
+    later are kept per key in ``added`` until merged(), so extending the
+    catalog does not rewrite the arrays and loaded arrays can stay mapped.
+    """
+
+    def __init__(self, keys: Sequence[str], indptr: np.ndarray, rows: np.ndarray):
+        self.keys = pd.Index(keys, dtype=object)
+        self.indptr = indptr
+        self.rows = rows
+        self.added: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, row_keys: Iterable[Iterable[str]]) -> '_Postings':
+        """
+        Build the postings from the keys of every row, in row order.
+        """
+        row_keys = list(row_keys)
+        rows = np.repeat(np.arange(len(row_keys), dtype=np.int32), [len(values) for values in row_keys])
+        codes, uniques = pd.factorize(np.array(list(chain.from_iterable(row_keys)), dtype=object))
+
+        # A stable sort by key keeps the rows of every key ascending
+        indptr = np.zeros(len(uniques) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(uniques)), out=indptr[1:])
+        return cls(uniques, indptr, rows[np.argsort(codes, kind='stable')])
+
+    def add(self, row_keys: Iterable[Iterable[str]], first_row: int):
+        """
+        Append the keys of new rows, which follow every indexed row.
+        """
+        added = defaultdict(list)
+        for row, values in enumerate(row_keys, start=first_row):
+            for key in values:
+                added[key].append(row)
+        empty = np.zeros(0, dtype=np.int32)
+        for key, rows in added.items():
+            self.added[key] = np.append(self.added.get(key, empty), np.array(rows, dtype=np.int32))
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Rows of a key in ascending order, or None for an unknown key.
+        """
+        try:
+            position = self.keys.get_loc(key)
+        except KeyError:
+            return self.added.get(key)
+
+        rows = self.rows[self.indptr[position]:self.indptr[position + 1]]
+        added = self.added.get(key)
+        return rows if added is None else np.concatenate([rows, added])
+
+    def best_rows(self, keys: Sequence[str], rank: np.ndarray) -> np.ndarray:
+        """
+        Best ranked row of every key, -1 for unknown keys.
+
+        Keys are looked up in one vectorized pass; only keys with several rows
+        or with added rows are ranked one by one.
+
+        Args:
+            keys (Sequence[str]): Keys to look up
+            rank (np.ndarray): Rank of every row (lower is better)
+
+        Returns:
+            np.ndarray: int64 row per key
+        """
+        positions = self.keys.get_indexer(keys)
+        found = np.flatnonzero(positions >= 0)
+        best = np.full(len(positions), -1, dtype=np.int64)
+        starts = self.indptr[positions[found]]
+        best[found] = self.rows[starts]
+
+        several = found[self.indptr[positions[found] + 1] - starts > 1]
+        if self.added:
+            several = np.union1d(several, np.flatnonzero(pd.Index(list(self.added)).get_indexer(keys) >= 0))
+        for i in several.tolist():
+            rows = self.get(keys[i])
+            best[i] = rows[np.argmin(rank[rows])]
+        return best
+
+    def all_keys(self) -> List[str]:
+        return self.keys.tolist() + [key for key in self.added if key not in self.keys]
+
+    def merged(self) -> '_Postings':
+        """
+        Postings with the added rows folded into the CSR arrays.
+        """
+        if not self.added:
+            return self
+
+        keys = pd.Index(self.all_keys(), dtype=object)
+        added_codes = keys.get_indexer(list(self.added))
+        lengths = [len(rows) for rows in self.added.values()]
+        codes = np.concatenate([
+            np.repeat(np.arange(len(self.keys)), np.diff(self.indptr)),
+            np.repeat(added_codes, lengths)
+        ])
+        rows = np.concatenate([self.rows, *self.added.values()])
+
+        # Added rows follow the indexed ones, so a stable sort keeps them ascending
+        indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(keys)), out=indptr[1:])
+        return _Postings(keys, indptr, rows[np.argsort(codes, kind='stable')])
+
+def _genre_keys(genres: Iterable[str]) -> List[str]:
+    return pd.Series(list(genres), dtype=object).fillna('').astype(str).tolist()
+
+class SearchIndex:
+    """
+    Lowercased title and genre lookup structures built once per catalog.
+
+    Titles are indexed with exact-match postings and a character trigram
+    inverted index for substring queries. Genre strings are factorized so a
+    genre query only scans the distinct genre combinations. Every posting
+    list is a slice of flat arrays, which save() writes as .npy files.
+    """
+
+    NGRAM = 3
+
+    ARRAYS = ('gram_keys', 'gram_indptr', 'gram_rows', 'exact_indptr', 'exact_rows', 'genre_indptr', 'genre_rows')
+
+    def __init__(self, titles: Iterable[str], genres: Iterable[str]):
+        """
+        Build the index.
+
+        Args:
+            titles (Iterable[str]): Clean title of every movie, in row order
+            genres (Iterable[str]): Pipe-delimited genres of every movie, in row order
+        """
+        self.titles_lower: List[str] = [str(title).lower() for title in titles]
+
+        # Exact match: lowercase title -> rows
+        self.exact = _Postings.build([title] for title in self.titles_lower)
+
+        # Substring match: trigram -> rows (ascending)
+        self.postings = _Postings.build(self._ngrams(title) for title in self.titles_lower)
+
+        # Genre strings: distinct combinations -> rows
+        self.genre_rows = _Postings.build([value] for value in _genre_keys(genres))
+        self._index_genre_strings()
+
+    def _index_genre_strings(self):
+        self.genre_strings = self.genre_rows.all_keys()
+        self.genre_strings_lower: List[str] = [value.lower() for value in self.genre_strings]
+
+    def add(self, titles: Iterable[str], genres: Iterable[str]):
+        """
+        Append movies to the index. New rows follow the existing rows, so every
+        posting list stays in ascending order.
+
+        Args:
+            titles (Iterable[str]): Clean title of every new movie
+            genres (Iterable[str]): Pipe-delimited genres of every new movie
+        """
+        first_row = len(self.titles_lower)
+        new_titles = [str(title).lower() for title in titles]
+        self.titles_lower.extend(new_titles)
+
+        self.exact.add(([title] for title in new_titles), first_row)
+        self.postings.add((self._ngrams(title) for title in new_titles), first_row)
+        self.genre_rows.add(([value] for value in _genre_keys(genres)), first_row)
+        self._index_genre_strings()
+
+    def save(self, path: str, prefix: str = 'search_'):
+        """
+        Write the posting arrays as .npy files into a directory.
+
+        The exact-match and genre keys are not written: load() reads them
+        from the first row of every posting list.
+
+        Args:
+            path (str): Directory to write to
+            prefix (str): File name prefix of the arrays
+        """
+        postings, exact, genre_rows = (
+            postings.merged() for postings in (self.postings, self.exact, self.genre_rows)
+        )
+        _save_arrays(path, prefix, {
+            'gram_keys': np.array(postings.keys.tolist(), dtype=f'<U{self.NGRAM}'),
+            'gram_indptr': postings.indptr,
+            'gram_rows': postings.rows,
+            'exact_indptr': exact.indptr,
+            'exact_rows': exact.rows,
+            'genre_indptr': genre_rows.indptr,
+            'genre_rows': genre_rows.rows
+        })
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        titles: Iterable[str],
+        genres: Iterable[str],
+        prefix: str = 'search_',
+        mmap: bool = True
+    ) -> 'SearchIndex':
+        """
+        Load an index written by save().
+
+        Args:
+            path (str): Directory the index was saved to
+            titles (Iterable[str]): Clean title of every movie, in row order
+            genres (Iterable[str]): Pipe-delimited genres of every movie, in row order
+            prefix (str): File name prefix of the arrays
+            mmap (bool): Memory-map the arrays instead of reading them
+
+        Returns:
+            SearchIndex: The loaded index
+        """
+        arrays = _load_arrays(path, prefix, cls.ARRAYS, mmap)
+        index = cls.__new__(cls)
+        index.titles_lower = [str(title).lower() for title in titles]
+
+        def postings(name: str, values: np.ndarray) -> _Postings:
+            indptr, rows = arrays[f'{name}_indptr'], arrays[f'{name}_rows']
+            return _Postings(values[rows[indptr[:-1]]], indptr, rows)
+
+        index.exact = postings('exact', np.array(index.titles_lower, dtype=object))
+        index.postings = _Postings(arrays['gram_keys'].tolist(), arrays['gram_indptr'], arrays['gram_rows'])
+        index.genre_rows = postings('genre', np.array(_genre_keys(genres), dtype=object))
+        index._index_genre_strings()
+        return index
+
+    @classmethod
+    def _ngrams(cls, text: str) -> set:
+        return {text[i:i + cls.NGRAM] for i in range(len(text) - cls.NGRAM + 1)}
+
+    def find_exact(self, query: str) -> np.ndarray:
+        """
+        Get rows whose title equals the query (case-insensitive).
+
+        Args:
+            query (str): Title to look up
+
+        Returns:
+            np.ndarray: Matching row positions
+        """
+        rows = self.exact.get(query.lower())
+        return np.zeros(0, dtype=np.int32) if rows is None else rows
+
+    def find_exact_best(self, queries: Sequence[str], rank: np.ndarray) -> np.ndarray:
+        """
+        Resolve many titles to the best ranked row with an equal title
+        (case-insensitive, surrounding whitespace ignored).
+
+        Args:
+            queries (Sequence[str]): Titles to look up
+            rank (np.ndarray): Rank of every row (lower is better)
+
+        Returns:
+            np.ndarray: int64 row per title, -1 when no title is equal
+        """
+        queries = pd.Series(list(queries), dtype=object).str.strip().str.lower().tolist()
+        return self.exact.best_rows(queries, rank)
+
+    def find_title(self, query: str) -> np.ndarray:
+        """
+        Get rows whose title contains the query (case-insensitive).
+
+        Args:
+            query (str): Substring to look for
+
+        Returns:
+            np.ndarray: Matching row positions in ascending order
+        """
+        query = query.lower()
+
+        # Queries shorter than a trigram cannot use the inverted index
+        if len(query) < self.NGRAM:
+            return np.array(
+                [row for row, title in enumerate(self.titles_lower) if query in title],
+                dtype=np.int32
+            )
+
+        # Intersect the posting lists, shortest first
+        lists = []
+        for gram in self._ngrams(query):
+            rows = self.postings.get(gram)
+            if rows is None:
+                return np.zeros(0, dtype=np.int32)
+            lists.append(rows)
+        lists.sort(key=len)
+
+        candidates = lists[0]
+        for rows in lists[1:]:
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+            if len(candidates) == 0:
+                return candidates
+
+        # Trigrams can match out of order, so verify the candidates
+        return np.array(
+            [row for row in candidates.tolist() if query in self.titles_lower[row]],
+            dtype=np.int32
+        )
+
+    def find_genres(self, query: str) -> np.ndarray:
+        """
+        Get rows whose genre string contains the query (case-insensitive).
+
+        Args:
+            query (str): Substring to look for
+
+        Returns:
+            np.ndarray: Matching row positions
+        """
+        query = query.lower()
+        matches = [
+            self.genre_rows.get(value)
+            for value, lower in zip(self.genre_strings, self.genre_strings_lower)
+            if query in lower
+        ]
+
+        return np.concatenate(matches) if matches else np.zeros(0, dtype=np.int32)
+
+class GenreIndex:
+    """
+    Multi-hot genre bitmasks with a popularity-sorted row list per genre.
+
+    Every movie gets one unsigned integer whose bit ``i`` is set when the movie
+    has genre ``names[i]``, so AND/OR genre filters are vectorized bit
+    operations and "top N in a genre" is a slice.
+    """
+
+    def __init__(self, genres: Iterable[str], order: np.ndarray):
+        """
+        Build the index.
+
+        Args:
+            genres (Iterable[str]): Pipe-delimited genres of every movie, in row order
+            order (np.ndarray): Row positions from most to least popular
+        """
+        self.genres: List[str] = list(genres)
+        self._build_masks()
+        self.reorder(order)
+
+    def _build_masks(self):
+        """
+        Assign genre bits and compute the bitmask of every movie.
+        """
+        # Parse each distinct genre combination only once
+        codes, uniques = pd.factorize(pd.Series(self.genres, dtype=object).fillna(''))
+        parsed = [[name for name in str(value).split('|') if name] for value in uniques]
+
+        self.names: List[str] = sorted({name for names in parsed for name in names})
+        if len(self.names) > 64:
+            raise ValueError(f"GenreIndex supports at most 64 genres, got {len(self.names)}")
+        self.dtype = np.uint32 if len(self.names) <= 32 else np.uint64
+        self.bit_of: Dict[str, int] = {name.lower(): bit for bit, name in enumerate(self.names)}
+
+        unique_masks = np.array(
+            [sum(1 << self.bit_of[name.lower()] for name in names) for names in parsed],
+            dtype=self.dtype
+        )
+        self.masks: np.ndarray = unique_masks[codes] if len(codes) else np.zeros(0, dtype=self.dtype)
+
+    def add(self, genres: Iterable[str], order: np.ndarray):
+        """
+        Append movies to the index.
+
+        Bits are only reassigned (and every mask recomputed) when the new
+        movies introduce a genre name that is not indexed yet.
+
+        Args:
+            genres (Iterable[str]): Pipe-delimited genres of every new movie
+            order (np.ndarray): Popularity order of the extended catalog
+        """
+        genres = list(genres)
+        self.genres.extend(genres)
+        parsed = [
+            [name for name in str(value).split('|') if name] if not pd.isna(value) else []
+            for value in genres
+        ]
+
+        if any(name.lower() not in self.bit_of for names in parsed for name in names):
+            self._build_masks()
+        else:
+            new_masks = np.array(
+                [sum(1 << self.bit_of[name.lower()] for name in names) for names in parsed],
+                dtype=self.dtype
+            )
+            self.masks = np.concatenate([self.masks, new_masks])
+        self.reorder(order)
+
+    def reorder(self, order: np.ndarray):
+        """
+        Rebuild the per-genre row lists from a new popularity order.
+
+        Args:
+            order (np.ndarray): Row positions from most to least popular
+        """
+        ordered_masks = self.masks[order]
+        self.by_genre: List[np.ndarray] = [
+            order[(ordered_masks & self.dtype(1 << bit)) != 0] for bit in range(len(self.names))
+        ]
+
+    def save(self, path: str, prefix: str = 'genre_'):
+        """
+        Write the genre names, the bitmasks and the per-genre row lists as
+        .npy files into a directory.
+
+        Args:
+            path (str): Directory to write to
+            prefix (str): File name prefix of the arrays
+        """
+        indptr, rows = _flatten(self.by_genre, np.int64)
+        _save_arrays(path, prefix, {
+            'names': np.array(self.names, dtype=str),
+            'masks': self.masks,
+            'indptr': indptr,
+            'rows': rows
+        })
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        genres: Iterable[str],
+        prefix: str = 'genre_',
+        mmap: bool = True
+    ) -> 'GenreIndex':
+        """
+        Load an index written by save().
+
+        Args:
+            path (str): Directory the index was saved to
+            genres (Iterable[str]): Pipe-delimited genres of every movie, in row order
+            prefix (str): File name prefix of the arrays
+            mmap (bool): Memory-map the arrays instead of reading them
+
+        Returns:
+            GenreIndex: The loaded index
+        """
+        arrays = _load_arrays(path, prefix, ('names', 'masks', 'indptr', 'rows'), mmap)
+        index = cls.__new__(cls)
+        index.genres = list(genres)
+        index.names = arrays['names'].tolist()
+        index.dtype = np.uint32 if len(index.names) <= 32 else np.uint64
+        index.bit_of = {name.lower(): bit for bit, name in enumerate(index.names)}
+        index.masks = arrays['masks']
+        index.by_genre = _split(arrays['indptr'], arrays['rows'])
+        return index
+
+    def update(self, rows: np.ndarray, old_rank: np.ndarray, new_rank: np.ndarray):
+        """
+        Move movies whose popularity changed within the row lists of their genres.
+
+        Args:
+            rows (np.ndarray): Rows whose popularity rank changed
+            old_rank (np.ndarray): Popularity rank of every row before the change
+            new_rank (np.ndarray): Popularity rank of every row after the change
+        """
+        rows = np.unique(rows)
+        if len(rows) == 0:
+            return
+
+        masks = self.masks[rows]
+        for bit in self.bits(int(np.bitwise_or.reduce(masks))):
+            members = rows[(masks & self.dtype(1 << bit)) != 0]
+            self.by_genre[bit] = move_rows(self.by_genre[bit], members, old_rank, new_rank)
+
+    def resolve(self, genre: str) -> int:
+        """
+        Turn a genre name into a bitmask (case-insensitive).
+
+        An exact genre name selects that genre; otherwise every genre whose name
+        contains the query is selected.
+
+        Args:
+            genre (str): Genre name or part of one
+
+        Returns:
+            int: Bitmask of the matching genres (0 if none match)
+        """
+        genre = genre.strip().lower()
+        if genre in self.bit_of:
+            return 1 << self.bit_of[genre]
+
+        mask = 0
+        for name, bit in self.bit_of.items():
+            if genre in name:
+                mask |= 1 << bit
+        return mask
+
+    def bits(self, mask: int) -> List[int]:
+        return [bit for bit in range(len(self.names)) if mask >> bit & 1]
+
+    def count(self, genre: str) -> int:
+        """
+        Count the movies tagged with any genre matching the query.
+        """
+        return int(((self.masks & self.dtype(self.resolve(genre))) != 0).sum())
+
+    def top_rows(
+        self,
+        genres: List[str],
+        rank: np.ndarray,
+        n: int,
+        match: str = 'any'
+    ) -> np.ndarray:
+        """
+        Get the most popular movies matching a genre filter.
+
+        Args:
+            genres (List[str]): Genre names to filter by
+            rank (np.ndarray): Popularity rank of every row
+            n (int): Number of rows to return
+            match (str): 'any' for movies with at least one of the genres,
+                'all' for movies with every genre
+
+        Returns:
+            np.ndarray: Matching rows from most to least popular
+        """
+        if match not in ('any', 'all'):
+            raise ValueError(f"Unknown genre match '{match}', expected 'any' or 'all'")
+
+        masks = [self.resolve(genre) for genre in genres]
+        if not any(masks) or (match == 'all' and not all(masks)):
+            return np.zeros(0, dtype=np.int64)
+        masks = [mask for mask in masks if mask]
+
+        if match == 'any':
+            combined = 0
+            for mask in masks:
+                combined |= mask
+            bits = self.bits(combined)
+            if len(bits) == 1:
+                return self.by_genre[bits[0]][:n]
+
+            # The top N of a union is within the top N of each genre
+            candidates = np.unique(np.concatenate([self.by_genre[bit][:n] for bit in bits]))
+            return order_by_rank(candidates, rank, n)
+
+        # Walk the rarest genre in popularity order and keep rows having the others
+        rarest = min(masks, key=lambda mask: sum(len(self.by_genre[bit]) for bit in self.bits(mask)))
+        bits = self.bits(rarest)
+        if len(bits) == 1:
+            rows = self.by_genre[bits[0]]
+        else:
+            rows = order_by_rank(np.unique(np.concatenate([self.by_genre[bit] for bit in bits])), rank)
+
+        for mask in masks:
+            rows = rows[(self.masks[rows] & self.dtype(mask)) != 0]
+        return rows[:n]
+
+class RatingRangeIndex:
+    """
+    Movies pre-sorted by average rating with a ladder of rating-count thresholds.
+
+    Level ``i`` holds the movies with at least ``thresholds[i]`` ratings (powers
+    of two), sorted by average rating. A query with ``min_count = k`` uses the
+    largest threshold ``<= k``, so at least half of the scanned count range
+    qualifies and the [min, max] rating range is a binary search.
+    """
+
+    def __init__(self, avg_rating: np.ndarray, rating_count: np.ndarray):
+        """
+        Build the index.
+
+        Args:
+            avg_rating (np.ndarray): Average rating per movie
+            rating_count (np.ndarray): Number of ratings per movie
+        """
+        self.avg_rating = avg_rating
+        self.rating_count = rating_count
+        self.order = np.lexsort((np.arange(len(avg_rating)), -rating_count, -avg_rating))
+        self.rank = inverse_permutation(self.order)
+        self._build_levels()
+
+    def save(self, path: str, prefix: str = 'rating_index_'):
+        """
+        Write the sorted order and the levels as .npy files into a directory.
+
+        Args:
+            path (str): Directory to write to
+            prefix (str): File name prefix of the arrays
+        """
+        indptr, rows = _flatten(self.levels, np.int32)
+        _save_arrays(path, prefix, {
+            'order': self.order,
+            'thresholds': self.thresholds,
+            'level_indptr': indptr,
+            'level_rows': rows,
+            'level_keys': _flatten(self.level_keys, np.float64)[1]
+        })
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        avg_rating: np.ndarray,
+        rating_count: np.ndarray,
+        prefix: str = 'rating_index_',
+        mmap: bool = True
+    ) -> 'RatingRangeIndex':
+        """
+        Load an index written by save().
+
+        Args:
+            path (str): Directory the index was saved to
+            avg_rating (np.ndarray): Average rating per movie
+            rating_count (np.ndarray): Number of ratings per movie
+            prefix (str): File name prefix of the arrays
+            mmap (bool): Memory-map the arrays instead of reading them
+
+        Returns:
+            RatingRangeIndex: The loaded index
+        """
+        arrays = _load_arrays(path, prefix, ('order', 'thresholds', 'level_indptr', 'level_rows', 'level_keys'), mmap)
+        index = cls.__new__(cls)
+        index.avg_rating = avg_rating
+        index.rating_count = rating_count
+        index.order = arrays['order']
+        index.rank = inverse_permutation(index.order)
+        index.thresholds = arrays['thresholds']
+        index.levels = _split(arrays['level_indptr'], arrays['level_rows'])
+        index.level_keys = _split(arrays['level_indptr'], arrays['level_keys'])
+        return index
+
+    def update(self, rows: np.ndarray):
+        """
+        Reposition movies whose statistics changed in place.
+
+        The ``avg_rating`` and ``rating_count`` arrays passed to the constructor
+        must already hold the new values.
+
+        Only the changed rows are moved within the sorted order and within
+        the levels, which they may also newly join.
+
+        Args:
+            rows (np.ndarray): Rows whose average rating or rating count changed
+        """
+        rows = np.unique(rows)
+        if len(rows) == 0:
+            return
+
+        old_rank = self.rank
+        self.order = reinsert_rows(self.order, self.rank, rows, (self.avg_rating, self.rating_count))
+        self.rank = inverse_permutation(self.order)
+
+        counts = self.rating_count[rows]
+        for level, threshold in enumerate(self.thresholds):
+            removed, inserted, points = _move_positions(
+                self.levels[level], rows, old_rank, self.rank, keep=counts >= threshold
+            )
+            self.levels[level] = np.insert(
+                np.delete(self.levels[level], removed), points, inserted.astype(np.int32)
+            )
+            self.level_keys[level] = np.insert(
+                np.delete(self.level_keys[level], removed), points, -self.avg_rating[inserted]
+            )
+
+        # Movies above the highest threshold open new levels, taken from the last one
+        while counts.max() >= 2 * self.thresholds[-1]:
+            threshold = 2 * int(self.thresholds[-1])
+            last = self.levels[-1]
+            selected = self.rating_count[last] >= threshold
+            self.thresholds = np.append(self.thresholds, threshold)
+            self.levels.append(last[selected])
+            self.level_keys.append(self.level_keys[-1][selected])
+
+    def extend(self, avg_rating: np.ndarray, rating_count: np.ndarray):
+        """
+        Index movies appended to the end of the statistics arrays.
+
+        Args:
+            avg_rating (np.ndarray): Average rating per movie, including the new movies
+            rating_count (np.ndarray): Number of ratings per movie, including the new movies
+        """
+        first_row = len(self.order)
+        self.avg_rating = avg_rating
+        self.rating_count = rating_count
+
+        # Append the new rows at the end, then move them into place
+        new_rows = np.arange(first_row, len(avg_rating))
+        self.order = np.concatenate([self.order, new_rows])
+        self.rank = np.concatenate([self.rank, new_rows])
+        self.update(new_rows)
+
+    def _build_levels(self):
+        """
+        Derive the threshold levels from the sorted order.
+        """
+        max_count = int(self.rating_count.max()) if len(self.rating_count) else 0
+        self.thresholds = np.array(
+            [0] + [1 << i for i in range(max(max_count, 1).bit_length())],
+            dtype=np.int64
+        )
+
+        ordered_counts = self.rating_count[self.order]
+        self.levels: List[np.ndarray] = []
+        self.level_keys: List[np.ndarray] = []
+        for threshold in self.thresholds:
+            rows = self.order[ordered_counts >= threshold].astype(np.int32)
+            self.levels.append(rows)
+            # Negated so the keys are ascending for searchsorted
+            self.level_keys.append(-self.avg_rating[rows])
+
+    def top_rows(self, min_rating: float, max_rating: float, min_count: int, n: int) -> np.ndarray:
+        """
+        Get the best rated movies in a rating range with enough ratings.
+
+        Args:
+            min_rating (float): Minimum average rating
+            max_rating (float): Maximum average rating
+            min_count (int): Minimum number of ratings
+            n (int): Number of rows to return
+
+        Returns:
+            np.ndarray: Matching rows by descending average rating
+        """
+        level = max(int(np.searchsorted(self.thresholds, min_count, side='right')) - 1, 0)
+        rows = self.levels[level]
+        keys = self.level_keys[level]
+
+        start = int(np.searchsorted(keys, -max_rating, side='left'))
+        end = int(np.searchsorted(keys, -min_rating, side='right'))
+
+        # Scan the rating range in growing windows until N rows pass
+        found = []
+        n_found = 0
+        window = max(2 * n, 16)
+        while start < end and n_found < n:
+            chunk = rows[start:min(start + window, end)]
+            chunk = chunk[self.rating_count[chunk] >= min_count]
+            found.append(chunk)
+            n_found += len(chunk)
+            start += window
+            window *= 2
+
+        if not found:
+            return np.zeros(0, dtype=np.int32)
+        return np.concatenate(found)[:n]
@@ -1,86 +1,1162 @@
 import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import StandardScaler
+from sklearn.preprocessing import StandardScaler, normalize
+import scipy.sparse as sp
+import json
+import multiprocessing
+import os
 import re
-from typing import List, Tuple, Optional
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Tuple, Optional
+from similarity import NeighborIndex, build_neighbor_index, extend_neighbor_index, similarity_matrix, top_k_rows
+from ann_index import IVFIndex
+from collaborative import ItemItemCF, MatrixFactorization
+from user_history import UserHistoryIndex
+from feature_builder import HashingTfidfVectorizer
+from movie_dataset import MovieDataset
+from data_cache import file_fingerprint, fingerprint_matches, read_column_cache, write_column_cache
+from movie_indexes import SearchIndex, GenreIndex, RatingRangeIndex, popularity_order, inverse_permutation, order_by_rank, reinsert_rows
+
+SIMILARITY_BACKENDS = ('neighbors', 'dense', 'ann')
+
+FEATURE_BUILDERS = ('tfidf', 'hashing')
+
+# TF-IDF settings used to build the content features
+TFIDF_PARAMS = {
+    'stop_words': 'english',
+    'max_features': 5000,
+    'ngram_range': (1, 2)
+}
+
+# HashingTfidfVectorizer settings of the 'hashing' feature builder
+HASHING_PARAMS = {
+    'stop_words': 'english',
+    'n_features': 2 ** 18,
+    'ngram_range': (1, 2)
+}
+
+# Default blend of the hybrid scorer
+HYBRID_WEIGHTS = {
+    'content': 0.5,
+    'collaborative': 0.35,
+    'popularity': 0.15
+}
+
+# Number of pseudo-ratings at the global mean in the popularity prior
+PRIOR_STRENGTH = 10
+
+# Vocabulary drift at which add_movies() starts a background refit
+DRIFT_THRESHOLD = 0.05
+
+# Bump whenever the on-disk layout written by MovieRecommender.save changes
+MODEL_FORMAT_VERSION = 2
+
+# State inherited by the forked workers of MovieRecommender.recommend_all_users
+_BULK_STATE = None
+
+def _score_user_block(bounds: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score one block of users in a bulk recommendation worker.
+    """
+    recommender, indptr, movie_rows, ratings, n_recommendations, eligible = _BULK_STATE
+    start, end = bounds
+    lo, hi = indptr[start], indptr[end]
+    return recommender._score_user_histories(
+        indptr[start:end + 1] - lo, movie_rows[lo:hi], ratings[lo:hi], n_recommendations, eligible
+    )
+
+class MovieResults:
+    """
+    Columnar query result: one NumPy array per field, gathered in one step.
+    
+    Iterating yields the same tuples as the list-returning query methods:
+    (title, similarity_score, genres, avg_rating, rating_count) when scores are
+    present, otherwise (title, genres, avg_rating, rating_count).
+    """
+    
+    __slots__ = ('indices', 'titles', 'genres', 'avg_ratings', 'rating_counts', 'scores')
+    
+    def __init__(
+        self, 
+        indices: np.ndarray, 
+        titles: np.ndarray, 
+        genres: np.ndarray, 
+        avg_ratings: np.ndarray, 
+        rating_counts: np.ndarray,
+        scores: Optional[np.ndarray] = None
+    ):
+        self.indices = indices
+        self.titles = titles
+        self.genres = genres
+        self.avg_ratings = avg_ratings
+        self.rating_counts = rating_counts
+        self.scores = scores
+    
+    def __len__(self) -> int:
+        return len(self.indices)
+    
+    def __iter__(self):
+        return iter(self.to_tuples())
+    
+    def to_tuples(self) -> List[tuple]:
+        """
+        Convert to the tuple-list format returned by the query methods.
+        
+        Returns:
+            List[Tuple]: One tuple per movie
+        """
+        columns = [
+            self.titles.tolist(),
+            self.genres.tolist(),
+            self.avg_ratings.tolist(),
+            self.rating_counts.tolist()
+        ]
+        if self.scores is not None:
+            columns.insert(1, self.scores.tolist())
+        
+        return list(zip(*columns))
+    
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Convert to a DataFrame with one column per field.
+        
+        Returns:
+            pd.DataFrame: Columns title, [similarity_score,] genres, avg_rating, rating_count
+        """
+        data = {'title': self.titles}
+        if self.scores is not None:
+            data['similarity_score'] = self.scores
+        data.update({
+            'genres': self.genres,
+            'avg_rating': self.avg_ratings,
+            'rating_count': self.rating_counts
+        })
+        
+        return pd.DataFrame(data, index=self.indices)
+    
+    def to_records(self) -> np.ndarray:
+        """
+        Convert to a NumPy structured array.
+        
+        Returns:
+            np.ndarray: Structured array with one field per column
+        """
+        frame = self.to_frame()
+        return frame.to_records(index=False)
 
 class MovieRecommender:
-    def __init__(self, movies_df: pd.DataFrame, ratings_df: pd.DataFrame):
+    def __init__(
+        self, 
+        movies_df: pd.DataFrame, 
+        ratings_df: pd.DataFrame,
+        similarity_backend: str = 'neighbors',
+        n_neighbors: int = 100,
+        ann_params: Optional[dict] = None,
+        tfidf_params: Optional[dict] = None,
+        feature_builder: str = 'tfidf'
+    ):
         """
         Initialize the MovieRecommender with movie and rating data.
         
         Args:
             movies_df (pd.DataFrame): DataFrame containing movie information
             ratings_df (pd.DataFrame): DataFrame containing rating information
+            similarity_backend (str): 'neighbors' keeps only the top-K neighbors
+                per movie; 'dense' also builds the full N x N cosine matrix;
+                'ann' answers queries from an approximate IVF index
+            n_neighbors (int): Number of neighbors kept per movie
+            ann_params (dict): IVFIndex settings for the 'ann' backend
+            tfidf_params (dict): Vectorizer settings overriding TFIDF_PARAMS
+                (or HASHING_PARAMS for the 'hashing' builder)
+            feature_builder (str): 'tfidf' fits a TfidfVectorizer vocabulary;
+                'hashing' uses HashingTfidfVectorizer, which needs no vocabulary,
+                hashes the catalog in parallel chunks and returns float32
+        """
+        self._build(
+            MovieDataset(movies_df, ratings_df), similarity_backend, n_neighbors, ann_params, tfidf_params,
+            feature_builder
+        )
+    
+    @classmethod
+    def from_dataset(cls, dataset: MovieDataset, **kwargs) -> 'MovieRecommender':
+        """
+        Build a recommender on a dataset whose statistics are already computed.
+        
+        The dataset's frames are used without copying, so a MovieDataAnalyzer
+        and a recommender built from one dataset share the data in memory.
+        
+        Args:
+            dataset (MovieDataset): Movies, ratings and per-movie statistics
+            **kwargs: Constructor arguments (similarity_backend, n_neighbors, ...)
+            
+        Returns:
+            MovieRecommender: The built recommender
         """
-        self.movies_df = movies_df.copy()
-        self.ratings_df = ratings_df.copy()
+        if dataset.ratings_df is None:
+            raise ValueError("MovieRecommender needs the individual ratings; a dataset built from streamed statistics has none")
+        
+        recommender = cls.__new__(cls)
+        recommender._build(dataset, **kwargs)
+        return recommender
+    
+    def _build(
+        self,
+        dataset: MovieDataset,
+        similarity_backend: str = 'neighbors',
+        n_neighbors: int = 100,
+        ann_params: Optional[dict] = None,
+        tfidf_params: Optional[dict] = None,
+        feature_builder: str = 'tfidf'
+    ):
+        if similarity_backend not in SIMILARITY_BACKENDS:
+            raise ValueError(
+                f"Unknown similarity backend '{similarity_backend}', "
+                f"expected one of {SIMILARITY_BACKENDS}"
+            )
+        if feature_builder not in FEATURE_BUILDERS:
+            raise ValueError(
+                f"Unknown feature builder '{feature_builder}', "
+                f"expected one of {FEATURE_BUILDERS}"
+            )
+        
+        # The input frames are never modified in place, so they are not copied
+        self.movies_df = dataset.movies_df
+        self.ratings_df = dataset.ratings_df
+        self.similarity_backend = similarity_backend
+        self.n_neighbors = n_neighbors
+        self.ann_params = dict(ann_params or {})
+        self.feature_builder = feature_builder
+        default_params = HASHING_PARAMS if feature_builder == 'hashing' else TFIDF_PARAMS
+        self.tfidf_params = {**default_params, **(tfidf_params or {})}
         self.movies_with_ratings = None
         self.tfidf_matrix = None
         self.cosine_sim = None
+        self.neighbor_index: Optional[NeighborIndex] = None
+        self.ann_index: Optional[IVFIndex] = None
         self.tfidf_vectorizer = None
+        self.item_cf: Optional[ItemItemCF] = None
+        self.matrix_factorization: Optional[MatrixFactorization] = None
+        self._init_incremental_state()
         
         # Prepare the data
-        self._prepare_data()
+        self._prepare_data(dataset)
         self._build_similarity_matrix()
+        self._build_lookup_indexes()
+        self._user_history = UserHistoryIndex.from_ratings(self.ratings_df, self._movie_rows.to_numpy())
     
-    def _prepare_data(self):
+    @property
+    def ratings_df(self) -> pd.DataFrame:
         """
-        Prepare and merge movie and rating data.
+        All ratings, including the batches added with add_ratings().
+        
+        Added batches are concatenated on first access instead of on every
+        add_ratings() call.
         """
-        # Calculate average ratings and rating counts
-        rating_stats = self.ratings_df.groupby('movieId').agg({
-            'rating': ['mean', 'count']
-        }).reset_index()
+        if self._pending_ratings:
+            self._ratings_df = pd.concat([self._ratings_df, *self._pending_ratings], ignore_index=True)
+            self._pending_ratings = []
+        return self._ratings_df
+    
+    @ratings_df.setter
+    def ratings_df(self, ratings_df: pd.DataFrame):
+        self._ratings_df = ratings_df
+        self._pending_ratings = []
+    
+    @property
+    def user_history(self) -> UserHistoryIndex:
+        """
+        Per-user and per-movie rating histories aligned with the catalog rows.
         
-        # Flatten column names
-        rating_stats.columns = ['movieId', 'avg_rating', 'rating_count']
+        Built once with the recommender (or loaded with the model) and
+        extended by add_ratings(); adding movies invalidates it and it is
+        rebuilt on next access.
+        """
+        if self._user_history is None:
+            self._user_history = UserHistoryIndex.from_ratings(self.ratings_df, self._movie_rows.to_numpy())
+        return self._user_history
+    
+    def _init_incremental_state(self, drift: Optional[dict] = None):
+        """
+        Set up the lock, refit thread and drift counters used by add_movies().
         
-        # Merge with movies dataframe
-        self.movies_with_ratings = self.movies_df.merge(
-            rating_stats, on='movieId', how='left'
-        )
+        Args:
+            drift (dict): Saved drift counters, or None right after a fit
+        """
+        drift = drift or {}
+        self._lock = threading.RLock()
+        self._refit_thread: Optional[threading.Thread] = None
+        self._added_movies = drift.get('added_movies', 0)
+        self._added_terms = drift.get('added_terms', 0)
+        self._oov_terms = drift.get('oov_terms', 0)
+    
+    def _prepare_data(self, dataset: MovieDataset):
+        """
+        Prepare the movie frame from the dataset's per-movie rating statistics.
+        
+        Args:
+            dataset (MovieDataset): Movies, ratings and per-movie statistics
+        """
+        # Shallow copy: the movie columns stay shared with the dataset, and
+        # rows are labelled by position
+        self.movies_with_ratings = dataset.movies_df.copy(deep=False)
+        self.movies_with_ratings.index = pd.RangeIndex(len(self.movies_with_ratings))
+        self._init_rating_stats(dataset.avg_rating, dataset.rating_count, dataset.rating_sum)
+        self._add_text_features()
+    
+    def _init_rating_stats(self, avg_rating, rating_count, rating_sum=None):
+        """
+        Copy the rating statistics into writable arrays for vectorized filtering
+        and for the running sums updated by add_ratings(), and set the
+        avg_rating and rating_count columns from them.
         
-        # Fill NaN values
-        self.movies_with_ratings['avg_rating'] = self.movies_with_ratings['avg_rating'].fillna(0)
-        self.movies_with_ratings['rating_count'] = self.movies_with_ratings['rating_count'].fillna(0)
+        Args:
+            avg_rating: Mean rating per movie
+            rating_count: Number of ratings per movie
+            rating_sum: Sum of the ratings per movie; derived from the mean and
+                count when not available
+        """
+        self._avg_rating = np.array(avg_rating, dtype=np.float64)
+        self._rating_count = np.array(rating_count, dtype=np.float64)
+        if rating_sum is None:
+            self._rating_sum = self._avg_rating * self._rating_count
+        else:
+            self._rating_sum = np.array(rating_sum, dtype=np.float64)
+        
+        self.movies_with_ratings['avg_rating'] = self._avg_rating.copy()
+        self.movies_with_ratings['rating_count'] = self._rating_count.copy()
+    
+    def _add_text_features(self, frame: Optional[pd.DataFrame] = None):
+        """
+        Add the cleaned title and combined text feature columns.
+        
+        Args:
+            frame (pd.DataFrame): Frame to add the columns to, defaults to
+                movies_with_ratings
+        """
+        if frame is None:
+            frame = self.movies_with_ratings
         
         # Clean movie titles (remove year)
-        self.movies_with_ratings['title_clean'] = self.movies_with_ratings['title'].apply(
+        frame['title_clean'] = frame['title'].apply(
             lambda x: re.sub(r'\(\d{4}\)', '', x).strip()
         )
         
         # Create a combined feature for TF-IDF (title + genres)
-        self.movies_with_ratings['combined_features'] = (
-            self.movies_with_ratings['title_clean'] + ' ' + 
-            self.movies_with_ratings['genres'].str.replace('|', ' ')
+        frame['combined_features'] = (
+            frame['title_clean'] + ' ' + 
+            frame['genres'].str.replace('|', ' ')
         )
     
     def _build_similarity_matrix(self):
         """
-        Build TF-IDF matrix and cosine similarity matrix.
+        Build TF-IDF matrix and the top-K neighbor index.
+        
+        The dense cosine similarity matrix is only built for the 'dense' backend.
+        The 'ann' backend builds an IVF index instead of the neighbor index,
+        which avoids scoring every pair of movies.
         """
         # Initialize TF-IDF vectorizer
-        self.tfidf_vectorizer = TfidfVectorizer(
-            stop_words='english',
-            max_features=5000,
-            ngram_range=(1, 2)
-        )
+        self.tfidf_vectorizer = self._new_vectorizer()
         
         # Create TF-IDF matrix
         self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(
             self.movies_with_ratings['combined_features']
         )
         
-        # Calculate cosine similarity
-        self.cosine_sim = cosine_similarity(self.tfidf_matrix, self.tfidf_matrix)
+        if self.similarity_backend == 'ann':
+            self.ann_index = IVFIndex(**self.ann_params).build(self.tfidf_matrix)
+            return
+        
+        # Keep only the top-K neighbors per movie, computed block by block
+        self.neighbor_index = build_neighbor_index(self.tfidf_matrix, k=self.n_neighbors, n_jobs=None)
+        
+        # Calculate the full cosine similarity only when explicitly requested,
+        # in float32 row blocks instead of one float64 N x N product
+        if self.similarity_backend == 'dense':
+            self.cosine_sim = similarity_matrix(self.tfidf_matrix)
+    
+    def _new_vectorizer(self):
+        """
+        Create an unfitted vectorizer of the configured feature builder.
+        """
+        if self.feature_builder == 'hashing':
+            return HashingTfidfVectorizer(**self.tfidf_params)
+        return TfidfVectorizer(**self.tfidf_params)
+    
+    def _init_catalog_arrays(self):
+        """
+        Set the catalog columns as object arrays for fast row gathering.
+        """
+        self._titles = self.movies_with_ratings['title'].to_numpy(dtype=object)
+        self._genres = self.movies_with_ratings['genres'].to_numpy(dtype=object)
+        self._movie_rows = pd.Index(self.movies_with_ratings['movieId'])
+    
+    def _build_lookup_indexes(self):
+        """
+        Build the catalog column arrays, the popularity ranking, the title/genre
+        search index, the genre bitmask index and the rating range index.
+        """
+        self._init_catalog_arrays()
+        self._popularity_order = popularity_order(self._rating_count, self._avg_rating)
+        self._popularity_rank = inverse_permutation(self._popularity_order)
+        self.search_index = SearchIndex(
+            self.movies_with_ratings['title_clean'],
+            self.movies_with_ratings['genres']
+        )
+        self.genre_index = GenreIndex(self.movies_with_ratings['genres'], self._popularity_order)
+        self.rating_index = RatingRangeIndex(self._avg_rating, self._rating_count)
+        self._update_popularity_prior()
+    
+    def _load_lookup_indexes(self, path: str, mmap: bool):
+        """
+        Load the lookup indexes written by save() instead of building them.
+        
+        Args:
+            path (str): Directory the model was saved to
+            mmap (bool): Memory-map the index arrays instead of reading them
+        """
+        self._init_catalog_arrays()
+        self._popularity_order = np.load(os.path.join(path, 'popularity_order.npy'), mmap_mode='r' if mmap else None)
+        self._popularity_rank = inverse_permutation(self._popularity_order)
+        self.search_index = SearchIndex.load(
+            path,
+            self.movies_with_ratings['title_clean'],
+            self.movies_with_ratings['genres'],
+            mmap=mmap
+        )
+        self.genre_index = GenreIndex.load(path, self.movies_with_ratings['genres'], mmap=mmap)
+        self.rating_index = RatingRangeIndex.load(path, self._avg_rating, self._rating_count, mmap=mmap)
+        self._update_popularity_prior()
+    
+    def _update_popularity_prior(self, rows: Optional[np.ndarray] = None):
+        """
+        Update the per-movie terms of the popularity prior used by the hybrid scorer.
+        
+        The prior is the Bayesian average rating (shrunk towards the global mean
+        by PRIOR_STRENGTH pseudo-ratings) scaled to [0, 1] and weighted by the
+        log rating count relative to the most rated movie. It is stored as two
+        terms per movie, the weight of its own ratings and the weight of the
+        global mean, so new ratings only change the terms of the rated movies;
+        the global mean and the scaling are applied in _popularity_prior().
+        
+        Args:
+            rows (np.ndarray): Rows whose rating statistics changed, or None to
+                recompute every row and the rating totals
+        """
+        if rows is None:
+            rows = slice(None)
+            self._prior_own = np.zeros(len(self._rating_count))
+            self._prior_shrink = np.zeros(len(self._rating_count))
+            self._total_rating_sum = float(self._rating_sum.sum())
+            self._total_rating_count = float(self._rating_count.sum())
+        
+        counts = self._rating_count[rows]
+        confidence = np.log1p(counts) / (counts + PRIOR_STRENGTH)
+        self._prior_own[rows] = self._rating_sum[rows] * confidence
+        self._prior_shrink[rows] = PRIOR_STRENGTH * confidence
+    
+    def _popularity_prior(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Popularity prior of some movies in [0, 1].
+        
+        Args:
+            rows (np.ndarray): Movie rows
+            
+        Returns:
+            np.ndarray: float32 prior of every row
+        """
+        if len(self._rating_count) == 0 or self._total_rating_count == 0:
+            return np.zeros(len(rows), dtype=np.float32)
+        
+        # The rankings start with the best rated and the most rated movie
+        global_mean = self._total_rating_sum / self._total_rating_count
+        max_rating = max(float(self._avg_rating[self.rating_index.order[0]]), 1.0)
+        max_log_count = np.log1p(self._rating_count[self._popularity_order[0]])
+        prior = (self._prior_own[rows] + global_mean * self._prior_shrink[rows]) / (max_rating * max_log_count)
+        return prior.astype(np.float32)
+    
+    def _results(self, indices: np.ndarray, scores: Optional[np.ndarray] = None) -> MovieResults:
+        """
+        Gather the result columns for movie rows.
+        
+        Args:
+            indices (np.ndarray): Movie row positions, in result order
+            scores (np.ndarray): Optional similarity score per row
+            
+        Returns:
+            MovieResults: Columnar result
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        return MovieResults(
+            indices,
+            self._titles[indices],
+            self._genres[indices],
+            self._avg_rating[indices],
+            self._rating_count[indices].astype(np.int64),
+            scores
+        )
+    
+    def save(self, path: str, movies_path: Optional[str] = None, ratings_path: Optional[str] = None):
+        """
+        Save the fitted model to a directory.
+        
+        Large arrays (TF-IDF CSR arrays, neighbor or ANN index, per-movie stats,
+        rating columns and lookup indexes) and the movie columns are written as
+        .npy files so load() can memory-map them instead of rebuilding anything.
+        The model is written to a sibling staging directory that then replaces
+        ``path``: a partially written model is never picked up, and the files of
+        a previous save are unlinked rather than overwritten, so processes that
+        memory-mapped them keep reading the old model.
+        
+        Args:
+            path (str): Directory to write the model to
+            movies_path (str): Source movies.csv to fingerprint
+            ratings_path (str): Source ratings.csv to fingerprint
+        """
+        path = os.path.normpath(path)
+        staging = f'{path}.tmp{os.getpid()}'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        
+        arrays = {
+            'tfidf_data': self.tfidf_matrix.data,
+            'tfidf_indices': self.tfidf_matrix.indices,
+            'tfidf_indptr': self.tfidf_matrix.indptr,
+            'idf': self.tfidf_vectorizer.idf_,
+            'avg_rating': self._avg_rating,
+            'rating_count': self._rating_count,
+            'rating_sum': self._rating_sum,
+            'popularity_order': self._popularity_order
+        }
+        if self.neighbor_index is not None:
+            arrays['neighbor_indptr'] = self.neighbor_index.indptr
+            arrays['neighbor_indices'] = self.neighbor_index.indices
+            arrays['neighbor_scores'] = self.neighbor_index.scores
+        if self.ann_index is not None:
+            arrays['ann_components'] = self.ann_index.components
+            arrays['ann_embeddings'] = self.ann_index.embeddings
+            arrays['ann_centroids'] = self.ann_index.centroids
+            arrays['ann_list_indptr'] = self.ann_index.list_indptr
+            arrays['ann_list_rows'] = self.ann_index.list_rows
+        for column in self.ratings_df.columns:
+            arrays[f'ratings_{column}'] = self.ratings_df[column].to_numpy()
+        
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(array), allow_pickle=False)
+        
+        self.user_history.save(staging)
+        self.search_index.save(staging)
+        self.genre_index.save(staging)
+        self.rating_index.save(staging)
+        
+        # Movie columns, plus the text features derived from them
+        write_column_cache(self.movies_df, os.path.join(staging, 'movies'))
+        write_column_cache(
+            self.movies_with_ratings[['title_clean', 'combined_features']],
+            os.path.join(staging, 'movie_text')
+        )
+        
+        # Vocabulary as a list ordered by feature index; hashed features have none
+        if self.feature_builder == 'tfidf':
+            vocabulary = [None] * len(self.tfidf_vectorizer.vocabulary_)
+            for term, index in self.tfidf_vectorizer.vocabulary_.items():
+                vocabulary[index] = term
+            with open(os.path.join(staging, 'vocabulary.json'), 'w', encoding='utf-8') as f:
+                json.dump(vocabulary, f)
+        
+        manifest = {
+            'format_version': MODEL_FORMAT_VERSION,
+            'similarity_backend': self.similarity_backend,
+            'n_neighbors': self.n_neighbors,
+            'ann_params': self.ann_params,
+            'feature_builder': self.feature_builder,
+            'tfidf_params': self.tfidf_params,
+            'tfidf_shape': list(self.tfidf_matrix.shape),
+            'drift': {
+                'added_movies': self._added_movies,
+                'added_terms': self._added_terms,
+                'oov_terms': self._oov_terms
+            },
+            'ratings_columns': list(self.ratings_df.columns),
+            'sources': {
+                'movies': file_fingerprint(movies_path) if movies_path else None,
+                'ratings': file_fingerprint(ratings_path) if ratings_path else None
+            }
+        }
+        with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        
+        # Move the previous model aside first: a directory cannot replace a non-empty one
+        retired = f'{path}.old{os.getpid()}'
+        if os.path.exists(path):
+            shutil.rmtree(retired, ignore_errors=True)
+            os.replace(path, retired)
+        os.replace(staging, path)
+        shutil.rmtree(retired, ignore_errors=True)
+    
+    @staticmethod
+    def _stale_reason(
+        manifest: Optional[dict], 
+        movies_path: Optional[str], 
+        ratings_path: Optional[str],
+        settings: Optional[dict] = None
+    ) -> Optional[str]:
+        """
+        Explain why a saved model cannot be used, or return None if it can.
+        
+        Constructor arguments in ``settings`` must match the ones the model
+        was built with.
+        """
+        if manifest is None:
+            return "no saved model"
+        
+        if manifest.get('format_version') != MODEL_FORMAT_VERSION:
+            return f"format version {manifest.get('format_version')} != {MODEL_FORMAT_VERSION}"
+        
+        for name, source_path in (('movies', movies_path), ('ratings', ratings_path)):
+            if source_path is not None and not fingerprint_matches(manifest['sources'].get(name), source_path):
+                return f"{name} data changed"
+        
+        settings = dict(settings or {})
+        saved = {
+            'similarity_backend': manifest['similarity_backend'],
+            'n_neighbors': manifest['n_neighbors'],
+            'ann_params': manifest.get('ann_params', {}),
+            'feature_builder': manifest.get('feature_builder', 'tfidf'),
+            'tfidf_params': manifest['tfidf_params']
+        }
+        if 'ann_params' in settings:
+            settings['ann_params'] = dict(settings['ann_params'] or {})
+        if 'tfidf_params' in settings:
+            builder = settings.get('feature_builder', saved['feature_builder'])
+            default_params = HASHING_PARAMS if builder == 'hashing' else TFIDF_PARAMS
+            settings['tfidf_params'] = {**default_params, **(settings['tfidf_params'] or {})}
+        for name, value in settings.items():
+            # Compare as JSON so tuples equal the lists read from the manifest
+            if name in saved and json.loads(json.dumps(value)) != saved[name]:
+                return f"{name} {value!r} differs from the saved {saved[name]!r}"
+        
+        return None
+    
+    @classmethod
+    def load(
+        cls, 
+        path: str, 
+        movies_path: Optional[str] = None, 
+        ratings_path: Optional[str] = None,
+        mmap: bool = True,
+        dataset: Optional[MovieDataset] = None,
+        on_rebuild: Optional[Callable[[str], None]] = None,
+        **kwargs
+    ) -> 'MovieRecommender':
+        """
+        Load a model saved with save(), rebuilding it if it is stale.
+        
+        When source paths are given, the recorded fingerprints are checked and a
+        missing, outdated or stale model is rebuilt from the CSV files and saved
+        back to ``path``. A model built with other constructor arguments than
+        ``kwargs`` is stale too; without source paths it raises ValueError.
+        
+        Args:
+            path (str): Directory the model was saved to
+            movies_path (str): Source movies.csv to check the model against
+            ratings_path (str): Source ratings.csv to check the model against
+            mmap (bool): Memory-map the large arrays instead of reading them
+            dataset (MovieDataset): The dataset already loaded from the source
+                files; it is rebuilt from and shares its frames with the model
+                instead of reading them again
+            on_rebuild (Callable[[str], None]): Called with the reason before
+                a stale model is rebuilt
+            **kwargs: Constructor arguments the model must have been built
+                with; used when the model is rebuilt
+            
+        Returns:
+            MovieRecommender: The loaded (or rebuilt) recommender
+        """
+        manifest_path = os.path.join(path, 'manifest.json')
+        manifest = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        
+        reason = cls._stale_reason(manifest, movies_path, ratings_path, kwargs)
+        if reason is not None:
+            if movies_path is None or ratings_path is None:
+                raise ValueError(f"Cannot load recommender model from {path}: {reason}")
+            
+            if on_rebuild is not None:
+                on_rebuild(reason)
+            if dataset is None:
+                dataset = MovieDataset.from_csv(movies_path, ratings_path)
+            recommender = cls.from_dataset(dataset, **kwargs)
+            try:
+                recommender.save(path, movies_path, ratings_path)
+            except OSError as e:
+                print(f"⚠️ Could not save recommender model to {path}: {e}")
+            return recommender
+        
+        mmap_mode = 'r' if mmap else None
+        
+        def load_array(name):
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+        
+        recommender = cls.__new__(cls)
+        recommender.similarity_backend = manifest['similarity_backend']
+        recommender.n_neighbors = manifest['n_neighbors']
+        recommender.ann_params = manifest.get('ann_params', {})
+        avg_rating = load_array('avg_rating')
+        n_ratings = len(load_array(f"ratings_{manifest['ratings_columns'][0]}"))
+        
+        # The saved frames equal the dataset's unless movies or ratings were
+        # added before saving
+        if dataset is not None and len(dataset.movies_df) == len(avg_rating) and len(dataset.ratings_df) == n_ratings:
+            recommender.movies_df = dataset.movies_df
+            recommender.ratings_df = dataset.ratings_df
+        else:
+            recommender.movies_df = read_column_cache(os.path.join(path, 'movies'), mmap=mmap)
+            recommender.ratings_df = pd.DataFrame(
+                {column: load_array(f'ratings_{column}') for column in manifest['ratings_columns']},
+                copy=False
+            )
+        
+        # Per-movie statistics
+        recommender.movies_with_ratings = recommender.movies_df.copy(deep=False)
+        recommender.movies_with_ratings.index = pd.RangeIndex(len(recommender.movies_with_ratings))
+        recommender._init_rating_stats(
+            avg_rating,
+            load_array('rating_count'),
+            load_array('rating_sum') if os.path.exists(os.path.join(path, 'rating_sum.npy')) else None
+        )
+        text = read_column_cache(os.path.join(path, 'movie_text'), mmap=mmap)
+        for column in ('title_clean', 'combined_features'):
+            recommender.movies_with_ratings[column] = text[column]
+        
+        # Fitted vectorizer and TF-IDF matrix
+        tfidf_params = dict(manifest['tfidf_params'])
+        tfidf_params['ngram_range'] = tuple(tfidf_params['ngram_range'])
+        recommender.feature_builder = manifest.get('feature_builder', 'tfidf')
+        recommender.tfidf_params = tfidf_params
+        recommender.tfidf_vectorizer = recommender._new_vectorizer()
+        if recommender.feature_builder == 'tfidf':
+            with open(os.path.join(path, 'vocabulary.json'), encoding='utf-8') as f:
+                vocabulary = json.load(f)
+            recommender.tfidf_vectorizer.vocabulary_ = {term: i for i, term in enumerate(vocabulary)}
+        recommender.tfidf_vectorizer.idf_ = np.array(load_array('idf'))
+        recommender.tfidf_matrix = sp.csr_matrix(
+            (load_array('tfidf_data'), load_array('tfidf_indices'), load_array('tfidf_indptr')),
+            shape=tuple(manifest['tfidf_shape']),
+            copy=False
+        )
+        
+        recommender.neighbor_index = None
+        recommender.ann_index = None
+        if recommender.similarity_backend == 'ann':
+            ann_index = IVFIndex(**recommender.ann_params)
+            ann_index.matrix = recommender.tfidf_matrix
+            ann_index.components = load_array('ann_components')
+            ann_index.embeddings = load_array('ann_embeddings')
+            ann_index.centroids = load_array('ann_centroids')
+            ann_index.list_indptr = load_array('ann_list_indptr')
+            ann_index.list_rows = load_array('ann_list_rows')
+            recommender.ann_index = ann_index
+        else:
+            recommender.neighbor_index = NeighborIndex(
+                load_array('neighbor_indptr'),
+                load_array('neighbor_indices'),
+                load_array('neighbor_scores'),
+                recommender.n_neighbors
+            )
+        
+        recommender.item_cf = None
+        recommender.matrix_factorization = None
+        recommender._init_incremental_state(manifest.get('drift'))
+        recommender.cosine_sim = None
+        if recommender.similarity_backend == 'dense':
+            recommender.cosine_sim = similarity_matrix(recommender.tfidf_matrix)
+        
+        recommender._load_lookup_indexes(path, mmap)
+        if UserHistoryIndex.exists(path):
+            recommender._user_history = UserHistoryIndex.load(path, mmap=mmap)
+        else:
+            recommender._user_history = None
+        return recommender
+    
+    def add_ratings(self, ratings_df: pd.DataFrame) -> int:
+        """
+        Add a batch of new ratings without rebuilding the recommender.
+        
+        The per-movie rating sums, counts and means are updated in O(batch
+        size), and the movies whose statistics changed are moved within the
+        popularity, genre and rating-range orders instead of re-sorting them.
+        The batch is inserted into the user rating histories the same way. The
+        TF-IDF features do not depend on ratings and are left untouched, as are
+        the fitted collaborative models; call build_collaborative_index() or
+        build_matrix_factorization() to refit those.
+        
+        Args:
+            ratings_df (pd.DataFrame): New ratings with userId, movieId and rating columns
+            
+        Returns:
+            int: Number of movies whose statistics changed
+        """
+        missing = {'userId', 'movieId', 'rating'} - set(ratings_df.columns)
+        if missing:
+            raise ValueError(f"Ratings are missing columns: {sorted(missing)}")
+        if len(ratings_df) == 0:
+            return 0
+        
+        with self._lock:
+            return self._add_ratings(ratings_df)
+    
+    def _add_ratings(self, ratings_df: pd.DataFrame) -> int:
+        self._pending_ratings.append(ratings_df.reindex(columns=self._ratings_df.columns))
+        if self._user_history is not None:
+            self._user_history = self._user_history.with_ratings(ratings_df)
+        
+        # Ratings of movies outside the catalog are kept but not counted, as in _prepare_data
+        rows = self._movie_rows.get_indexer(ratings_df['movieId'])
+        values = ratings_df['rating'].to_numpy(dtype=np.float64)
+        valid = (rows >= 0) & ~np.isnan(values)
+        changed, inverse = np.unique(rows[valid], return_inverse=True)
+        if len(changed) == 0:
+            return 0
+        
+        # Update the running statistics of the rated movies only
+        self._rating_sum[changed] += np.bincount(inverse, weights=values[valid])
+        self._rating_count[changed] += np.bincount(inverse)
+        self._avg_rating[changed] = self._rating_sum[changed] / self._rating_count[changed]
+        columns = [self.movies_with_ratings.columns.get_loc(name) for name in ('avg_rating', 'rating_count')]
+        self.movies_with_ratings.iloc[changed, columns] = np.column_stack(
+            (self._avg_rating[changed], self._rating_count[changed])
+        )
+        
+        self._total_rating_sum += float(values[valid].sum())
+        self._total_rating_count += float(valid.sum())
+        
+        # Move the changed movies within the precomputed rankings
+        old_rank = self._popularity_rank
+        self._popularity_order = reinsert_rows(
+            self._popularity_order, self._popularity_rank, changed,
+            (self._rating_count, self._avg_rating)
+        )
+        self._popularity_rank = inverse_permutation(self._popularity_order)
+        self.genre_index.update(changed, old_rank, self._popularity_rank)
+        self.rating_index.update(changed)
+        self._update_popularity_prior(changed)
+        
+        return len(changed)
+    
+    @property
+    def vocabulary_drift(self) -> float:
+        """
+        Estimated share of the catalog text that the fitted vocabulary has not seen.
+        
+        The fraction of movies added since the last fit times the share of their
+        terms outside the vocabulary; 0 right after a fit.
+        """
+        if self._added_terms == 0:
+            return 0.0
+        return (self._added_movies / len(self._titles)) * (self._oov_terms / self._added_terms)
+    
+    def add_movies(self, movies_df: pd.DataFrame, refit_threshold: Optional[float] = DRIFT_THRESHOLD) -> int:
+        """
+        Add movies to the catalog without refitting the TF-IDF vectorizer.
+        
+        New movies are vectorized with the fitted vectorizer and appended to the
+        TF-IDF matrix. Only the similarities between the new movies and the
+        catalog are computed: the new movies get their own neighbor lists and
+        are merged into the lists of the movies they are similar to. The lookup
+        indexes are extended in place, and ratings already recorded for the new
+        movie ids are counted.
+        
+        Terms outside the fitted vocabulary are dropped by the transform, so
+        their share is tracked as vocabulary_drift; once it reaches
+        ``refit_threshold`` a full refit is started in a background thread.
+        Hashed features ('hashing' builder) cover every term, so their drift
+        stays 0.
+        The collaborative models are dropped and refit on next use, since
+        their item positions no longer match the catalog.
+        
+        Args:
+            movies_df (pd.DataFrame): New movies with movieId, title and genres columns
+            refit_threshold (float): Drift at which to start a background refit,
+                or None to never refit
+            
+        Returns:
+            int: Number of movies added
+        """
+        missing = {'movieId', 'title', 'genres'} - set(movies_df.columns)
+        if missing:
+            raise ValueError(f"Movies are missing columns: {sorted(missing)}")
+        if len(movies_df) == 0:
+            return 0
+        
+        with self._lock:
+            duplicated = movies_df['movieId'].isin(self._movie_rows) | movies_df['movieId'].duplicated()
+            if duplicated.any():
+                raise ValueError(
+                    f"Movies already in the catalog: {movies_df['movieId'][duplicated].tolist()[:5]}"
+                )
+            added = self._add_movies(movies_df)
+        
+        if refit_threshold is not None and self.vocabulary_drift >= refit_threshold:
+            print(f"🔄 Vocabulary drift {self.vocabulary_drift:.3f} >= {refit_threshold}, refitting in the background")
+            self.refit(background=True)
+        return added
+    
+    def _add_movies(self, movies_df: pd.DataFrame) -> int:
+        first_row = len(self.movies_with_ratings)
+        new_movies = movies_df.reindex(columns=self.movies_df.columns).reset_index(drop=True)
+        n_total = first_row + len(new_movies)
+        new_rows = np.arange(first_row, n_total)
+        
+        # Ratings already recorded for the new movies
+        ratings = self.ratings_df
+        ratings = ratings[ratings['movieId'].isin(new_movies['movieId'])]
+        stats = ratings.groupby('movieId')['rating'].agg(['mean', 'count', 'sum']).reindex(new_movies['movieId'])
+        
+        frame = new_movies.copy()
+        frame['avg_rating'] = stats['mean'].fillna(0).to_numpy()
+        frame['rating_count'] = stats['count'].fillna(0).to_numpy(dtype=np.float64)
+        self._add_text_features(frame)
+        
+        self.movies_df = pd.concat([self.movies_df, new_movies], ignore_index=True)
+        self.movies_with_ratings = pd.concat([self.movies_with_ratings, frame], ignore_index=True)
+        self._avg_rating = np.concatenate([self._avg_rating, frame['avg_rating'].to_numpy()])
+        self._rating_count = np.concatenate([self._rating_count, frame['rating_count'].to_numpy()])
+        self._rating_sum = np.concatenate([self._rating_sum, stats['sum'].fillna(0).to_numpy(dtype=np.float64)])
+        self._titles = np.concatenate([self._titles, frame['title'].to_numpy(dtype=object)])
+        self._genres = np.concatenate([self._genres, frame['genres'].to_numpy(dtype=object)])
+        self._movie_rows = self._movie_rows.append(pd.Index(new_movies['movieId']))
+        
+        # Transform only: the vocabulary and IDF weights stay as fitted
+        texts = frame['combined_features'].tolist()
+        new_matrix = self.tfidf_vectorizer.transform(texts)
+        self.tfidf_matrix = sp.vstack([self.tfidf_matrix, new_matrix], format='csr')
+        
+        # Hashed features cover every term, so only a fitted vocabulary drifts
+        if self.feature_builder == 'tfidf':
+            analyzer = self.tfidf_vectorizer.build_analyzer()
+            vocabulary = self.tfidf_vectorizer.vocabulary_
+            for text in texts:
+                terms = analyzer(text)
+                self._added_terms += len(terms)
+                self._oov_terms += sum(term not in vocabulary for term in terms)
+        self._added_movies += len(texts)
+        
+        # Similarities between the new movies and the whole catalog only
+        if self.neighbor_index is not None:
+            self.neighbor_index = extend_neighbor_index(self.neighbor_index, self.tfidf_matrix)
+        
+        if self.cosine_sim is not None:
+            block = (new_matrix @ self.tfidf_matrix.T).toarray()
+            cosine_sim = np.empty((n_total, n_total), dtype=self.cosine_sim.dtype)
+            cosine_sim[:first_row, :first_row] = self.cosine_sim
+            cosine_sim[first_row:] = block
+            cosine_sim[:first_row, first_row:] = block[:, :first_row].T
+            self.cosine_sim = cosine_sim
+        
+        if self.ann_index is not None:
+            self.ann_index.add(self.tfidf_matrix)
+        
+        # Extend the lookup indexes
+        self._popularity_order = reinsert_rows(
+            np.concatenate([self._popularity_order, new_rows]),
+            np.concatenate([self._popularity_rank, new_rows]),
+            new_rows,
+            (self._rating_count, self._avg_rating)
+        )
+        self._popularity_rank = inverse_permutation(self._popularity_order)
+        self.search_index.add(frame['title_clean'], frame['genres'])
+        self.genre_index.add(frame['genres'], self._popularity_order)
+        self.rating_index.extend(self._avg_rating, self._rating_count)
+        self._update_popularity_prior()
+        
+        self.item_cf = None
+        self.matrix_factorization = None
+        self._user_history = None
+        return len(new_movies)
+    
+    def refit(self, background: bool = False) -> Optional[threading.Thread]:
+        """
+        Rebuild the recommender from its current movies and ratings.
+        
+        The rebuilt state replaces the current one in one step. Ratings and
+        movies added while a background refit runs are replayed onto the
+        rebuilt recommender before the swap.
+        
+        Args:
+            background (bool): Refit in a daemon thread and return immediately
+            
+        Returns:
+            threading.Thread: The refit thread when running in the background
+        """
+        if not background:
+            self._refit()
+            return None
+        
+        with self._lock:
+            if self._refit_thread is None or not self._refit_thread.is_alive():
+                self._refit_thread = threading.Thread(target=self._refit_in_background, daemon=True)
+                self._refit_thread.start()
+            return self._refit_thread
+    
+    def _refit_in_background(self):
+        try:
+            self._refit()
+        except Exception as e:
+            print(f"❌ Background refit failed: {e}")
     
+    def _refit(self):
+        with self._lock:
+            movies_df, ratings_df = self.movies_df, self.ratings_df
+        
+        fresh = type(self)(
+            movies_df, ratings_df,
+            similarity_backend=self.similarity_backend,
+            n_neighbors=self.n_neighbors,
+            ann_params=self.ann_params,
+            tfidf_params=self.tfidf_params,
+            feature_builder=self.feature_builder
+        )
+        
+        with self._lock:
+            # Replay what arrived during the refit, ratings first so the new
+            # movies pick up their ratings
+            if len(self.ratings_df) > len(ratings_df):
+                fresh._add_ratings(self.ratings_df.iloc[len(ratings_df):])
+            if len(self.movies_df) > len(movies_df):
+                fresh._add_movies(self.movies_df.iloc[len(movies_df):])
+            
+            state = {
+                name: value for name, value in fresh.__dict__.items()
+                if name not in ('_lock', '_refit_thread')
+            }
+            self.__dict__.update(state)
+    
+    def _similarity_row(self, movie_idx: int) -> np.ndarray:
+        """
+        Compute the exact similarity of one movie against the whole catalog.
+        
+        Args:
+            movie_idx (int): Row position of the movie
+            
+        Returns:
+            np.ndarray: float32 similarity scores for every movie
+        """
+        if self.cosine_sim is not None:
+            return np.asarray(self.cosine_sim[movie_idx], dtype=np.float32)
+        
+        row = self.tfidf_matrix[movie_idx] @ self.tfidf_matrix.T
+        return row.toarray().ravel().astype(np.float32)
+    
+    def _top_similar(
+        self, 
+        movie_idx: int, 
+        n: int, 
+        min_rating_count: int, 
+        min_avg_rating: float,
+        neighbor_index: Optional[NeighborIndex] = None,
+        similarity_row=None,
+        exclude: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Select the N most similar movies that pass the rating filters.
+        
+        The stored neighbor list is tried first; if too few neighbors pass the
+        filters, the window is widened to the exact similarity row of the whole
+        catalog with the filters applied as a mask before selecting. With the
+        'ann' backend the filters are applied to the probed candidates instead.
+        
+        Args:
+            movie_idx (int): Row position of the seed movie
+            n (int): Number of movies to select
+            min_rating_count (int): Minimum number of ratings required
+            min_avg_rating (float): Minimum average rating required
+            neighbor_index (NeighborIndex): Precomputed neighbors of the engine
+            similarity_row (callable): Exact similarity row of the engine;
+                defaults to the content (TF-IDF) engine
+            exclude (np.ndarray): Movie positions to leave out, e.g. the
+                movies a user already rated
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (movie positions, similarity scores)
+            ordered by descending similarity, excluding the seed movie
+        """
+        if exclude is None:
+            exclude = np.zeros(0, dtype=np.int64)
+        
+        if similarity_row is None:
+            similarity_row = self._similarity_row
+            neighbor_index = self.neighbor_index if self.cosine_sim is None else None
+            
+            if self.ann_index is not None:
+                eligible = (
+                    (self._rating_count >= min_rating_count) &
+                    (self._avg_rating >= min_avg_rating)
+                )
+                eligible[exclude] = False
+                return self.ann_index.search(movie_idx, n, eligible=eligible)
+        
+        if neighbor_index is not None:
+            indices, scores = neighbor_index.neighbors(movie_idx)
+            keep = (
+                (self._rating_count[indices] >= min_rating_count) &
+                (self._avg_rating[indices] >= min_avg_rating) &
+                ~np.isin(indices, exclude)
+            )
+            
+            # Enough results, or the stored list already holds every similar movie
+            if keep.sum() >= n or len(indices) < neighbor_index.k:
+                return indices[keep][:n], scores[keep][:n]
+        
+        # Widen the candidate window to the whole catalog
+        eligible = (
+            (self._rating_count >= min_rating_count) &
+            (self._avg_rating >= min_avg_rating)
+        )
+        eligible[exclude] = False
+        scores = np.where(eligible, similarity_row(movie_idx), -np.inf)
+        scores[movie_idx] = -np.inf
+        
+        indices, scores = top_k_rows(scores[np.newaxis, :], n)
+        keep = scores[0] > 0
+        return indices[0][keep], scores[0][keep]
+
+    def evaluate_ann_recall(self, k: int = 10, n_queries: int = 200, n_probe: Optional[int] = None) -> dict:
+        """
+        Report recall@K of the ANN index against the exact similarity search.
+
+        Args:
+            k (int): Number of neighbors compared per query
+            n_queries (int): Number of random query movies
+            n_probe (int): Number of lists to scan, defaults to the index setting
+
+        Returns:
+            dict: recall, n_probe, n_lists and mean ANN/exact query time in ms
+        """
+        if self.ann_index is None:
+            self.ann_index = IVFIndex(**self.ann_params).build(self.tfidf_matrix)
+
+        def exact_search(row, n):
+            scores = self._similarity_row(row)
+            scores[row] = -np.inf
+            indices, scores = top_k_rows(scores[np.newaxis, :], n)
+            keep = scores[0] > 0
+            return indices[0][keep], scores[0][keep]
+
+        return self.ann_index.recall(exact_search, k=k, n_queries=n_queries, n_probe=n_probe)
+
     def find_movie_by_title(self, movie_title: str, exact_match: bool = False) -> Optional[pd.Series]:
         """
         Find a movie by title (exact or partial match).
         
+        A partial search prefers movies whose title equals the query over
+        longer titles containing it.
+        
         Args:
             movie_title (str): Title of the movie to find
             exact_match (bool): Whether to require exact match
@@ -88,34 +1164,31 @@ class MovieRecommender:
         Returns:
             pd.Series: Movie information if found, None otherwise
         """
-        movie_title = movie_title.strip().lower()
+        movie_title = movie_title.strip()
         
         if exact_match:
             # Exact match
-            mask = self.movies_with_ratings['title_clean'].str.lower() == movie_title
+            matches = self.search_index.find_exact(movie_title)
         else:
-            # Partial match
-            mask = self.movies_with_ratings['title_clean'].str.lower().str.contains(
-                movie_title, na=False
-            )
-        
-        matches = self.movies_with_ratings[mask]
+            # Partial match, unless a title is equal to the query
+            matches = self.search_index.find_exact(movie_title)
+            if len(matches) == 0:
+                matches = self.search_index.find_title(movie_title)
         
         if len(matches) == 0:
             return None
         
         # If multiple matches, return the most popular one
-        if len(matches) > 1:
-            return matches.loc[matches['rating_count'].idxmax()]
-        
-        return matches.iloc[0]
+        best = matches[np.argmin(self._popularity_rank[matches])]
+        return self.movies_with_ratings.iloc[best]
     
     def get_recommendations(
         self, 
         movie_title: str, 
         n_recommendations: int = 5,
         min_rating_count: int = 5,
-        min_avg_rating: float = 0.0
+        min_avg_rating: float = 0.0,
+        columnar: bool = False
     ) -> List[Tuple[str, float, str, float, int]]:
         """
         Get movie recommendations based on a given movie title.
@@ -125,6 +1198,7 @@ class MovieRecommender:
             n_recommendations (int): Number of recommendations to return
             min_rating_count (int): Minimum number of ratings required
             min_avg_rating (float): Minimum average rating required
+            columnar (bool): Return a MovieResults instead of a list of tuples
             
         Returns:
             List[Tuple]: List of (title, similarity_score, genres, avg_rating, rating_count)
@@ -133,84 +1207,602 @@ class MovieRecommender:
         movie = self.find_movie_by_title(movie_title)
         
         if movie is None:
-            return []
+            empty = self._results(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+            return empty if columnar else []
         
         # Get the index of the movie
         movie_idx = movie.name
         
-        # Get similarity scores for this movie
-        sim_scores = list(enumerate(self.cosine_sim[movie_idx]))
+        # Select the most similar movies that pass the filters
+        indices, scores = self._top_similar(
+            movie_idx, n_recommendations, min_rating_count, min_avg_rating
+        )
         
-        # Sort movies based on similarity scores
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
+        # Create result list
+        results = self._results(indices, scores)
+        return results if columnar else results.to_tuples()
+    
+    def build_collaborative_index(
+        self, 
+        n_neighbors: int = 50, 
+        memory_budget_mb: float = 256, 
+        n_jobs: Optional[int] = None
+    ) -> ItemItemCF:
+        """
+        Build the item-item collaborative filtering engine from the ratings.
         
-        # Get top similar movies (excluding the movie itself)
-        sim_scores = sim_scores[1:n_recommendations*2]  # Get more to filter
+        Args:
+            n_neighbors (int): Number of neighbors kept per movie
+            memory_budget_mb (float): Memory budget for the dense similarity blocks
+            n_jobs (int): Number of worker threads, None for one per CPU
+            
+        Returns:
+            ItemItemCF: The fitted engine
+        """
+        self.item_cf = ItemItemCF(
+            n_neighbors=n_neighbors, 
+            memory_budget_mb=memory_budget_mb, 
+            n_jobs=n_jobs
+        ).fit(self.user_history)
+        return self.item_cf
+    
+    def get_collaborative_recommendations(
+        self, 
+        movie_title: str, 
+        n_recommendations: int = 5,
+        min_rating_count: int = 5,
+        min_avg_rating: float = 0.0,
+        columnar: bool = False
+    ) -> List[Tuple[str, float, str, float, int]]:
+        """
+        Get movie recommendations from users' rating behaviour.
         
-        # Get movie indices
-        movie_indices = [i[0] for i in sim_scores]
+        Movies are ranked by the adjusted cosine similarity of their ratings.
+        The engine is built on first use if build_collaborative_index() has not
+        been called.
         
-        # Get recommended movies
-        recommended_movies = self.movies_with_ratings.iloc[movie_indices].copy()
+        Args:
+            movie_title (str): Title of the movie to base recommendations on
+            n_recommendations (int): Number of recommendations to return
+            min_rating_count (int): Minimum number of ratings required
+            min_avg_rating (float): Minimum average rating required
+            columnar (bool): Return a MovieResults instead of a list of tuples
+            
+        Returns:
+            List[Tuple]: List of (title, similarity_score, genres, avg_rating, rating_count)
+        """
+        movie = self.find_movie_by_title(movie_title)
         
-        # Apply filters
-        recommended_movies = recommended_movies[
-            (recommended_movies['rating_count'] >= min_rating_count) &
-            (recommended_movies['avg_rating'] >= min_avg_rating)
-        ]
+        if movie is None:
+            empty = self._results(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+            return empty if columnar else []
         
-        # Take top N recommendations
-        recommended_movies = recommended_movies.head(n_recommendations)
+        if self.item_cf is None:
+            self.build_collaborative_index()
         
-        # Create result list
-        recommendations = []
-        for idx, (_, movie) in enumerate(recommended_movies.iterrows()):
-            # Find the similarity score for this movie
-            sim_score = next(score for i, score in sim_scores if i == movie.name)
+        indices, scores = self._top_similar(
+            movie.name, n_recommendations, min_rating_count, min_avg_rating,
+            neighbor_index=self.item_cf.neighbor_index,
+            similarity_row=self.item_cf.similarity_row
+        )
+        
+        results = self._results(indices, scores)
+        return results if columnar else results.to_tuples()
+    
+    def build_matrix_factorization(self, **params) -> MatrixFactorization:
+        """
+        Train the latent-factor (ALS) model on the ratings.
+        
+        Args:
+            **params: MatrixFactorization settings (n_factors, regularization, ...)
+            
+        Returns:
+            MatrixFactorization: The fitted model
+        """
+        self.matrix_factorization = MatrixFactorization(**params).fit(self.user_history)
+        return self.matrix_factorization
+    
+    def predict_ratings(self, user_ids, movie_ids) -> np.ndarray:
+        """
+        Predict ratings for (userId, movieId) pairs with the latent-factor model.
+        
+        Args:
+            user_ids: userId of every pair
+            movie_ids: movieId of every pair
+            
+        Returns:
+            np.ndarray: float32 predicted rating per pair
+        """
+        if self.matrix_factorization is None:
+            self.build_matrix_factorization()
+        
+        return self.matrix_factorization.predict(user_ids, movie_ids)
+    
+    def get_latent_factor_recommendations(
+        self, 
+        user_id: int, 
+        n_recommendations: int = 10,
+        min_rating_count: int = 5,
+        min_avg_rating: float = 0.0,
+        columnar: bool = False
+    ) -> List[Tuple[str, float, str, float, int]]:
+        """
+        Get the movies with the highest predicted rating for a user.
+        
+        Args:
+            user_id (int): userId to recommend for
+            n_recommendations (int): Number of recommendations to return
+            min_rating_count (int): Minimum number of ratings required
+            min_avg_rating (float): Minimum average rating required
+            columnar (bool): Return a MovieResults instead of a list of tuples
+            
+        Returns:
+            List[Tuple]: List of (title, predicted_rating, genres, avg_rating, rating_count)
+        """
+        if self.matrix_factorization is None:
+            self.build_matrix_factorization()
+        
+        eligible = (
+            (self._rating_count >= min_rating_count) &
+            (self._avg_rating >= min_avg_rating)
+        )
+        
+        # The full history, including ratings added after the model was fit
+        seen, _ = self.user_history.history(user_id)
+        eligible[seen] = False
+        indices, scores = self.matrix_factorization.recommend(
+            user_id, n_recommendations, eligible=eligible
+        )
+        
+        results = self._results(indices, scores)
+        return results if columnar else results.to_tuples()
+    
+    def get_hybrid_recommendations(
+        self, 
+        movie_title: str, 
+        n_recommendations: int = 5,
+        min_rating_count: int = 5,
+        min_avg_rating: float = 0.0,
+        weights: Optional[dict] = None,
+        columnar: bool = False
+    ) -> List[Tuple[str, float, str, float, int]]:
+        """
+        Get recommendations blending content, collaborative and popularity signals.
+        
+        Candidates are the union of the movie's content and collaborative
+        neighbors. Every signal is gathered into arrays aligned with that
+        candidate set and blended in one vectorized pass.
+        
+        Args:
+            movie_title (str): Title of the movie to base recommendations on
+            n_recommendations (int): Number of recommendations to return
+            min_rating_count (int): Minimum number of ratings required
+            min_avg_rating (float): Minimum average rating required
+            weights (dict): Weights for 'content', 'collaborative' and
+                'popularity'; defaults to HYBRID_WEIGHTS
+            columnar (bool): Return a MovieResults instead of a list of tuples
+            
+        Returns:
+            List[Tuple]: List of (title, hybrid_score, genres, avg_rating, rating_count)
+        """
+        movie = self.find_movie_by_title(movie_title)
+        
+        if movie is None:
+            empty = self._results(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+            return empty if columnar else []
+        
+        indices, scores = self._hybrid_top(
+            movie.name, n_recommendations, min_rating_count, min_avg_rating, weights
+        )
+        results = self._results(indices, scores)
+        return results if columnar else results.to_tuples()
+    
+    def _hybrid_top(
+        self, 
+        movie_idx: int, 
+        n: int, 
+        min_rating_count: int, 
+        min_avg_rating: float,
+        weights: Optional[dict] = None,
+        exclude: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Select the N best hybrid-scored movies for a seed movie.
+        
+        Args:
+            movie_idx (int): Row position of the seed movie
+            n (int): Number of movies to select
+            min_rating_count (int): Minimum number of ratings required
+            min_avg_rating (float): Minimum average rating required
+            weights (dict): Signal weights, defaults to HYBRID_WEIGHTS
+            exclude (np.ndarray): Movie positions to leave out, e.g. the
+                movies a user already rated
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (movie positions, hybrid scores)
+            ordered by descending score, excluding the seed movie
+        """
+        weights = {**HYBRID_WEIGHTS, **(weights or {})}
+        if exclude is None:
+            exclude = np.zeros(0, dtype=np.int64)
+        if self.item_cf is None:
+            self.build_collaborative_index()
+        
+        # Candidate pools of both engines
+        if self.similarity_backend == 'neighbors':
+            content_indices, content_scores = self.neighbor_index.neighbors(movie_idx)
+        else:
+            content_indices, content_scores = self._top_similar(movie_idx, self.n_neighbors, 0, 0.0)
+        cf_indices, cf_scores = self.item_cf.neighbor_index.neighbors(movie_idx)
+        
+        eligible_count = (
+            (self._rating_count[content_indices] >= min_rating_count) &
+            (self._avg_rating[content_indices] >= min_avg_rating) &
+            ~np.isin(content_indices, exclude)
+        ).sum()
+        if eligible_count < n:
+            # Refill the content pool from the exact row of the whole catalog
+            content_indices, content_scores = self._top_similar(
+                movie_idx, n, min_rating_count, min_avg_rating, exclude=exclude
+            )
+        
+        # Align every signal with the union of the candidates
+        candidates, inverse = np.unique(
+            np.concatenate([content_indices, cf_indices]), return_inverse=True
+        )
+        content = np.zeros(len(candidates), dtype=np.float32)
+        collaborative = np.zeros(len(candidates), dtype=np.float32)
+        content[inverse[:len(content_indices)]] = content_scores
+        collaborative[inverse[len(content_indices):]] = cf_scores
+        
+        scores = (
+            weights['content'] * content +
+            weights['collaborative'] * collaborative +
+            weights['popularity'] * self._popularity_prior(candidates)
+        ).astype(np.float32)
+        
+        eligible = (
+            (self._rating_count[candidates] >= min_rating_count) &
+            (self._avg_rating[candidates] >= min_avg_rating) &
+            (candidates != movie_idx) &
+            ~np.isin(candidates, exclude)
+        )
+        candidates, scores = candidates[eligible], scores[eligible]
+        
+        top, top_scores = top_k_rows(scores[np.newaxis, :], n)
+        return candidates[top[0]], top_scores[0]
+    
+    def _resolve_titles(self, titles: List[str]) -> np.ndarray:
+        """
+        Resolve many titles to row positions, like find_movie_by_title().
+        
+        Exact title matches are resolved in one vectorized lookup; only the
+        remaining titles go through the substring search.
+        
+        Args:
+            titles (List[str]): Movie titles to resolve
+            
+        Returns:
+            np.ndarray: int64 row position per title, -1 when no movie matches
+        """
+        positions = self.search_index.find_exact_best(titles, self._popularity_rank)
+        
+        missed = {}
+        for i in np.flatnonzero(positions < 0).tolist():
+            title = titles[i]
+            if title not in missed:
+                movie = self.find_movie_by_title(title)
+                missed[title] = -1 if movie is None else movie.name
+            positions[i] = missed[title]
+        
+        return positions
+    
+    def get_recommendations_batch(
+        self,
+        titles: List[str],
+        n_recommendations: int = 5,
+        min_rating_count: int = 5,
+        min_avg_rating: float = 0.0,
+        as_frame: bool = True,
+        memory_budget_mb: float = 256
+    ):
+        """
+        Get recommendations for many movie titles at once.
+        
+        Seeds are scored in chunks with one sparse matrix product per chunk
+        against the TF-IDF matrix, so memory stays bounded by the budget.
+        
+        Args:
+            titles (List[str]): Titles of the movies to base recommendations on
+            n_recommendations (int): Number of recommendations per title
+            min_rating_count (int): Minimum number of ratings required
+            min_avg_rating (float): Minimum average rating required
+            as_frame (bool): Return a long-format DataFrame instead of arrays
+            memory_budget_mb (float): Memory budget for one dense score chunk
+            
+        Returns:
+            pd.DataFrame: Columns (seed_title, rank, title, similarity_score,
+            genres, avg_rating, rating_count), one row per recommendation.
+            With as_frame=False, a tuple (seed_indices, indices, scores) where
+            indices (int32) and scores (float32) are (n_titles x n_recommendations)
+            arrays padded with -1 and NaN, and unknown titles get seed index -1.
+        """
+        titles = list(titles)
+        seed_indices = self._resolve_titles(titles)
+        n_movies = len(self.movies_with_ratings)
+        
+        indices = np.full((len(titles), n_recommendations), -1, dtype=np.int32)
+        scores = np.full((len(titles), n_recommendations), np.nan, dtype=np.float32)
+        
+        # Apply the rating filters once for the whole batch
+        eligible = (
+            (self._rating_count >= min_rating_count) &
+            (self._avg_rating >= min_avg_rating)
+        )
+        
+        found = np.flatnonzero(seed_indices >= 0)
+        bytes_per_seed = n_movies * np.dtype(np.float32).itemsize
+        chunk_size = max(1, int(memory_budget_mb * 1024 * 1024 // bytes_per_seed))
+        
+        for start in range(0, len(found), chunk_size):
+            rows = found[start:start + chunk_size]
+            seeds = seed_indices[rows]
+            
+            # Score the whole chunk with one sparse matrix product
+            if self.cosine_sim is not None:
+                block = np.asarray(self.cosine_sim[seeds], dtype=np.float32)
+            else:
+                block = (self.tfidf_matrix[seeds] @ self.tfidf_matrix.T).toarray()
+                block = block.astype(np.float32, copy=False)
+            
+            block[:, ~eligible] = -np.inf
+            block[np.arange(len(seeds)), seeds] = -np.inf
+            
+            top_indices, top_scores = top_k_rows(block, n_recommendations)
+            keep = top_scores > 0
+            width = top_indices.shape[1]
+            indices[rows, :width] = np.where(keep, top_indices, -1)
+            scores[rows, :width] = np.where(keep, top_scores, np.nan)
+        
+        if not as_frame:
+            return seed_indices, indices, scores
+        
+        seed_rows, ranks = np.nonzero(indices >= 0)
+        movie_indices = indices[seed_rows, ranks]
+        
+        return pd.DataFrame({
+            'seed_title': np.asarray(titles, dtype=object)[seed_rows],
+            'rank': ranks + 1,
+            'title': self._titles[movie_indices],
+            'similarity_score': scores[seed_rows, ranks],
+            'genres': self._genres[movie_indices],
+            'avg_rating': self._avg_rating[movie_indices],
+            'rating_count': self._rating_count[movie_indices].astype(np.int64)
+        })
+    
+    def _score_user_histories(
+        self,
+        indptr: np.ndarray,
+        movie_rows: np.ndarray,
+        ratings: np.ndarray,
+        n_recommendations: int,
+        eligible: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recommend movies for a block of users from their rating histories.
+        
+        Each user's taste vector is the sum of the TF-IDF rows of the movies
+        they rated, weighted by the rating minus the user's mean rating (the raw
+        ratings when all of them are equal) and L2-normalized, so scores are
+        cosine similarities. The taste vectors of the whole block are scored
+        against the catalog with one sparse matrix product.
+        
+        Args:
+            indptr (np.ndarray): User i rated movie_rows[indptr[i]:indptr[i + 1]]
+            movie_rows (np.ndarray): Row positions of the rated movies
+            ratings (np.ndarray): Rating of every history entry
+            n_recommendations (int): Number of recommendations per user
+            eligible (np.ndarray): Boolean mask of the movies that may be recommended
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (indices, scores), (n_users x n_recommendations)
+            arrays padded with -1 and NaN
+        """
+        n_users = len(indptr) - 1
+        counts = np.diff(indptr)
+        owners = np.repeat(np.arange(n_users), counts)
+        
+        # Weight every rated movie by how much the user liked it relative to their mean
+        means = np.bincount(owners, weights=ratings, minlength=n_users) / np.maximum(counts, 1)
+        weights = ratings - means[owners]
+        flat = np.bincount(owners, weights=np.abs(weights), minlength=n_users) == 0
+        weights = np.where(flat[owners], ratings, weights)
+        
+        history = sp.csr_matrix((weights, movie_rows, indptr), shape=(n_users, len(self._titles)))
+        profiles = normalize(history @ self.tfidf_matrix)
+        block = (profiles @ self.tfidf_matrix.T).toarray().astype(np.float32, copy=False)
+        
+        # Never recommend ineligible or already seen movies
+        block[:, ~eligible] = -np.inf
+        block[owners, movie_rows] = -np.inf
+        
+        indices = np.full((n_users, n_recommendations), -1, dtype=np.int32)
+        scores = np.full((n_users, n_recommendations), np.nan, dtype=np.float32)
+        top_indices, top_scores = top_k_rows(block, n_recommendations)
+        keep = top_scores > 0
+        width = top_indices.shape[1]
+        indices[:, :width] = np.where(keep, top_indices, -1)
+        scores[:, :width] = np.where(keep, top_scores, np.nan)
+        return indices, scores
+    
+    def get_user_recommendations(
+        self,
+        user_id: int,
+        n_recommendations: int = 10,
+        min_rating_count: int = 5,
+        min_avg_rating: float = 0.0,
+        columnar: bool = False
+    ) -> List[Tuple[str, float, str, float, int]]:
+        """
+        Get personalized content-based recommendations from a user's ratings.
+        
+        Args:
+            user_id (int): Id of the user
+            n_recommendations (int): Number of recommendations to return
+            min_rating_count (int): Minimum number of ratings required
+            min_avg_rating (float): Minimum average rating required
+            columnar (bool): Return a MovieResults instead of a list of tuples
+            
+        Returns:
+            List[Tuple]: List of (title, score, genres, avg_rating, rating_count),
+            empty for users without ratings of catalog movies
+        """
+        rows, values = self.user_history.history(user_id)
+        
+        if len(rows) == 0:
+            empty = self._results(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+            return empty if columnar else []
+        
+        eligible = (
+            (self._rating_count >= min_rating_count) &
+            (self._avg_rating >= min_avg_rating)
+        )
+        indices, scores = self._score_user_histories(
+            np.array([0, len(rows)]), rows, values.astype(np.float64), n_recommendations, eligible
+        )
+        keep = indices[0] >= 0
+        results = self._results(indices[0][keep], scores[0][keep])
+        return results if columnar else results.to_tuples()
+    
+    def recommend_all_users(
+        self,
+        output_path: str,
+        n_recommendations: int = 10,
+        min_rating_count: int = 5,
+        min_avg_rating: float = 0.0,
+        n_jobs: Optional[int] = None,
+        memory_budget_mb: float = 256
+    ) -> int:
+        """
+        Write personalized recommendations for every user to a CSV file.
+        
+        Blocks of users are sliced from the user history index and scored on a
+        pool of forked worker processes that share the fitted recommender
+        copy-on-write. Blocks are written in user order as they complete, so the
+        output never has to fit in memory. Without fork support (or with
+        n_jobs=1) the blocks are scored in this process.
+        
+        Args:
+            output_path (str): CSV file to write (userId, rank, movieId, title, score)
+            n_recommendations (int): Number of recommendations per user
+            min_rating_count (int): Minimum number of ratings required
+            min_avg_rating (float): Minimum average rating required
+            n_jobs (int): Number of worker processes, None for one per CPU
+            memory_budget_mb (float): Memory budget for the dense score blocks of all workers
             
-            recommendations.append((
-                movie['title'],
-                sim_score,
-                movie['genres'],
-                movie['avg_rating'],
-                int(movie['rating_count'])
-            ))
+        Returns:
+            int: Number of users written
+        """
+        global _BULK_STATE
+        
+        history = self.user_history
+        user_ids = history.user_ids
+        
+        eligible = (
+            (self._rating_count >= min_rating_count) &
+            (self._avg_rating >= min_avg_rating)
+        )
+        n_jobs = n_jobs or os.cpu_count() or 1
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            n_jobs = 1
+        bytes_per_user = len(self._titles) * np.dtype(np.float32).itemsize
+        block_size = max(1, int(memory_budget_mb / n_jobs * 1024 * 1024 // bytes_per_user))
+        blocks = [(start, min(start + block_size, len(user_ids))) for start in range(0, len(user_ids), block_size)]
+        movie_ids = self._movie_rows.to_numpy()
         
-        return recommendations
+        _BULK_STATE = (
+            self, history.indptr, history.items, history.ratings.astype(np.float64), n_recommendations, eligible
+        )
+        try:
+            with open(output_path, 'w', newline='', encoding='utf-8') as f:
+                pd.DataFrame(columns=['userId', 'rank', 'movieId', 'title', 'score']).to_csv(f, index=False)
+                
+                if n_jobs > 1:
+                    executor = ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context('fork'))
+                    results = executor.map(_score_user_block, blocks)
+                else:
+                    executor = None
+                    results = map(_score_user_block, blocks)
+                
+                try:
+                    for (start, _), (indices, scores) in zip(blocks, results):
+                        users, ranks = np.nonzero(indices >= 0)
+                        movies = indices[users, ranks]
+                        pd.DataFrame({
+                            'userId': user_ids[start + users],
+                            'rank': ranks + 1,
+                            'movieId': movie_ids[movies],
+                            'title': self._titles[movies],
+                            'score': scores[users, ranks]
+                        }).to_csv(f, header=False, index=False)
+                finally:
+                    if executor is not None:
+                        executor.shutdown()
+        finally:
+            _BULK_STATE = None
+        
+        return len(user_ids)
     
-    def get_popular_movies_by_genre(self, genre: str, n_movies: int = 5) -> List[Tuple[str, str, float, int]]:
+    def get_popular_movies_by_genre(
+        self, 
+        genre: str, 
+        n_movies: int = 5, 
+        columnar: bool = False
+    ) -> List[Tuple[str, str, float, int]]:
         """
         Get popular movies of a specific genre.
         
         Args:
-            genre (str): Genre to filter by
+            genre (str): Genre to filter by (case-insensitive)
             n_movies (int): Number of movies to return
+            columnar (bool): Return a MovieResults instead of a list of tuples
             
         Returns:
             List[Tuple]: List of (title, genres, avg_rating, rating_count)
         """
-        # Filter movies by genre
-        genre_movies = self.movies_with_ratings[
-            self.movies_with_ratings['genres'].str.contains(genre, na=False)
-        ]
-        
-        # Sort by popularity (rating count) and then by average rating
-        popular_movies = genre_movies.sort_values(
-            ['rating_count', 'avg_rating'], 
-            ascending=[False, False]
-        ).head(n_movies)
+        return self.get_movies_by_genres(genre.split('|'), n_movies=n_movies, match='any', columnar=columnar)
+    
+    def get_movies_by_genres(
+        self, 
+        genres: List[str], 
+        n_movies: int = 20, 
+        match: str = 'any',
+        columnar: bool = False
+    ) -> List[Tuple[str, str, float, int]]:
+        """
+        Get the most popular movies matching a combination of genres.
         
-        return [
-            (row['title'], row['genres'], row['avg_rating'], int(row['rating_count']))
-            for _, row in popular_movies.iterrows()
-        ]
+        Args:
+            genres (List[str]): Genres to filter by (case-insensitive)
+            n_movies (int): Number of movies to return
+            match (str): 'any' for movies with at least one of the genres,
+                'all' for movies with every genre
+            columnar (bool): Return a MovieResults instead of a list of tuples
+            
+        Returns:
+            List[Tuple]: List of (title, genres, avg_rating, rating_count)
+        """
+        rows = self.genre_index.top_rows(genres, self._popularity_rank, n_movies, match=match)
+        results = self._results(rows)
+        return results if columnar else results.to_tuples()
     
     def get_movies_by_rating_range(
         self, 
         min_rating: float, 
         max_rating: float, 
         min_ratings: int = 10,
-        n_movies: int = 10
+        n_movies: int = 10,
+        columnar: bool = False
     ) -> List[Tuple[str, str, float, int]]:
         """
         Get movies within a specific rating range.
@@ -220,78 +1812,65 @@ class MovieRecommender:
             max_rating (float): Maximum average rating
             min_ratings (int): Minimum number of ratings required
             n_movies (int): Number of movies to return
+            columnar (bool): Return a MovieResults instead of a list of tuples
             
         Returns:
             List[Tuple]: List of (title, genres, avg_rating, rating_count)
         """
-        filtered_movies = self.movies_with_ratings[
-            (self.movies_with_ratings['avg_rating'] >= min_rating) &
-            (self.movies_with_ratings['avg_rating'] <= max_rating) &
-            (self.movies_with_ratings['rating_count'] >= min_ratings)
-        ]
+        # Sorted by average rating
+        rows = self.rating_index.top_rows(min_rating, max_rating, min_ratings, n_movies)
         
-        # Sort by average rating
-        top_movies = filtered_movies.sort_values('avg_rating', ascending=False).head(n_movies)
-        
-        return [
-            (row['title'], row['genres'], row['avg_rating'], int(row['rating_count']))
-            for _, row in top_movies.iterrows()
-        ]
+        results = self._results(rows)
+        return results if columnar else results.to_tuples()
     
-    def search_movies(self, query: str, n_results: int = 10) -> List[Tuple[str, str, float, int]]:
+    def search_movies(
+        self, 
+        query: str, 
+        n_results: int = 10, 
+        columnar: bool = False
+    ) -> List[Tuple[str, str, float, int]]:
         """
         Search for movies by title or genre.
         
         Args:
             query (str): Search query
             n_results (int): Number of results to return
+            columnar (bool): Return a MovieResults instead of a list of tuples
             
         Returns:
             List[Tuple]: List of (title, genres, avg_rating, rating_count)
         """
-        query = query.lower()
-        
         # Search in titles and genres
-        mask = (
-            self.movies_with_ratings['title_clean'].str.lower().str.contains(query, na=False) |
-            self.movies_with_ratings['genres'].str.lower().str.contains(query, na=False)
+        matches = np.union1d(
+            self.search_index.find_title(query),
+            self.search_index.find_genres(query)
         )
         
-        results = self.movies_with_ratings[mask].sort_values(
-            ['rating_count', 'avg_rating'], 
-            ascending=[False, False]
-        ).head(n_results)
+        # Most popular matches first
+        rows = order_by_rank(matches, self._popularity_rank, n_results)
         
-        return [
-            (row['title'], row['genres'], row['avg_rating'], int(row['rating_count']))
-            for _, row in results.iterrows()
-        ]
+        results = self._results(rows)
+        return results if columnar else results.to_tuples()
     
-    def get_movies_by_genre(self, genre: str, n_movies: int = 20) -> List[Tuple[str, str, float, int]]:
+    def get_movies_by_genre(
+        self, 
+        genre: str, 
+        n_movies: int = 20, 
+        columnar: bool = False
+    ) -> List[Tuple[str, str, float, int]]:
         """
         Get movies by specific genre.
         
         Args:
             genre (str): Genre to filter by
             n_movies (int): Number of movies to return
+            columnar (bool): Return a MovieResults instead of a list of tuples
             
         Returns:
             List[Tuple]: List of (title, genres, avg_rating, rating_count)
         """
-        # Filter movies by genre
-        mask = self.movies_with_ratings['genres'].str.contains(genre, na=False, case=False)
-        genre_movies = self.movies_with_ratings[mask]
-        
-        # Sort by rating count (popularity) and then by average rating
-        top_movies = genre_movies.sort_values(
-            ['rating_count', 'avg_rating'], 
-            ascending=[False, False]
-        ).head(n_movies)
-        
-        return [
-            (row['title'], row['genres'], row['avg_rating'], int(row['rating_count']))
-            for _, row in top_movies.iterrows()
-        ]
+        # Sorted by rating count (popularity) and then by average rating
+        return self.get_movies_by_genres(genre.split('|'), n_movies=n_movies, match='any', columnar=columnar)
     
     def get_dataset_stats(self) -> dict:
         """
@@ -304,7 +1883,7 @@ class MovieRecommender:
             'total_movies': len(self.movies_with_ratings),
             'total_ratings': len(self.ratings_df),
             'unique_users': self.ratings_df['userId'].nunique(),
-            'avg_rating': self.ratings_df['rating'].mean(),
+            'avg_rating': self.ratings_df['rating'].astype(np.float64).mean(),
             'top_genres': self._get_top_genres(5)
         }
     
@@ -336,7 +1915,7 @@ if __name__ == "__main__":
     movies_df, ratings_df, _ = analyzer.load_data()
     
     if movies_df is not None and ratings_df is not None:
-        recommender = MovieRecommender(movies_df, ratings_df)
+        recommender = MovieRecommender.from_dataset(analyzer.dataset)
         
         # Test recommendations
         recommendations = recommender.get_recommendations("The Dark Knight", n_recommendations=5)
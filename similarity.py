@@ -0,0 +1,382 @@
+import numpy as np
+import os
+import scipy.sparse as sp
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+class NeighborIndex:
+    """
+    Top-K nearest neighbors per item stored as compact CSR-style arrays.
+
+    Row ``i`` owns the slice ``indptr[i]:indptr[i + 1]`` of ``indices`` (int32)
+    and ``scores`` (float32), ordered by descending score. A row holding fewer
+    than ``k`` entries contains every positive similarity of that item.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, scores: np.ndarray, k: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+        self.k = k
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes + self.scores.nbytes
+
+    def neighbors(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the stored neighbors of a row.
+
+        Args:
+            row (int): Row position of the item
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (neighbor indices, similarity scores)
+        """
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.indices[start:end], self.scores[start:end]
+
+    def candidates_that_fit(
+        self,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        scores: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Drop candidate entries that cannot displace the last entry of a full list.
+
+        Args:
+            rows (np.ndarray): Row of every candidate entry
+            cols (np.ndarray): Neighbor index of every candidate entry
+            scores (np.ndarray): Similarity score of every candidate entry
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The remaining (rows, cols, scores)
+        """
+        rows, cols, scores = np.asarray(rows), np.asarray(cols), np.asarray(scores, dtype=np.float32)
+        full = np.zeros(len(rows), dtype=bool)
+        existing = rows < self.n_rows
+        full[existing] = np.diff(self.indptr)[rows[existing]] >= self.k
+
+        last = self.indptr[rows[full] + 1] - 1
+        beats = (scores[full] > self.scores[last]) | (
+            (scores[full] == self.scores[last]) & (cols[full] < self.indices[last])
+        )
+        keep = np.ones(len(rows), dtype=bool)
+        keep[np.flatnonzero(full)[~beats]] = False
+        return rows[keep], cols[keep], scores[keep]
+
+    def merge(self, rows: np.ndarray, cols: np.ndarray, scores: np.ndarray, n_rows: int) -> 'NeighborIndex':
+        """
+        Merge candidate neighbors into the lists, keeping the top-K of each row.
+
+        Candidates are inserted into the existing lists rather than re-sorting
+        them, so the cost is linear in the stored entries plus a binary search
+        per candidate. Rows beyond the current ``n_rows`` start out empty.
+
+        Args:
+            rows (np.ndarray): Row of every candidate entry
+            cols (np.ndarray): Neighbor index of every candidate entry
+            scores (np.ndarray): Similarity score of every candidate entry
+            n_rows (int): Number of rows of the merged index
+
+        Returns:
+            NeighborIndex: The merged index
+        """
+        rows, cols, scores = self.candidates_that_fit(rows, cols, scores)
+        old_rows = np.repeat(np.arange(self.n_rows), np.diff(self.indptr))
+
+        # The lists are sorted by (row, -score, col) as a whole, so every
+        # candidate gets an insertion point from one vectorized binary search
+        order = np.lexsort((cols, -scores, rows))
+        rows, cols, scores = rows[order], cols[order].astype(np.int32), scores[order]
+        lo = np.zeros(len(rows), dtype=np.int64)
+        hi = np.full(len(rows), len(old_rows), dtype=np.int64)
+        while True:
+            active = lo < hi
+            if not active.any():
+                break
+            mid = np.minimum((lo + hi) // 2, len(old_rows) - 1)
+            mid_rows, mid_scores = old_rows[mid], self.scores[mid]
+            before = (mid_rows < rows) | ((mid_rows == rows) & (
+                (mid_scores > scores) | ((mid_scores == scores) & (self.indices[mid] < cols))
+            ))
+            lo = np.where(active & before, mid + 1, lo)
+            hi = np.where(active & ~before, mid, hi)
+
+        all_rows = np.insert(old_rows, lo, rows)
+        all_cols = np.insert(self.indices, lo, cols)
+        all_scores = np.insert(self.scores, lo, scores)
+
+        # Trim the lists that grew past K
+        starts = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(all_rows, minlength=n_rows), out=starts[1:])
+        keep = (np.arange(len(all_rows)) - starts[all_rows] < self.k) & (all_scores > 0)
+
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(all_rows[keep], minlength=n_rows), out=indptr[1:])
+        indices, new_scores = all_cols[keep], all_scores[keep]
+
+        return NeighborIndex(indptr, indices, new_scores, self.k)
+
+# Peak bytes per cell of a row block: while densified, the float32 sparse
+# product (value + int32 column index) and its dense copy; during the top-K
+# selection, the dense block, its negated copy and the int64 argpartition
+# indices (the tie check after it only adds a boolean mask)
+_PRODUCT_BYTES_PER_CELL = 12
+_TOP_K_BYTES_PER_CELL = 16
+
+def _block_rows(n_cols: int, memory_budget_mb: float, bytes_per_cell: int = _TOP_K_BYTES_PER_CELL) -> int:
+    """
+    Number of rows of a similarity block that fit in the memory budget.
+    """
+    bytes_per_row = max(n_cols, 1) * bytes_per_cell
+    return max(1, int(memory_budget_mb * 1024 * 1024 // bytes_per_row))
+
+def _as_float32(matrix):
+    """
+    The matrix as float32 CSR (or a float32 array), so block products are float32.
+    """
+    if sp.issparse(matrix):
+        return matrix.astype(np.float32, copy=False).tocsr()
+    return np.asarray(matrix, dtype=np.float32)
+
+def _product_block(matrix, matrix_t, start: int, end: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Dense float32 similarities of rows ``start:end`` against every row.
+    """
+    block = matrix[start:end] @ matrix_t
+    if sp.issparse(block):
+        return block.toarray(out=out)
+    if out is None:
+        return np.asarray(block)
+    out[...] = block
+    return out
+
+def _map_blocks(function, n_rows: int, block_size: int, n_jobs: int) -> list:
+    """
+    Apply ``function(start, end)`` to consecutive row blocks, on a thread pool
+    when ``n_jobs`` > 1 (sparse products release the GIL). Results are in
+    block order.
+    """
+    bounds = [(start, min(start + block_size, n_rows)) for start in range(0, n_rows, block_size)]
+    if n_jobs > 1 and len(bounds) > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            return list(executor.map(lambda bound: function(*bound), bounds))
+    return [function(*bound) for bound in bounds]
+
+def similarity_matrix(
+    matrix,
+    memory_budget_mb: float = 256,
+    n_jobs: Optional[int] = None,
+    path: Optional[str] = None
+) -> np.ndarray:
+    """
+    Compute the full cosine similarity matrix block by block in float32.
+
+    Rows of ``matrix`` are expected to be L2-normalized. Every row block is
+    written straight into the output, so apart from the output only the
+    sparse products of the ``n_jobs`` blocks in flight (within
+    ``memory_budget_mb``) are held. With ``path`` the output is a .npy file
+    opened as a memory map, so the N x N matrix need not fit in memory.
+
+    Args:
+        matrix: Sparse (or dense) item x feature matrix with L2-normalized rows
+        memory_budget_mb (float): Memory budget for the blocks in flight
+        n_jobs (int): Number of worker threads, None for one per CPU
+        path (str): .npy file to write the matrix to, None to keep it in memory
+
+    Returns:
+        np.ndarray: (n x n) float32 similarities, a read-write memmap with ``path``
+    """
+    matrix = _as_float32(matrix)
+    n_rows = matrix.shape[0]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    block_size = _block_rows(n_rows, memory_budget_mb / n_jobs, _PRODUCT_BYTES_PER_CELL)
+    matrix_t = matrix.T.tocsr() if sp.issparse(matrix) else matrix.T
+
+    if path is None:
+        output = np.empty((n_rows, n_rows), dtype=np.float32)
+    else:
+        output = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(n_rows, n_rows))
+
+    _map_blocks(
+        lambda start, end: _product_block(matrix, matrix_t, start, end, out=output[start:end]),
+        n_rows, block_size, n_jobs
+    )
+    if path is not None:
+        output.flush()
+    return output
+
+def _lowest_ties(scores: np.ndarray, above: np.ndarray, kth: float, k: int) -> np.ndarray:
+    """
+    Complete the columns scoring above the K-th score with the lowest columns at it.
+
+    The row is scanned in windows that double in size, so rows whose ties
+    come early are not scanned to the end.
+    """
+    found = [above]
+    need = k - len(above)
+    start, window = 0, max(4 * need, 1024)
+    while need > 0:
+        cols = np.flatnonzero(scores[start:start + window] == kth)[:need] + start
+        found.append(cols)
+        need -= len(cols)
+        start += window
+        window *= 2
+    return np.concatenate(found)
+
+def top_k_rows(block: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the top-K columns of every row of a dense score block.
+
+    Ties at the K-th score keep the lowest columns, so the selection does not
+    depend on which tied columns the partition happens to return.
+
+    Args:
+        block (np.ndarray): Dense (rows x columns) score block
+        k (int): Number of columns to keep per row
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (column indices, scores), both (rows x k)
+        and ordered by descending score, ties broken by column index
+    """
+    k = min(k, block.shape[1])
+    if k < block.shape[1]:
+        cand = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        cand_scores = np.take_along_axis(block, cand, axis=1)
+        kth = cand_scores.min(axis=1)[:, np.newaxis]
+
+        # Rows where the partition left out columns scoring the K-th score
+        tied = np.flatnonzero(
+            np.count_nonzero(block == kth, axis=1) > np.count_nonzero(cand_scores == kth, axis=1)
+        )
+        if len(tied):
+            cand = cand.copy()
+        for row in tied.tolist():
+            cand[row] = _lowest_ties(block[row], cand[row][cand_scores[row] > kth[row]], kth[row, 0], k)
+    else:
+        cand = np.broadcast_to(np.arange(block.shape[1]), block.shape).copy()
+    cand_scores = np.take_along_axis(block, cand, axis=1)
+
+    # Sort the small candidate set by (-score, column)
+    order = np.lexsort((cand, -cand_scores), axis=1)
+    return (
+        np.take_along_axis(cand, order, axis=1),
+        np.take_along_axis(cand_scores, order, axis=1)
+    )
+
+def build_neighbor_index(
+    matrix,
+    k: int = 100,
+    memory_budget_mb: float = 256,
+    exclude_self: bool = True,
+    n_jobs: Optional[int] = 1
+) -> NeighborIndex:
+    """
+    Build a top-K cosine neighbor index block by block.
+
+    Rows of ``matrix`` are expected to be L2-normalized (the default output of
+    ``TfidfVectorizer``), so the dot product is the cosine similarity. Row
+    blocks are scored in float32 on a thread pool (sparse products release
+    the GIL); at most ``n_jobs`` blocks are alive at a time, sized so that
+    their sparse products, dense copies and top-K temporaries together fit
+    in ``memory_budget_mb``.
+
+    Args:
+        matrix: Sparse (or dense) item x feature matrix with L2-normalized rows
+        k (int): Number of neighbors to keep per item
+        memory_budget_mb (float): Memory budget for the similarity blocks
+        exclude_self (bool): Whether to drop each item from its own neighbors
+        n_jobs (int): Number of worker threads, None for one per CPU
+
+    Returns:
+        NeighborIndex: Neighbor indices and scores for every row
+    """
+    matrix = _as_float32(matrix)
+    n_rows = matrix.shape[0]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    block_size = _block_rows(n_rows, memory_budget_mb / n_jobs)
+    matrix_t = matrix.T.tocsr() if sp.issparse(matrix) else matrix.T
+
+    def score_block(start, end):
+        block = _product_block(matrix, matrix_t, start, end)
+
+        if exclude_self:
+            rows = np.arange(end - start)
+            block[rows, rows + start] = -np.inf
+
+        cand, cand_scores = top_k_rows(block, k)
+
+        # Only keep real (positive) similarities
+        keep = cand_scores > 0
+        return (
+            keep.sum(axis=1),
+            cand[keep].astype(np.int32),
+            cand_scores[keep].astype(np.float32)
+        )
+
+    blocks = _map_blocks(score_block, n_rows, block_size, n_jobs)
+
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    if blocks:
+        np.cumsum(np.concatenate([counts for counts, _, _ in blocks]), out=indptr[1:])
+
+    return NeighborIndex(
+        indptr,
+        np.concatenate([indices for _, indices, _ in blocks]) if blocks else np.zeros(0, dtype=np.int32),
+        np.concatenate([scores for _, _, scores in blocks]) if blocks else np.zeros(0, dtype=np.float32),
+        k
+    )
+
+def extend_neighbor_index(
+    index: NeighborIndex,
+    matrix,
+    memory_budget_mb: float = 256
+) -> NeighborIndex:
+    """
+    Add rows appended to ``matrix`` to a neighbor index built on its first rows.
+
+    Only the new rows are scored against the whole matrix, block by block: the
+    new rows get their top-K lists, and every existing row that a new row
+    would enter is merged with that candidate.
+
+    Args:
+        index (NeighborIndex): Index of the first ``index.n_rows`` rows
+        matrix: Sparse item x feature matrix with L2-normalized rows, including the new rows
+        memory_budget_mb (float): Memory budget for the similarity blocks
+
+    Returns:
+        NeighborIndex: Neighbor index of every row of ``matrix``
+    """
+    matrix = _as_float32(matrix)
+    first_row, n_rows = index.n_rows, matrix.shape[0]
+    block_size = _block_rows(n_rows, memory_budget_mb)
+    matrix_t = matrix.T.tocsr()
+
+    rows, cols, scores = [], [], []
+    for start in range(first_row, n_rows, block_size):
+        end = min(start + block_size, n_rows)
+        block = _product_block(matrix, matrix_t, start, end)
+        block_rows = np.arange(end - start)
+        block[block_rows, block_rows + start] = -np.inf
+
+        # Top-K lists of the new rows
+        cand, cand_scores = top_k_rows(block, index.k)
+        keep = cand_scores > 0
+        rows.append(np.repeat(np.arange(start, end), keep.sum(axis=1)))
+        cols.append(cand[keep])
+        scores.append(cand_scores[keep])
+
+        # Existing rows the new rows may enter
+        new_pos, existing = np.nonzero(block[:, :first_row] > 0)
+        entries = index.candidates_that_fit(existing, new_pos + start, block[new_pos, existing])
+        rows.append(entries[0])
+        cols.append(entries[1])
+        scores.append(entries[2])
+
+    return index.merge(np.concatenate(rows), np.concatenate(cols), np.concatenate(scores), n_rows)
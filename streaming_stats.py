@@ -0,0 +1,291 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+# Columns of ratings.csv the aggregation reads
+RATING_COLUMNS = ['userId', 'movieId', 'rating']
+
+# Bytes of CSV text parsed per task; bounds the memory of every worker
+DEFAULT_BLOCK_BYTES = 64 << 20
+
+# Ids at or above these limits do not get a slot in the dense arrays
+MAX_MOVIE_ID = 1 << 26
+MAX_BITMAP_USERS = 1 << 28
+
+# Number of set bits of every byte value
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.int64)
+
+class RatingAggregates:
+    """
+    Streaming per-movie and global rating statistics.
+
+    Per-movie sum, count and sum of squares are float64 arrays indexed by
+    movieId. Users are tracked in a packed bitmap indexed by userId; users
+    outside the bitmap range go to an exact set. The histogram maps every
+    rating value to its count. Aggregates of disjoint chunks combine with
+    merge() in any order: MovieLens ratings are multiples of 0.5, so the
+    float64 sums are exact and equal the in-memory statistics.
+    """
+
+    def __init__(self):
+        self.n_rows = 0
+        self.sums = np.zeros(0)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.sumsq = np.zeros(0)
+        self.histogram = {}
+        self.user_bitmap = np.zeros(0, dtype=np.uint8)
+        self.other_users = np.zeros(0, dtype=np.int64)
+
+    @staticmethod
+    def _grow(array: np.ndarray, size: int) -> np.ndarray:
+        if len(array) >= size:
+            return array
+        grown = np.zeros(size, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def add(self, user_ids: np.ndarray, movie_ids: np.ndarray, ratings: np.ndarray):
+        """
+        Accumulate one chunk of ratings.
+
+        Rows with a missing movie id or rating only count towards n_rows and
+        the users, like the in-memory statistics.
+
+        Args:
+            user_ids (np.ndarray): userId of every rating
+            movie_ids (np.ndarray): movieId of every rating
+            ratings (np.ndarray): Rating values
+        """
+        self.n_rows += len(ratings)
+        self._add_users(user_ids)
+
+        ratings = np.asarray(ratings, dtype=np.float64)
+        movie_ids = np.asarray(movie_ids)
+        valid = ~np.isnan(ratings)
+        if movie_ids.dtype.kind == 'f':
+            valid &= ~np.isnan(movie_ids)
+        movie_ids = movie_ids[valid].astype(np.int64)
+        ratings = ratings[valid]
+        if len(movie_ids) == 0:
+            return
+
+        if movie_ids.min() < 0 or movie_ids.max() >= MAX_MOVIE_ID:
+            raise ValueError(f"movieId outside [0, {MAX_MOVIE_ID}) cannot be aggregated in streaming mode")
+
+        size = int(movie_ids.max()) + 1
+        self.sums = self._grow(self.sums, size)
+        self.counts = self._grow(self.counts, size)
+        self.sumsq = self._grow(self.sumsq, size)
+        self.sums[:size] += np.bincount(movie_ids, weights=ratings, minlength=size)
+        self.counts[:size] += np.bincount(movie_ids, minlength=size)
+        self.sumsq[:size] += np.bincount(movie_ids, weights=ratings * ratings, minlength=size)
+
+        values, value_counts = np.unique(ratings, return_counts=True)
+        for value, count in zip(values.tolist(), value_counts.tolist()):
+            self.histogram[value] = self.histogram.get(value, 0) + count
+
+    def _add_users(self, user_ids: np.ndarray):
+        user_ids = np.asarray(user_ids)
+        if user_ids.dtype.kind == 'f':
+            user_ids = user_ids[~np.isnan(user_ids)]
+        user_ids = user_ids.astype(np.int64)
+        if len(user_ids) == 0:
+            return
+
+        in_range = (user_ids >= 0) & (user_ids < MAX_BITMAP_USERS)
+        if not in_range.all():
+            self.other_users = np.union1d(self.other_users, user_ids[~in_range])
+            user_ids = user_ids[in_range]
+            if len(user_ids) == 0:
+                return
+
+        # Set the bits in place, in np.packbits order (most significant bit first)
+        self.user_bitmap = self._grow(self.user_bitmap, (int(user_ids.max()) >> 3) + 1)
+        np.bitwise_or.at(self.user_bitmap, user_ids >> 3, (1 << (7 - (user_ids & 7))).astype(np.uint8))
+
+    def merge(self, other: 'RatingAggregates') -> 'RatingAggregates':
+        """
+        Add the aggregates of another, disjoint set of ratings into this one.
+
+        Args:
+            other (RatingAggregates): Aggregates to merge in
+
+        Returns:
+            RatingAggregates: self
+        """
+        self.n_rows += other.n_rows
+        for name in ('sums', 'counts', 'sumsq'):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            mine = self._grow(mine, len(theirs))
+            mine[:len(theirs)] += theirs
+            setattr(self, name, mine)
+
+        for value, count in other.histogram.items():
+            self.histogram[value] = self.histogram.get(value, 0) + count
+
+        self.user_bitmap = self._grow(self.user_bitmap, len(other.user_bitmap))
+        self.user_bitmap[:len(other.user_bitmap)] |= other.user_bitmap
+        self.other_users = np.union1d(self.other_users, other.other_users)
+        return self
+
+    @property
+    def n_ratings(self) -> int:
+        """Number of ratings with a value."""
+        return int(self.counts.sum())
+
+    @property
+    def n_users(self) -> int:
+        """Number of distinct users."""
+        return int(_POPCOUNT[self.user_bitmap].sum()) + len(self.other_users)
+
+    @property
+    def mean(self) -> float:
+        """Mean of all ratings."""
+        return float(self.sums.sum() / self.n_ratings) if self.n_ratings else float('nan')
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation of all ratings (ddof=1, like pandas)."""
+        n = self.n_ratings
+        if n < 2:
+            return float('nan')
+        total = self.sums.sum()
+        variance = (self.sumsq.sum() - total * total / n) / (n - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+    def rating_distribution(self) -> pd.Series:
+        """
+        Number of ratings per rating value, sorted by value.
+
+        Returns:
+            pd.Series: Counts indexed by rating, like value_counts().sort_index()
+        """
+        values = sorted(self.histogram)
+        return pd.Series([self.histogram[value] for value in values], index=values, name='count')
+
+    def per_movie(self, movie_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Per-movie statistics aligned with a list of movie ids.
+
+        Args:
+            movie_ids (np.ndarray): movieId of every catalog row
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (sum, count, sum of squares)
+            as float64, 0 for movies without ratings
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        known = (movie_ids >= 0) & (movie_ids < len(self.sums))
+        rows = movie_ids[known]
+
+        sums, counts, sumsq = (np.zeros(len(movie_ids)) for _ in range(3))
+        sums[known] = self.sums[rows]
+        counts[known] = self.counts[rows]
+        sumsq[known] = self.sumsq[rows]
+        return sums, counts, sumsq
+
+def byte_ranges(path: str, block_bytes: int = DEFAULT_BLOCK_BYTES, min_ranges: int = 1) -> List[Tuple[int, int]]:
+    """
+    Split a file into byte ranges of at most ``block_bytes``.
+
+    Ranges are cut at arbitrary bytes; _aggregate_range moves each start to
+    the next line, so every line is parsed by exactly one range.
+
+    Args:
+        path (str): Path to the file
+        block_bytes (int): Maximum size of a range
+        min_ranges (int): Minimum number of ranges, e.g. one per worker
+
+    Returns:
+        List[Tuple[int, int]]: (start, end) of every range
+    """
+    size = os.path.getsize(path)
+    n_ranges = max(min_ranges, -(-size // block_bytes), 1)
+    bounds = np.linspace(0, size, n_ranges + 1).astype(np.int64).tolist()
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+def read_header(path: str) -> List[str]:
+    with open(path, 'rb') as f:
+        return f.readline().decode('utf-8').strip().split(',')
+
+def _aggregate_range(task: Tuple[str, List[str], int, int]) -> RatingAggregates:
+    """
+    Aggregate the lines that start inside a byte range of a ratings CSV.
+    """
+    path, header, start, end = task
+    aggregates = RatingAggregates()
+
+    with open(path, 'rb') as f:
+        if start == 0:
+            f.readline()
+        else:
+            # Skip the line that started before the range (or begins at it)
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell()
+        if position >= end:
+            return aggregates
+        text = f.read(end - position)
+        if not text.endswith(b'\n'):
+            # Finish the line that crosses the end of the range
+            text += f.readline()
+
+    if not text.strip():
+        return aggregates
+
+    frame = pd.read_csv(io.BytesIO(text), header=None, names=header, usecols=RATING_COLUMNS)
+    aggregates.add(
+        frame['userId'].to_numpy(),
+        frame['movieId'].to_numpy(),
+        frame['rating'].to_numpy()
+    )
+    return aggregates
+
+def aggregate_ratings(
+    path: str,
+    n_jobs: Optional[int] = None,
+    block_bytes: int = DEFAULT_BLOCK_BYTES
+) -> RatingAggregates:
+    """
+    Aggregate a ratings CSV without loading it into memory.
+
+    The file is split into byte ranges of at most ``block_bytes`` that are
+    parsed and aggregated on a process pool; the partial aggregates are merged
+    as they arrive, with at most two ranges per worker in flight. Fields must
+    not contain quoted line breaks, which MovieLens ratings files never do.
+
+    Args:
+        path (str): Path to ratings.csv
+        n_jobs (int): Worker processes (defaults to the CPU count, 1 runs inline)
+        block_bytes (int): Bytes of text parsed per task
+
+    Returns:
+        RatingAggregates: Statistics of the whole file
+    """
+    header = read_header(path)
+    missing = [column for column in RATING_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"{path} has no {', '.join(missing)} column")
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    tasks = [(path, header, start, end) for start, end in byte_ranges(path, block_bytes, n_jobs)]
+    result = RatingAggregates()
+
+    if n_jobs == 1 or len(tasks) == 1:
+        for task in tasks:
+            result.merge(_aggregate_range(task))
+        return result
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_aggregate_range, task))
+            if len(pending) >= 2 * n_jobs:
+                result.merge(pending.popleft().result())
+        while pending:
+            result.merge(pending.popleft().result())
+    return result
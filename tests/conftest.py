@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# The modules live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+N_MOVIES = 600
+
+@pytest.fixture(scope='session')
+def data_paths(tmp_path_factory):
+    """Paths of a movies.csv and ratings.csv sample of the bundled MovieLens data."""
+    movies_df = pd.read_csv(os.path.join(ROOT, 'data', 'movies.csv')).iloc[:N_MOVIES]
+    ratings_df = pd.read_csv(os.path.join(ROOT, 'data', 'ratings.csv'))
+    ratings_df = ratings_df[ratings_df['movieId'].isin(movies_df['movieId'])]
+
+    directory = tmp_path_factory.mktemp('data')
+    paths = str(directory / 'movies.csv'), str(directory / 'ratings.csv')
+    movies_df.to_csv(paths[0], index=False)
+    ratings_df.to_csv(paths[1], index=False)
+    return paths
+
+@pytest.fixture(scope='session')
+def movies_df(data_paths):
+    return pd.read_csv(data_paths[0])
+
+@pytest.fixture(scope='session')
+def ratings_df(data_paths):
+    return pd.read_csv(data_paths[1])
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from ann_index import IVFIndex
+
+@pytest.fixture(scope='module')
+def features(movies_df):
+    return TfidfVectorizer().fit_transform(movies_df['title'] + ' ' + movies_df['genres'].str.replace('|', ' '))
+
+def exact_scores(matrix, row, k):
+    scores = (matrix @ matrix[row].T).toarray().ravel()
+    scores[row] = -np.inf
+    top = np.sort(scores)[::-1][:k]
+    return top[top > 0]
+
+def test_probing_every_list_is_exact(features):
+    index = IVFIndex(n_components=16, n_lists=12).build(features)
+    for row in range(0, features.shape[0], 23):
+        _, scores = index.search(row, 10, n_probe=12)
+        np.testing.assert_allclose(scores, exact_scores(features, row, 10), atol=1e-6)
+
+def test_added_rows_are_searchable(features):
+    n_old = features.shape[0] - 40
+    index = IVFIndex(n_components=16, n_lists=12).build(features[:n_old])
+    index.add(features)
+
+    assert np.array_equal(np.sort(index.list_rows), np.arange(features.shape[0]))
+    for row in range(n_old, features.shape[0], 7):
+        _, scores = index.search(row, 10, n_probe=12)
+        np.testing.assert_allclose(scores, exact_scores(features, row, 10), atol=1e-6)
+
+def test_eligible_mask_is_respected(features):
+    index = IVFIndex(n_components=16, n_lists=12, n_probe=2).build(features)
+    eligible = np.zeros(features.shape[0], dtype=bool)
+    eligible[::3] = True
+
+    rows, _ = index.search(1, 10, eligible=eligible)
+    assert len(rows) and eligible[rows].all()
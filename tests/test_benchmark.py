@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from benchmark import _run_group_in_subprocess, compare, peak_rss_mb, reset_peak_rss
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def report(wall_s, peak_rss_mb, **extra):
+    benchmark = {'wall_s': wall_s, 'calls': 1, 'peak_rss_mb': peak_rss_mb, **extra}
+    return {'results': {'10k': {'n_movies': 10000, 'n_ratings': 1000000, 'benchmarks': {'load_data': benchmark}}}}
+
+def run_compare(tmp_path, baseline, current, *args):
+    paths = []
+    for name, content in (('baseline.json', baseline), ('current.json', current)):
+        paths.append(str(tmp_path / name))
+        with open(paths[-1], 'w', encoding='utf-8') as f:
+            json.dump(content, f)
+    return subprocess.run(
+        [sys.executable, 'benchmark.py', 'compare', *paths, *args], cwd=ROOT, capture_output=True, text=True
+    )
+
+def test_compare_flags_slowdowns_above_threshold():
+    assert compare(report(1.0, 100), report(1.15, 110)) == []
+
+    regressions = compare(report(1.0, 100), report(1.5, 130))
+    assert [(entry['metric'], round(entry['change'], 2)) for entry in regressions] == [('wall_s', 0.5), ('peak_rss_mb', 0.3)]
+    assert compare(report(1.0, 100), report(1.5, 130), threshold=0.6) == []
+
+    # A benchmark that starts failing is a regression, one missing from the baseline is not
+    failed = {'results': {'10k': {'benchmarks': {'load_data': {'error': 'timed out'}}}}}
+    assert [entry['metric'] for entry in compare(report(1.0, 100), failed)] == ['error']
+    assert compare({'results': {}}, report(9.0, 900)) == []
+
+def test_compare_exit_code(tmp_path):
+    passed = run_compare(tmp_path, report(1.0, 100), report(1.1, 100))
+    assert passed.returncode == 0, passed.stderr
+
+    regressed = run_compare(tmp_path, report(1.0, 100), report(2.0, 100))
+    assert regressed.returncode == 1 and 'wall_s' in regressed.stdout
+    assert run_compare(tmp_path, report(1.0, 100), report(2.0, 100), '--threshold', '1.5').returncode == 0
+
+def test_reset_peak_rss_forgets_earlier_peaks():
+    if not reset_peak_rss():
+        pytest.skip("the peak RSS cannot be reset on this platform")
+    block = np.ones(64 * 1024 * 1024 // 8)
+    high = peak_rss_mb()
+    del block
+
+    assert reset_peak_rss()
+    assert peak_rss_mb() < high - 32
+
+def test_isolated_case_reports_its_own_memory(data_paths):
+    results = _run_group_in_subprocess('analyzer', *data_paths, repeat=1, seed=0, timeout=120, cases=['load_data'])
+    assert list(results) == ['load_data']
+    assert 'error' not in results['load_data'], results['load_data']
+    if results['load_data']['rss_increase_mb'] is not None:
+        assert 0 <= results['load_data']['rss_increase_mb'] <= results['load_data']['peak_rss_mb']
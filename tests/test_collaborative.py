@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from collaborative import ItemItemCF, MatrixFactorization
+from user_history import UserHistoryIndex
+
+@pytest.fixture(scope='module')
+def user_history(movies_df, ratings_df):
+    return UserHistoryIndex.from_ratings(ratings_df, movies_df['movieId'].to_numpy())
+
+def test_user_history_matches_ratings(user_history, movies_df, ratings_df):
+    rows = pd.Index(movies_df['movieId'])
+    for user_id, group in list(ratings_df.groupby('userId'))[:30]:
+        items, ratings = user_history.history(user_id)
+        expected = zip(rows.get_indexer(group['movieId']).tolist(), group['rating'].tolist())
+        assert sorted(zip(items.tolist(), ratings.tolist())) == sorted(expected)
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_user_history_save_load(user_history, tmp_path, mmap):
+    user_history.save(str(tmp_path))
+    loaded = UserHistoryIndex.load(str(tmp_path), mmap=mmap)
+    for name in UserHistoryIndex.ARRAYS:
+        # Numeric arrays only, so they load without allow_pickle
+        assert getattr(loaded, name).dtype != object
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(user_history, name))
+
+def test_user_history_with_ratings_matches_rebuild(movies_df, ratings_df):
+    ratings_df = ratings_df.sort_values('timestamp', kind='stable')
+    movie_ids = movies_df['movieId'].to_numpy()
+    history = UserHistoryIndex.from_ratings(ratings_df.iloc[:12000], movie_ids)
+    for start in range(12000, len(ratings_df), 1500):
+        history = history.with_ratings(ratings_df.iloc[start:start + 1500])
+
+    # Re-rated movies, users between the existing ids, unknown movies and missing ratings
+    extra = pd.DataFrame({
+        'userId': [ratings_df['userId'].iloc[0], -5, 10 ** 9, ratings_df['userId'].iloc[1]],
+        'movieId': [ratings_df['movieId'].iloc[0], movie_ids[3], -1, movie_ids[7]],
+        'rating': [1.0, 4.5, 3.0, np.nan]
+    })
+    history = history.with_ratings(extra)
+
+    expected = UserHistoryIndex.from_ratings(pd.concat([ratings_df, extra]), movie_ids)
+    for name in UserHistoryIndex.ARRAYS:
+        assert getattr(history, name).dtype == getattr(expected, name).dtype, name
+        np.testing.assert_array_equal(getattr(history, name), getattr(expected, name), err_msg=name)
+
+@pytest.fixture(scope='module')
+def adjusted_cosine(movies_df, ratings_df):
+    """Dense item x item adjusted cosine similarity of the ratings."""
+    centered = ratings_df['rating'] - ratings_df.groupby('userId')['rating'].transform('mean')
+    matrix = pd.DataFrame({'movieId': ratings_df['movieId'], 'userId': ratings_df['userId'], 'value': centered})
+    matrix = matrix.pivot(index='movieId', columns='userId', values='value').reindex(movies_df['movieId'])
+    matrix = matrix.fillna(0).to_numpy()
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix / np.where(norms == 0, 1, norms)
+    return matrix @ matrix.T
+
+def test_item_cf_neighbors_match_exact_rows(movies_df, user_history, adjusted_cosine):
+    engine = ItemItemCF(n_neighbors=10, memory_budget_mb=0.05).fit(user_history)
+    for row in range(0, len(movies_df), 37):
+        exact = engine.similarity_row(row)
+        np.testing.assert_allclose(exact, adjusted_cosine[row], atol=1e-5)
+
+        exact[row] = -np.inf
+        scores = engine.neighbor_index.scores[engine.neighbor_index.indptr[row]:engine.neighbor_index.indptr[row + 1]]
+        np.testing.assert_allclose(scores, np.sort(exact)[::-1][:len(scores)], atol=1e-5)
+
+def test_matrix_factorization_solves_normal_equations(user_history):
+    # A tiny chunk budget splits the normal equations into many batches
+    model = MatrixFactorization(n_factors=8, n_iterations=3, validation_fraction=0, chunk_memory_mb=0.01, n_jobs=2)
+    model.fit(user_history)
+
+    # The last half-step solved every item against the final user factors
+    item_users = model.user_items.T.tocsr()
+    for item in np.flatnonzero(model.item_counts)[::25]:
+        users = item_users.indices[item_users.indptr[item]:item_users.indptr[item + 1]]
+        ratings = item_users.data[item_users.indptr[item]:item_users.indptr[item + 1]]
+        factors = model.user_factors[users].astype(np.float64)
+        gram = factors.T @ factors + model.regularization * len(users) * np.eye(model.n_factors)
+        np.testing.assert_allclose(model.item_factors[item], np.linalg.solve(gram, factors.T @ ratings), atol=1e-4)
+
+def test_matrix_factorization_predicts_in_one_pass(user_history, movies_df, ratings_df):
+    model = MatrixFactorization(n_factors=8, n_iterations=5).fit(user_history)
+    sample = ratings_df.iloc[::97]
+    user_ids = np.append(sample['userId'].to_numpy(), -1)
+    movie_ids = np.append(sample['movieId'].to_numpy(), movies_df['movieId'].iloc[0])
+
+    predictions = model.predict(user_ids, movie_ids)
+    users = model.user_index.get_indexer(user_ids[:-1])
+    items = model.movie_index.get_indexer(movie_ids[:-1])
+    expected = model.global_mean + (model.user_factors[users] * model.item_factors[items]).sum(axis=1)
+    np.testing.assert_allclose(predictions[:-1], np.clip(expected, *model.rating_range), atol=1e-5)
+    # Unknown users get the global mean
+    assert predictions[-1] == pytest.approx(model.global_mean)
+    assert [entry['iteration'] for entry in model.history] == list(range(1, len(model.history) + 1))
+
+def test_matrix_factorization_excludes_held_out_ratings(user_history, ratings_df):
+    model = MatrixFactorization(n_factors=8, n_iterations=5, validation_fraction=0.3).fit(user_history)
+
+    # The validation ratings are folded back in after early stopping
+    assert model.global_mean == pytest.approx(ratings_df['rating'].mean())
+    for user_id in user_history.user_ids[:60]:
+        rows, _ = model.recommend(user_id, user_history.n_items)
+        seen, _ = user_history.history(user_id)
+        assert not np.isin(rows, seen).any()
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from evaluation import _recommend, _seed_rows, evaluate, measure_build, ranking_metrics, temporal_split
+from movie_recommender import MovieRecommender
+
+def test_temporal_split_holds_out_latest_ratings(ratings_df):
+    train_df, test_df = temporal_split(ratings_df, test_fraction=0.2, min_ratings=5)
+    assert len(train_df) + len(test_df) == len(ratings_df)
+
+    counts = ratings_df.groupby('userId').size()
+    held_out = test_df.groupby('userId').size().reindex(counts.index, fill_value=0)
+    expected = np.where(counts >= 5, np.ceil(counts * 0.2), 0)
+    np.testing.assert_array_equal(held_out.to_numpy(), expected)
+
+    # Every held-out rating is at least as recent as the user's training ratings
+    latest_train = train_df.groupby('userId')['timestamp'].max()
+    earliest_test = test_df.groupby('userId')['timestamp'].min()
+    assert (earliest_test >= latest_train.reindex(earliest_test.index)).all()
+
+def test_ranking_metrics_match_hand_computed_values():
+    hits = np.array([[True, False, True], [False, False, False]])
+    metrics = ranking_metrics(hits, np.array([2, 4]), 3)
+
+    discounts = 1 / np.log2([2, 3, 4])
+    assert metrics['precision'] == pytest.approx((2 / 3 + 0) / 2)
+    assert metrics['recall'] == pytest.approx((2 / 2 + 0) / 2)
+    assert metrics['ndcg'] == pytest.approx((discounts[0] + discounts[2]) / discounts[:2].sum() / 2)
+    assert ranking_metrics(np.zeros((0, 3), dtype=bool), np.zeros(0, dtype=np.int64), 3)['ndcg'] == 0.0
+
+def test_evaluate_is_the_same_with_workers(movies_df, ratings_df):
+    methods = ['content_neighbors', 'user_profile', 'popularity']
+    single = evaluate(movies_df, ratings_df, methods, k=5, max_users=60, n_jobs=1)
+    forked = evaluate(movies_df, ratings_df, methods, k=5, max_users=60, n_jobs=2)
+
+    columns = ['precision', 'recall', 'ndcg', 'coverage', 'users']
+    pd.testing.assert_frame_equal(single[columns], forked[columns])
+    assert list(single.index) == methods and (single['users'] == 60).all()
+    assert single[columns[:4]].stack().between(0, 1).all()
+
+def test_measure_build_times_an_untraced_run():
+    calls = []
+    result, seconds, peak = measure_build(lambda: calls.append(np.ones(1 << 20)) or len(calls))
+    assert result == 2 and seconds >= 0 and peak >= 8
+
+    result, _, peak = measure_build(lambda: calls.append(None) or len(calls), memory=False)
+    assert result == 3 and np.isnan(peak)
+
+def test_seeds_come_from_catalog_movies(movies_df, ratings_df):
+    catalog = pd.Index(movies_df['movieId'].iloc[::2])
+    seeds = _seed_rows(ratings_df, catalog, 4.0)
+    in_catalog = ratings_df[ratings_df['movieId'].isin(catalog)]
+    assert set(seeds.index) == set(in_catalog['userId']) and (seeds >= 0).all()
+
+    # Users whose training ratings are all outside the catalog get no seeded recommendations
+    results = evaluate(movies_df.iloc[::2], ratings_df, ['content_neighbors', 'popularity'], k=5, n_jobs=1, measure_memory=False)
+    assert results['peak_mb'].isna().all()
+    assert results.loc['content_neighbors', 'users'] == results.loc['popularity', 'users']
+
+def test_recommend_requests_k_unseen_rows(movies_df, ratings_df):
+    recommender = MovieRecommender(movies_df, ratings_df, n_neighbors=20)
+    recommender.build_collaborative_index(n_neighbors=20)
+    cf = {'neighbor_index': recommender.item_cf.neighbor_index, 'similarity_row': recommender.item_cf.similarity_row}
+
+    for user_id in ratings_df['userId'].unique()[:15]:
+        seen, ratings = recommender.user_history.history(user_id)
+        seed = int(seen[np.argmax(ratings)])
+        # Same as over-fetching by the history length and dropping the seen rows
+        overfetched = {
+            'content_neighbors': recommender._top_similar(seed, 10 + len(seen), 5, 0.0)[0],
+            'collaborative': recommender._top_similar(seed, 10 + len(seen), 5, 0.0, **cf)[0],
+            'popularity': recommender._popularity_order[recommender._rating_count[recommender._popularity_order] >= 5]
+        }
+        for method, expected in overfetched.items():
+            indices = _recommend(method, recommender, user_id, seed, seen, 10, 5)
+            np.testing.assert_array_equal(indices, expected[~np.isin(expected, seen)][:10], err_msg=method)
+
+        indices = _recommend('hybrid', recommender, user_id, seed, seen, 10, 5)
+        assert len(indices) == 10 and not np.isin(indices, seen).any()
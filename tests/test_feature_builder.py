@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from feature_builder import HashingTfidfVectorizer
+
+@pytest.fixture(scope='module')
+def texts(movies_df):
+    return (movies_df['title'] + ' ' + movies_df['genres'].str.replace('|', ' ')).tolist()
+
+def test_weighting_matches_tfidf_vectorizer(texts):
+    hashed = HashingTfidfVectorizer(n_features=2 ** 23, n_jobs=1).fit_transform(texts)
+    vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))
+    exact = vectorizer.fit_transform(texts)
+
+    # With no hash collisions the columns are a permutation of the vocabulary
+    assert len(np.unique(hashed.indices)) == len(vectorizer.vocabulary_)
+    assert hashed.dtype == np.float32
+    np.testing.assert_allclose(np.sort(hashed.data), np.sort(exact.data), atol=1e-6)
+    np.testing.assert_allclose((hashed @ hashed.T).toarray(), (exact @ exact.T).toarray(), atol=1e-5)
+
+def test_parallel_chunks_match_inline(texts):
+    inline = HashingTfidfVectorizer(n_jobs=1).fit_transform(texts)
+    parallel = HashingTfidfVectorizer(n_jobs=2, chunk_size=64).fit_transform(texts)
+    assert (inline != parallel).nnz == 0
+
+def test_transform_uses_fitted_weights(texts):
+    vectorizer = HashingTfidfVectorizer(n_jobs=1)
+    fitted = vectorizer.fit_transform(texts[:300])
+    assert (vectorizer.transform(texts[:300]) != fitted).nnz == 0
+
+    with pytest.raises(ValueError):
+        HashingTfidfVectorizer().transform(texts)
@@ -0,0 +1,71 @@
+import filecmp
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from generate_synthetic_data import FIRST_TIMESTAMP, GENRE_WEIGHTS, LAST_TIMESTAMP, generate_dataset
+
+N_MOVIES, N_RATINGS = 3000, 90000
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    # Small chunks so the output is stitched together from many of them
+    return generate_dataset(
+        str(tmp_path_factory.mktemp('synthetic')), N_MOVIES, N_RATINGS, seed=7, n_jobs=1,
+        chunk_users=100, chunk_movies=700
+    )
+
+@pytest.fixture(scope='module')
+def frames(dataset):
+    return {name: pd.read_csv(path) for name, path in dataset['paths'].items()}
+
+def test_output_does_not_depend_on_workers(dataset, tmp_path):
+    forked = generate_dataset(str(tmp_path), N_MOVIES, N_RATINGS, seed=7, n_jobs=2, chunk_users=100, chunk_movies=700)
+    for name, path in dataset['paths'].items():
+        assert filecmp.cmp(path, forked['paths'][name], shallow=False), name
+
+    other = generate_dataset(str(tmp_path / 'other'), N_MOVIES, N_RATINGS, seed=8, n_jobs=1)
+    assert not filecmp.cmp(dataset['paths']['ratings'], other['paths']['ratings'], shallow=False)
+
+def test_files_are_valid_movielens(dataset, frames):
+    movies, ratings, tags = frames['movies'], frames['ratings'], frames['tags']
+    assert {name: len(frame) for name, frame in frames.items()} == {
+        name: count for name, count in dataset['counts'].items() if name != 'users'
+    }
+    assert movies['movieId'].tolist() == list(range(1, N_MOVIES + 1))
+    assert movies['title'].str.match(r'.+ \(\d{4}\)$').all()
+
+    assert abs(len(ratings) / N_RATINGS - 1) < 0.15
+    assert set(ratings['rating'].unique()) <= set(np.arange(1, 11) / 2)
+    assert ratings['movieId'].between(1, N_MOVIES).all()
+    assert ratings['timestamp'].between(FIRST_TIMESTAMP, LAST_TIMESTAMP).all()
+    # Unique per (user, movie) and sorted by userId then movieId
+    keys = ratings['userId'].to_numpy() * (N_MOVIES + 1) + ratings['movieId'].to_numpy()
+    assert (np.diff(keys) > 0).all()
+
+    rated = pd.MultiIndex.from_frame(ratings[['userId', 'movieId']])
+    assert pd.MultiIndex.from_frame(tags[['userId', 'movieId']]).isin(rated).all()
+
+def test_popularity_and_activity_are_skewed(frames):
+    ratings = frames['ratings']
+    # Zipf popularity: the top tenth of the movies gets a large share of the ratings
+    per_movie = np.sort(ratings.groupby('movieId').size().to_numpy())[::-1]
+    assert per_movie[:N_MOVIES // 10].sum() > 0.4 * len(ratings)
+
+    per_user = ratings.groupby('userId').size()
+    assert per_user.min() >= 20 and per_user.max() > 5 * per_user.median()
+
+def test_genres_follow_weights_and_affinities(frames):
+    genres = frames['movies']['genres'].str.get_dummies('|')
+    shares = genres.mean()
+    assert shares.idxmax() == 'Drama' and set(genres.columns) - {'(no genres listed)'} <= set(GENRE_WEIGHTS)
+
+    # Paired genres co-occur far more often than by chance
+    action = genres['Action'] == 1
+    assert genres.loc[action, 'Adventure'].mean() > 2 * shares['Adventure']
+
+def test_frequent_title_words_are_not_alphabetical(frames):
+    words = frames['movies']['title'].str.replace(r' \(\d{4}\)$', '', regex=True).str.split().explode()
+    # Before the shuffle the most frequent word was the alphabetically first one
+    assert words.value_counts().index[0] != words.min()
@@ -0,0 +1,123 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_analysis import MovieDataAnalyzer
+from data_cache import load_cached, read_column_cache, write_column_cache
+from movie_dataset import MovieDataset, read_csv
+from movie_recommender import MovieRecommender
+from streaming_stats import RatingAggregates, aggregate_ratings
+
+@pytest.fixture
+def local_paths(data_paths, tmp_path):
+    """Copies of the data files, so the caches written next to them stay per test."""
+    return tuple(shutil.copy(path, tmp_path) for path in data_paths)
+
+def test_statistics_match_groupby(movies_df, ratings_df):
+    dataset = MovieDataset(movies_df, ratings_df)
+    stats = ratings_df.groupby('movieId')['rating'].agg(['mean', 'count']).reindex(movies_df['movieId'])
+    np.testing.assert_allclose(dataset.avg_rating, stats['mean'].fillna(0).to_numpy())
+    np.testing.assert_array_equal(dataset.rating_count, stats['count'].fillna(0).to_numpy())
+    assert not dataset.avg_rating.flags.writeable
+
+def assert_same_statistics(dataset, expected):
+    np.testing.assert_array_equal(dataset.rating_count, expected.rating_count)
+    np.testing.assert_array_equal(dataset.rating_sum, expected.rating_sum)
+    np.testing.assert_array_equal(dataset.avg_rating, expected.avg_rating)
+
+def test_compact_load_matches_default(data_paths):
+    movies_df, ratings_df, report = MovieDataset.read_frames(*data_paths, compact=True)
+    assert ratings_df['rating'].dtype == np.float32
+    assert report['ratings_mb'] < MovieDataset.read_frames(*data_paths)[2]['ratings_mb']
+    assert_same_statistics(MovieDataset(movies_df, ratings_df), MovieDataset.from_csv(*data_paths))
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_cache_hit_matches_csv_load(local_paths, compact):
+    first_movies, first_ratings, first = MovieDataset.read_frames(*local_paths, compact=compact, cache=True)
+    movies_df, ratings_df, report = MovieDataset.read_frames(*local_paths, compact=compact, cache=True)
+
+    assert first['cache'] == {'movies': 'built', 'ratings': 'built'}
+    assert report['cache'] == {'movies': 'hit', 'ratings': 'hit'}
+    assert report['engine'] == 'cache'
+    pd.testing.assert_frame_equal(movies_df, first_movies)
+    pd.testing.assert_frame_equal(ratings_df, first_ratings)
+
+def test_cache_rebuilt_when_source_changes(local_paths):
+    movies_path, ratings_path = local_paths
+    read = lambda: read_csv(ratings_path)
+    assert load_cached(ratings_path, 'default', read)[1] == 'built'
+    assert load_cached(ratings_path, 'default', read)[1] == 'hit'
+
+    with open(ratings_path, 'a') as f:
+        f.write('1,1,0.5,0\n')
+    frame, status = load_cached(ratings_path, 'default', read)
+    assert status == 'built'
+    assert len(frame) == len(read_csv(ratings_path))
+
+def test_column_cache_round_trips_strings(tmp_path):
+    frame = pd.DataFrame({
+        'id': np.arange(4, dtype=np.int32),
+        'title': ['Toy Story', None, 'Amélie', ''],
+        'genres': pd.Categorical(['Comedy', 'Drama', 'Comedy', None])
+    })
+    path = str(tmp_path / 'cache')
+    write_column_cache(frame, path)
+    pd.testing.assert_frame_equal(read_column_cache(path, mmap=False), frame)
+
+def test_analyzer_and_recommender_share_one_dataset(data_paths, movies_df, ratings_df):
+    analyzer = MovieDataAnalyzer(*data_paths)
+    analyzer.load_data()
+    recommender = MovieRecommender.from_dataset(analyzer.dataset)
+
+    # The frames are shared, not copied or read again
+    assert recommender.movies_df is analyzer.movies_df and recommender.ratings_df is analyzer.ratings_df
+    assert np.shares_memory(recommender.movies_with_ratings['movieId'].to_numpy(), analyzer.movies_df['movieId'].to_numpy())
+    np.testing.assert_array_equal(analyzer.movies_with_ratings['rating_count'], recommender._rating_count)
+
+    built = MovieRecommender(movies_df, ratings_df)
+    for title in movies_df['title'].iloc[::60]:
+        assert recommender.get_recommendations(title, 5) == built.get_recommendations(title, 5)
+
+    # The recommender updates its own copy of the statistics
+    recommender.add_ratings(ratings_df.iloc[:50].assign(userId=-1))
+    np.testing.assert_array_equal(analyzer.dataset.rating_count, MovieDataset(movies_df, ratings_df).rating_count)
+    assert len(analyzer.ratings_df) == len(ratings_df)
+
+@pytest.mark.parametrize('n_jobs, block_bytes', [(1, 1 << 20), (1, 4099), (2, 12345)])
+def test_streaming_matches_in_memory(data_paths, movies_df, ratings_df, n_jobs, block_bytes):
+    aggregates = aggregate_ratings(data_paths[1], n_jobs=n_jobs, block_bytes=block_bytes)
+
+    assert aggregates.n_rows == len(ratings_df)
+    assert aggregates.n_users == ratings_df['userId'].nunique()
+    assert aggregates.mean == pytest.approx(ratings_df['rating'].mean())
+    assert aggregates.std == pytest.approx(ratings_df['rating'].std())
+    pd.testing.assert_series_equal(
+        aggregates.rating_distribution(), ratings_df['rating'].value_counts().sort_index(),
+        check_names=False, check_index_type=False
+    )
+    assert_same_statistics(MovieDataset.from_aggregates(movies_df, aggregates), MovieDataset(movies_df, ratings_df))
+
+def test_user_bitmap_matches_packbits():
+    rng = np.random.default_rng(0)
+    chunks = [rng.integers(0, 5000, 300) for _ in range(4)] + [np.array([-3, 7, 7, 2 ** 40])]
+    aggregates = RatingAggregates()
+    for user_ids in chunks:
+        aggregates.add(user_ids, np.ones(len(user_ids)), np.full(len(user_ids), 4.0))
+
+    user_ids = np.concatenate(chunks)
+    seen = np.zeros(user_ids[user_ids < 5000].max() + 1, dtype=bool)
+    seen[user_ids[(user_ids >= 0) & (user_ids < 5000)]] = True
+    np.testing.assert_array_equal(aggregates.user_bitmap, np.packbits(seen))
+    assert aggregates.n_users == len(np.unique(user_ids))
+
+def test_compact_load_reports_the_same_insights(data_paths):
+    analyzers = [MovieDataAnalyzer(*data_paths, compact=compact) for compact in (False, True)]
+    for analyzer in analyzers:
+        analyzer.load_data()
+    default, compact = (analyzer.get_basic_insights() for analyzer in analyzers)
+    assert (default['avg_rating'], default['rating_std']) == (compact['avg_rating'], compact['rating_std'])
+
+    default, compact = (MovieRecommender.from_dataset(analyzer.dataset) for analyzer in analyzers)
+    assert default.get_dataset_stats() == compact.get_dataset_stats()
@@ -0,0 +1,132 @@
+import numpy as np
+
+from movie_indexes import (
+    GenreIndex, RatingRangeIndex, SearchIndex, inverse_permutation, move_rows, popularity_order, reinsert_rows
+)
+
+def test_search_index_matches_scan(movies_df):
+    titles = movies_df['title'].str.lower().tolist()
+    index = SearchIndex(movies_df['title'], movies_df['genres'])
+
+    for query in ['an', 'ten', 'the (', titles[0][:6], 'zzzz']:
+        expected = [row for row, title in enumerate(titles) if query in title]
+        np.testing.assert_array_equal(index.find_title(query), expected)
+    np.testing.assert_array_equal(index.find_exact(titles[5].upper()), [
+        row for row, title in enumerate(titles) if title == titles[5]
+    ])
+
+    genres = movies_df['genres'].str.lower().tolist()
+    np.testing.assert_array_equal(np.sort(index.find_genres('sci')), [
+        row for row, genre in enumerate(genres) if 'sci' in genre
+    ])
+
+def test_search_index_round_trips_added_rows(movies_df, tmp_path):
+    titles, genres = movies_df['title'], movies_df['genres']
+    index = SearchIndex(titles.iloc[:-40], genres.iloc[:-40])
+    index.add(titles.iloc[-40:], genres.iloc[-40:])
+    index.save(str(tmp_path))
+    loaded = SearchIndex.load(str(tmp_path), titles, genres)
+    fresh = SearchIndex(titles, genres)
+
+    last = titles.iloc[-1]
+    for candidate in (index, loaded):
+        for query in ['an', 'the (', last[:8], 'zzzz']:
+            np.testing.assert_array_equal(candidate.find_title(query), fresh.find_title(query))
+        np.testing.assert_array_equal(candidate.find_exact(last), fresh.find_exact(last))
+        for query in ['sci', genres.iloc[-1]]:
+            np.testing.assert_array_equal(np.sort(candidate.find_genres(query)), np.sort(fresh.find_genres(query)))
+
+def random_stats(rng, n):
+    counts = rng.integers(0, 40, n).astype(np.float64)
+    averages = np.round(rng.uniform(0.5, 5.0, n) * 2) / 2
+    return averages, counts
+
+def test_reinsert_rows_matches_sort():
+    rng = np.random.default_rng(0)
+    averages, counts = random_stats(rng, 500)
+    order = popularity_order(counts, averages)
+
+    for _ in range(20):
+        rows = rng.choice(500, 30, replace=False)
+        counts[rows] += rng.integers(1, 10, 30)
+        averages[rows] = rng.uniform(0.5, 5.0, 30)
+        order = reinsert_rows(order, inverse_permutation(order), rows, (counts, averages))
+        np.testing.assert_array_equal(order, popularity_order(counts, averages))
+
+def test_move_rows_matches_filtered_order():
+    rng = np.random.default_rng(1)
+    averages, counts = random_stats(rng, 500)
+    order = popularity_order(counts, averages)
+    subset = np.sort(rng.choice(500, 200, replace=False))
+    members = order[np.isin(order, subset)]
+
+    rows = rng.choice(subset, 40, replace=False)
+    old_rank = inverse_permutation(order)
+    counts[rows] += 7
+    new_order = popularity_order(counts, averages)
+
+    moved = move_rows(members, rows, old_rank, inverse_permutation(new_order))
+    np.testing.assert_array_equal(moved, new_order[np.isin(new_order, subset)])
+
+def test_incremental_index_updates_match_rebuild():
+    rng = np.random.default_rng(2)
+    names = ['Action', 'Comedy', 'Drama', 'Horror', 'Sci-Fi']
+    genres = ['|'.join(rng.choice(names, rng.integers(1, 4), replace=False)) for _ in range(600)]
+    averages, counts = random_stats(rng, 600)
+    order = popularity_order(counts, averages)
+    genre_index = GenreIndex(genres, order)
+    rating_index = RatingRangeIndex(averages, counts)
+
+    for _ in range(10):
+        rows = np.unique(rng.choice(600, 25))
+        # Large jumps open new rating-count levels
+        counts[rows] += rng.integers(1, 200, len(rows))
+        averages[rows] = rng.uniform(0.5, 5.0, len(rows))
+
+        old_rank = inverse_permutation(order)
+        order = reinsert_rows(order, old_rank, rows, (counts, averages))
+        genre_index.update(rows, old_rank, inverse_permutation(order))
+        rating_index.update(rows)
+
+    expected_genres = GenreIndex(genres, order)
+    for rows, expected in zip(genre_index.by_genre, expected_genres.by_genre):
+        np.testing.assert_array_equal(rows, expected)
+
+    expected_ratings = RatingRangeIndex(averages, counts)
+    np.testing.assert_array_equal(rating_index.thresholds, expected_ratings.thresholds)
+    for level, expected in zip(rating_index.levels, expected_ratings.levels):
+        np.testing.assert_array_equal(level, expected)
+    for keys, expected in zip(rating_index.level_keys, expected_ratings.level_keys):
+        np.testing.assert_array_equal(keys, expected)
+
+def test_indexes_round_trip(tmp_path):
+    rng = np.random.default_rng(4)
+    genres = ['|'.join(rng.choice(['Action', 'Comedy', 'Drama'], rng.integers(1, 3), replace=False)) for _ in range(300)]
+    averages, counts = random_stats(rng, 300)
+    genre_index = GenreIndex(genres, popularity_order(counts, averages))
+    rating_index = RatingRangeIndex(averages, counts)
+    genre_index.save(str(tmp_path))
+    rating_index.save(str(tmp_path))
+
+    loaded_genres = GenreIndex.load(str(tmp_path), genres)
+    assert loaded_genres.names == genre_index.names and loaded_genres.masks.dtype == genre_index.masks.dtype
+    np.testing.assert_array_equal(loaded_genres.masks, genre_index.masks)
+    for rows, expected in zip(loaded_genres.by_genre, genre_index.by_genre):
+        np.testing.assert_array_equal(rows, expected)
+
+    loaded_ratings = RatingRangeIndex.load(str(tmp_path), averages, counts)
+    np.testing.assert_array_equal(loaded_ratings.rank, rating_index.rank)
+    np.testing.assert_array_equal(loaded_ratings.top_rows(3.0, 4.5, 5, 20), rating_index.top_rows(3.0, 4.5, 5, 20))
+    for keys, expected in zip(loaded_ratings.level_keys, rating_index.level_keys):
+        np.testing.assert_array_equal(keys, expected)
+
+def test_rating_range_top_rows_matches_scan():
+    rng = np.random.default_rng(3)
+    averages, counts = random_stats(rng, 800)
+    index = RatingRangeIndex(averages, counts)
+
+    for min_rating, max_rating, min_count in [(3.0, 4.5, 5), (0.5, 5.0, 0), (4.0, 4.0, 17)]:
+        rows = index.top_rows(min_rating, max_rating, min_count, 20)
+        matches = np.flatnonzero((averages >= min_rating) & (averages <= max_rating) & (counts >= min_count))
+        expected = matches[np.lexsort((matches, -counts[matches], -averages[matches]))][:20]
+        np.testing.assert_array_equal(rows, expected)
@@ -0,0 +1,391 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from movie_indexes import GenreIndex, RatingRangeIndex
+from movie_recommender import HYBRID_WEIGHTS, PRIOR_STRENGTH, MovieRecommender
+from similarity import build_neighbor_index
+
+@pytest.fixture(scope='module')
+def recommender(movies_df, ratings_df):
+    return MovieRecommender(movies_df, ratings_df)
+
+def sample_titles(recommender, n=25):
+    return recommender.movies_with_ratings['title_clean'].iloc[::max(1, len(recommender.movies_with_ratings) // n)].tolist()
+
+def read_manifest(path):
+    with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+def test_backends_return_the_same_results(movies_df, ratings_df, recommender):
+    dense = MovieRecommender(movies_df, ratings_df, similarity_backend='dense')
+    assert recommender.cosine_sim is None
+    for title in sample_titles(recommender):
+        # Tied movies come in row order on both backends
+        for min_rating_count in (0, 5):
+            expected = dense.get_recommendations(title, 10, min_rating_count=min_rating_count)
+            assert recommender.get_recommendations(title, 10, min_rating_count=min_rating_count) == expected
+
+@pytest.mark.parametrize('min_rating_count, min_avg_rating', [(0, 0.0), (5, 3.0), (40, 4.0)])
+def test_filtered_recommendations_match_scan(movies_df, ratings_df, min_rating_count, min_avg_rating):
+    # Few stored neighbors, so strict filters need the refill from the whole catalog
+    recommender = MovieRecommender(movies_df, ratings_df, n_neighbors=5)
+    matrix = recommender.tfidf_matrix
+    eligible = (recommender._rating_count >= min_rating_count) & (recommender._avg_rating >= min_avg_rating)
+
+    for title in sample_titles(recommender):
+        seed = recommender.find_movie_by_title(title).name
+        scores = (matrix[seed] @ matrix.T).toarray().ravel()
+        scores[~eligible] = 0
+        scores[seed] = 0
+        expected = np.sort(scores[scores > 0])[::-1][:10]
+
+        results = recommender.get_recommendations(title, 10, min_rating_count, min_avg_rating)
+        np.testing.assert_allclose([score for _, score, *_ in results], expected, atol=1e-6)
+        assert all(count >= min_rating_count and rating >= min_avg_rating for *_, rating, count in results)
+
+def test_batch_matches_single_title_queries(recommender):
+    titles = sample_titles(recommender) + ['No Such Movie']
+    # A budget of a few seeds per chunk forces many chunks
+    seeds, indices, scores = recommender.get_recommendations_batch(
+        titles, 10, min_rating_count=5, as_frame=False, memory_budget_mb=0.01
+    )
+    assert seeds[-1] == -1 and (indices[-1] == -1).all()
+
+    frame = recommender.get_recommendations_batch(titles, 10, min_rating_count=5)
+    for row, title in enumerate(titles):
+        expected = recommender.get_recommendations(title, 10, min_rating_count=5)
+        found = indices[row] >= 0
+        np.testing.assert_allclose(scores[row][found], [score for _, score, *_ in expected], atol=1e-6)
+        assert (frame['seed_title'] == title).sum() == len(expected)
+
+def test_resolve_titles_matches_single_lookups(movies_df, ratings_df):
+    # The added movie repeats a title, so exact lookups also rank added rows
+    extra = movies_df.iloc[[0]].assign(movieId=movies_df['movieId'].max() + 1)
+    recommender = MovieRecommender(movies_df.iloc[:-20], ratings_df)
+    recommender.add_movies(pd.concat([movies_df.iloc[-20:], extra]), refit_threshold=None)
+
+    clean = recommender.movies_with_ratings['title_clean']
+    titles = sample_titles(recommender) + [
+        f'  {clean.iloc[-2].upper()} ', clean.iloc[0], 'naked', 'star', 'No Such Movie', clean.iloc[-2]
+    ]
+    for title, row in zip(titles, recommender._resolve_titles(titles)):
+        movie = recommender.find_movie_by_title(title)
+        assert row == (-1 if movie is None else movie.name), title
+
+    # An equal title wins over more popular titles containing it
+    assert recommender.find_movie_by_title('naked')['title_clean'] == 'Naked'
+
+def assert_lookup_indexes_fresh(recommender):
+    """The incrementally maintained lookup structures equal freshly built ones."""
+    genre_index = GenreIndex(recommender._genres, recommender._popularity_order)
+    for rows, expected in zip(recommender.genre_index.by_genre, genre_index.by_genre):
+        np.testing.assert_array_equal(rows, expected)
+
+    rating_index = RatingRangeIndex(recommender._avg_rating, recommender._rating_count)
+    np.testing.assert_array_equal(recommender.rating_index.order, rating_index.order)
+    np.testing.assert_array_equal(recommender.rating_index.thresholds, rating_index.thresholds)
+    for level, expected in zip(recommender.rating_index.levels, rating_index.levels):
+        np.testing.assert_array_equal(level, expected)
+
+def test_add_ratings_matches_rebuild(movies_df, ratings_df):
+    ratings_df = ratings_df.sort_values('timestamp', kind='stable')
+    initial = ratings_df.iloc[:12000]
+    batches = [ratings_df.iloc[start:start + 400] for start in range(12000, len(ratings_df), 400)]
+
+    incremental = MovieRecommender(movies_df, initial)
+    for batch in batches:
+        incremental.add_ratings(batch)
+    rebuilt = MovieRecommender(movies_df, ratings_df)
+
+    np.testing.assert_array_equal(incremental._rating_count, rebuilt._rating_count)
+    np.testing.assert_allclose(incremental._avg_rating, rebuilt._avg_rating)
+    np.testing.assert_array_equal(incremental._popularity_order, rebuilt._popularity_order)
+    assert_lookup_indexes_fresh(incremental)
+    for rows, expected in zip(incremental.genre_index.by_genre, rebuilt.genre_index.by_genre):
+        np.testing.assert_array_equal(rows, expected)
+    for level, expected in zip(incremental.rating_index.levels, rebuilt.rating_index.levels):
+        np.testing.assert_array_equal(level, expected)
+
+    # The rating histories were extended batch by batch instead of dropped
+    assert incremental._user_history is not None
+    np.testing.assert_array_equal(incremental.user_history.items, rebuilt.user_history.items)
+    np.testing.assert_array_equal(incremental.user_history.item_users, rebuilt.user_history.item_users)
+
+    every_row = np.arange(len(movies_df))
+    np.testing.assert_allclose(
+        incremental._popularity_prior(every_row), rebuilt._popularity_prior(every_row), rtol=1e-6
+    )
+    assert incremental.get_movies_by_genre('Comedy', 20) == rebuilt.get_movies_by_genre('Comedy', 20)
+    assert incremental.get_movies_by_rating_range(3.0, 4.0) == rebuilt.get_movies_by_rating_range(3.0, 4.0)
+
+def test_add_movies_matches_rebuilt_indexes(movies_df, ratings_df):
+    recommender = MovieRecommender(movies_df.iloc[:-30], ratings_df)
+    recommender.add_movies(movies_df.iloc[-30:], refit_threshold=None)
+    rebuilt = MovieRecommender(movies_df, ratings_df)
+
+    assert len(recommender._titles) == len(movies_df)
+    expected = build_neighbor_index(recommender.tfidf_matrix, k=recommender.n_neighbors)
+    np.testing.assert_array_equal(recommender.neighbor_index.indptr, expected.indptr)
+    np.testing.assert_allclose(recommender.neighbor_index.scores, expected.scores, atol=1e-6)
+    assert_lookup_indexes_fresh(recommender)
+
+    # The ratings of the new movies were already loaded, so the lookups match a full build
+    np.testing.assert_array_equal(recommender._rating_count, rebuilt._rating_count)
+    assert recommender.get_movies_by_genre('Comedy', 20) == rebuilt.get_movies_by_genre('Comedy', 20)
+    assert recommender.get_movies_by_rating_range(3.0, 4.0) == rebuilt.get_movies_by_rating_range(3.0, 4.0)
+    title = movies_df['title'].iloc[-1]
+    assert recommender.search_movies(title[:12], 50)
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_load_round_trip(recommender, tmp_path, mmap):
+    path = str(tmp_path / 'model')
+    recommender.save(path)
+    loaded = MovieRecommender.load(path, mmap=mmap)
+
+    assert (loaded.tfidf_matrix != recommender.tfidf_matrix).nnz == 0
+    np.testing.assert_array_equal(loaded.neighbor_index.indices, recommender.neighbor_index.indices)
+    for title in sample_titles(recommender):
+        assert loaded.get_recommendations(title, 5) == recommender.get_recommendations(title, 5)
+    assert loaded.get_movies_by_genre('Drama', 10) == recommender.get_movies_by_genre('Drama', 10)
+    user_id = recommender.ratings_df['userId'].iloc[0]
+    assert loaded.get_user_recommendations(user_id, 5) == recommender.get_user_recommendations(user_id, 5)
+
+def test_save_keeps_mapped_model_readable(movies_df, ratings_df, tmp_path):
+    path = str(tmp_path / 'model')
+    recommender = MovieRecommender(movies_df, ratings_df)
+    recommender.save(path)
+    loaded = MovieRecommender.load(path, mmap=True)
+    title = sample_titles(recommender)[0]
+    expected = loaded.get_recommendations(title, 5)
+
+    # Saving again replaces the files the loaded model maps
+    recommender.add_ratings(ratings_df.iloc[:500])
+    recommender.save(path)
+    assert loaded.get_recommendations(title, 5) == expected
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['model']
+
+def test_load_maps_the_saved_lookup_indexes(movies_df, ratings_df, tmp_path):
+    recommender = MovieRecommender(movies_df.iloc[:-60], ratings_df)
+    recommender.add_movies(movies_df.iloc[-60:-30], refit_threshold=None)
+    path = str(tmp_path / 'model')
+    recommender.save(path)
+    loaded = MovieRecommender.load(path, mmap=True)
+
+    # Nothing is pickled, and the indexes are mapped instead of rebuilt
+    assert not [name for name in os.listdir(path) if name.endswith('.pkl')]
+    assert isinstance(loaded.search_index.postings.rows, np.memmap)
+    pd.testing.assert_frame_equal(loaded.movies_with_ratings, recommender.movies_with_ratings)
+    assert_lookup_indexes_fresh(loaded)
+    for query in ['star', 'The (', 'comedy']:
+        assert loaded.search_movies(query, 20) == recommender.search_movies(query, 20)
+
+    # The loaded indexes keep updating incrementally
+    loaded.add_movies(movies_df.iloc[-30:], refit_threshold=None)
+    loaded.add_ratings(ratings_df.iloc[:400].assign(userId=-1))
+    rebuilt = MovieRecommender(movies_df, pd.concat([ratings_df, ratings_df.iloc[:400].assign(userId=-1)]))
+    assert_lookup_indexes_fresh(loaded)
+    for query in ['star', movies_df['title'].iloc[-1][:10]]:
+        assert loaded.search_movies(query, 20) == rebuilt.search_movies(query, 20)
+
+def test_load_rejects_mismatched_arguments(recommender, data_paths, tmp_path):
+    path = str(tmp_path / 'model')
+    recommender.save(path)
+
+    MovieRecommender.load(path, similarity_backend='neighbors', n_neighbors=recommender.n_neighbors)
+    with pytest.raises(ValueError, match='similarity_backend'):
+        MovieRecommender.load(path, similarity_backend='dense')
+    with pytest.raises(ValueError, match='tfidf_params'):
+        MovieRecommender.load(path, tfidf_params={'max_features': 10})
+
+    # With the source files the model is rebuilt instead
+    rebuilt = MovieRecommender.load(path, *data_paths, similarity_backend='dense')
+    assert rebuilt.similarity_backend == 'dense'
+    assert MovieRecommender.load(path, *data_paths).similarity_backend == 'dense'
+
+def test_load_rebuilds_when_sources_change(data_paths, tmp_path):
+    movies_path, ratings_path = (shutil.copy(source, tmp_path) for source in data_paths)
+    path = str(tmp_path / 'model')
+    MovieRecommender.load(path, movies_path, ratings_path)
+    assert MovieRecommender._stale_reason(read_manifest(path), movies_path, ratings_path) is None
+
+    with open(ratings_path, 'a') as f:
+        f.write('1,1,0.5,0\n')
+    assert MovieRecommender._stale_reason(read_manifest(path), movies_path, ratings_path) == 'ratings data changed'
+    reasons = []
+    rebuilt = MovieRecommender.load(path, movies_path, ratings_path, on_rebuild=reasons.append)
+    assert reasons == ['ratings data changed']
+    assert len(rebuilt.ratings_df) == len(pd.read_csv(ratings_path))
+    assert MovieRecommender._stale_reason(read_manifest(path), movies_path, ratings_path) is None
+
+def popular_first(recommender, rows):
+    counts, averages = recommender._rating_count[rows], recommender._avg_rating[rows]
+    return rows[np.lexsort((rows, -averages, -counts))]
+
+def test_search_movies_matches_scan(recommender):
+    frame = recommender.movies_with_ratings
+    for query in ['star', 'comedy', 'The (']:
+        mask = (
+            frame['title_clean'].str.lower().str.contains(query.lower(), regex=False) |
+            frame['genres'].str.lower().str.contains(query.lower(), regex=False)
+        )
+        rows = popular_first(recommender, np.flatnonzero(mask))
+        expected = frame['title'].to_numpy()[rows[:15]].tolist()
+        assert [title for title, *_ in recommender.search_movies(query, 15)] == expected
+
+@pytest.mark.parametrize('genres, match', [
+    (['Drama'], 'any'), (['comedy', 'Romance'], 'any'), (['Comedy', 'Romance'], 'all'),
+    (['Action', 'sci'], 'all'), (['Western', 'Film-Noir', 'War'], 'any')
+])
+def test_genre_queries_match_scan(recommender, genres, match):
+    movie_genres = [set(value.lower().split('|')) for value in recommender.movies_with_ratings['genres']]
+
+    # A query that is not a genre name selects every genre containing it
+    def has(names, genre):
+        return any(genre.lower() in name for name in names)
+
+    combine = any if match == 'any' else all
+    rows = np.array([row for row, names in enumerate(movie_genres) if combine(has(names, genre) for genre in genres)])
+    expected = recommender._titles[popular_first(recommender, rows)[:20]].tolist()
+    assert [title for title, *_ in recommender.get_movies_by_genres(genres, 20, match=match)] == expected
+
+def test_columnar_results_convert_consistently(recommender):
+    title = sample_titles(recommender)[3]
+    results = recommender.get_recommendations(title, 8, columnar=True)
+    tuples = results.to_tuples()
+    assert tuples == recommender.get_recommendations(title, 8) and list(results) == tuples
+
+    frame = results.to_frame()
+    assert list(frame.columns) == ['title', 'similarity_score', 'genres', 'avg_rating', 'rating_count']
+    np.testing.assert_array_equal(frame.index, results.indices)
+    assert list(frame.itertuples(index=False, name=None)) == tuples
+
+    records = results.to_records()
+    assert records.dtype.names == tuple(frame.columns)
+    np.testing.assert_array_equal(records['similarity_score'], results.scores)
+    np.testing.assert_array_equal(records['rating_count'], results.rating_counts)
+
+    # Without scores the similarity column is left out
+    genre_results = recommender.get_movies_by_genre('Comedy', 5, columnar=True)
+    assert genre_results.to_tuples() == recommender.get_movies_by_genre('Comedy', 5)
+    assert 'similarity_score' not in genre_results.to_frame()
+    assert len(recommender.get_recommendations('No Such Movie', columnar=True)) == 0
+
+def expected_prior(ratings_df, movies_df):
+    """Bayesian average rating scaled to [0, 1] and weighted by the relative log count."""
+    stats = ratings_df.groupby('movieId')['rating'].agg(['sum', 'count']).reindex(movies_df['movieId']).fillna(0)
+    global_mean = ratings_df['rating'].mean()
+    bayesian = (stats['sum'] + PRIOR_STRENGTH * global_mean) / (stats['count'] + PRIOR_STRENGTH)
+    max_rating = (stats['sum'] / stats['count']).max()
+    return (bayesian / max_rating * np.log1p(stats['count']) / np.log1p(stats['count'].max())).to_numpy()
+
+def test_popularity_prior_matches_formula(recommender, movies_df, ratings_df):
+    prior = recommender._popularity_prior(np.arange(len(movies_df)))
+    np.testing.assert_allclose(prior, expected_prior(ratings_df, movies_df), rtol=1e-5)
+    assert prior.min() >= 0 and prior.max() <= 1
+
+def test_hybrid_scores_blend_the_signals(recommender, movies_df, ratings_df):
+    prior = expected_prior(ratings_df, movies_df)
+    eligible = recommender._rating_count >= 5
+    for title in sample_titles(recommender):
+        results = recommender.get_hybrid_recommendations(title, 10, min_rating_count=5, columnar=True)
+        seed = recommender.find_movie_by_title(title).name
+        content = dict(zip(*map(np.ndarray.tolist, recommender.neighbor_index.neighbors(seed))))
+        collaborative = dict(zip(*map(np.ndarray.tolist, recommender.item_cf.neighbor_index.neighbors(seed))))
+        if eligible[list(content)].sum() < 10:
+            continue
+
+        blend = {
+            row: HYBRID_WEIGHTS['content'] * content.get(row, 0) +
+                 HYBRID_WEIGHTS['collaborative'] * collaborative.get(row, 0) +
+                 HYBRID_WEIGHTS['popularity'] * prior[row]
+            for row in set(content) | set(collaborative) if row != seed and eligible[row]
+        }
+        np.testing.assert_allclose(results.scores, sorted(blend.values(), reverse=True)[:10], atol=1e-5)
+        np.testing.assert_allclose(results.scores, [blend[row] for row in results.indices], atol=1e-5)
+
+def test_content_only_weights_rank_like_get_recommendations(recommender):
+    weights = {'content': 1.0, 'collaborative': 0.0, 'popularity': 0.0}
+    for title in sample_titles(recommender):
+        expected = [score for _, score, *_ in recommender.get_recommendations(title, 10)]
+        results = recommender.get_hybrid_recommendations(title, 10, weights=weights)
+        np.testing.assert_allclose([score for _, score, *_ in results][:len(expected)], expected, atol=1e-6)
+
+def test_ann_backend_probing_every_list_matches_neighbors(movies_df, ratings_df, recommender):
+    ann = MovieRecommender(
+        movies_df, ratings_df, similarity_backend='ann', ann_params={'n_components': 16, 'n_lists': 12, 'n_probe': 12}
+    )
+    assert ann.neighbor_index is None
+    for title in sample_titles(recommender):
+        for min_rating_count in (0, 20):
+            expected = recommender.get_recommendations(title, 10, min_rating_count=min_rating_count)
+            results = ann.get_recommendations(title, 10, min_rating_count=min_rating_count)
+            np.testing.assert_allclose([score for _, score, *_ in results], [score for _, score, *_ in expected], atol=1e-6)
+            assert all(count >= min_rating_count for *_, count in results)
+    assert ann.evaluate_ann_recall(k=10, n_queries=50)['recall'] == pytest.approx(1.0)
+
+def expected_user_scores(recommender, user_id, min_rating_count):
+    """Cosine scores of a user's mean-centered taste vector, without seen or ineligible movies."""
+    history = recommender.ratings_df[recommender.ratings_df['userId'] == user_id]
+    rows = recommender._movie_rows.get_indexer(history['movieId'])
+    weights = history['rating'].to_numpy() - history['rating'].mean()
+    if not weights.any():
+        weights = history['rating'].to_numpy()
+    matrix = recommender.tfidf_matrix.toarray()
+    profile = weights @ matrix[rows]
+    scores = matrix @ (profile / np.linalg.norm(profile))
+    scores[rows] = 0
+    scores[recommender._rating_count < min_rating_count] = 0
+    return np.sort(scores[scores > 0])[::-1]
+
+def test_user_recommendations_match_brute_force_profile(recommender, ratings_df):
+    for user_id in ratings_df['userId'].unique()[::40]:
+        results = recommender.get_user_recommendations(user_id, 10, min_rating_count=5)
+        expected = expected_user_scores(recommender, user_id, 5)[:10]
+        np.testing.assert_allclose([score for _, score, *_ in results], expected, atol=1e-5)
+    assert recommender.get_user_recommendations(-1) == []
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_recommend_all_users_matches_per_user(recommender, tmp_path, n_jobs):
+    path = str(tmp_path / 'recommendations.csv')
+    # A budget of a few users per block forces many blocks
+    n_users = recommender.recommend_all_users(path, 5, n_jobs=n_jobs, memory_budget_mb=0.05)
+    written = pd.read_csv(path)
+    assert n_users == recommender.ratings_df['userId'].nunique()
+    assert written['userId'].is_monotonic_increasing
+
+    for user_id in written['userId'].unique()[::25]:
+        rows = written[written['userId'] == user_id]
+        expected = recommender.get_user_recommendations(user_id, 5)
+        assert rows['rank'].tolist() == list(range(1, len(expected) + 1))
+        assert rows['title'].tolist() == [title for title, *_ in expected]
+        np.testing.assert_allclose(rows['score'], [score for _, score, *_ in expected], atol=1e-5)
+
+def test_hashing_features_rank_like_the_full_vocabulary(movies_df, ratings_df, tmp_path):
+    hashing = MovieRecommender(
+        movies_df, ratings_df, feature_builder='hashing', tfidf_params={'n_features': 2 ** 23, 'n_jobs': 1}
+    )
+    exact = MovieRecommender(movies_df, ratings_df, tfidf_params={'max_features': None})
+    hashing.save(str(tmp_path / 'model'))
+    loaded = MovieRecommender.load(str(tmp_path / 'model'))
+
+    for title in sample_titles(exact):
+        expected = [score for _, score, *_ in exact.get_recommendations(title, 10)]
+        np.testing.assert_allclose([score for _, score, *_ in hashing.get_recommendations(title, 10)], expected, atol=1e-5)
+        assert loaded.get_recommendations(title, 10) == hashing.get_recommendations(title, 10)
+
+def test_latent_factor_recommendations_exclude_rated_movies(movies_df, ratings_df):
+    recommender = MovieRecommender(movies_df, ratings_df)
+    recommender.build_matrix_factorization(validation_fraction=0.3, n_iterations=5)
+
+    history = ratings_df.groupby('userId')['movieId'].agg(set)
+    for user_id in history.index[:60]:
+        results = recommender.get_latent_factor_recommendations(
+            user_id, len(movies_df), min_rating_count=0, columnar=True
+        )
+        recommended = set(movies_df['movieId'].to_numpy()[results.indices])
+        assert not recommended & history[user_id]
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from similarity import build_neighbor_index, extend_neighbor_index, similarity_matrix, top_k_rows
+
+@pytest.fixture(scope='module')
+def features(movies_df):
+    texts = movies_df['title'] + ' ' + movies_df['genres'].str.replace('|', ' ')
+    return TfidfVectorizer().fit_transform(texts)
+
+def dense_similarity(matrix):
+    return (matrix @ matrix.T).toarray()
+
+def neighbor_scores(index, row):
+    return index.scores[index.indptr[row]:index.indptr[row + 1]]
+
+def test_blocked_similarity_matches_dense(features):
+    # A budget of a few rows per block forces many blocks
+    blocked = similarity_matrix(features, memory_budget_mb=0.05, n_jobs=2)
+    assert blocked.dtype == np.float32
+    np.testing.assert_allclose(blocked, dense_similarity(features), atol=1e-6)
+
+def test_similarity_matrix_written_to_disk(features, tmp_path):
+    path = str(tmp_path / 'similarity.npy')
+    mapped = similarity_matrix(features, memory_budget_mb=0.05, path=path)
+    np.testing.assert_allclose(np.load(path), dense_similarity(features), atol=1e-6)
+    assert mapped.shape == (features.shape[0], features.shape[0])
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_neighbor_index_matches_dense_top_k(features, n_jobs):
+    k = 10
+    # A budget of a few rows per block forces many blocks
+    index = build_neighbor_index(features, k=k, memory_budget_mb=0.05, n_jobs=n_jobs)
+
+    dense = dense_similarity(features).astype(np.float32)
+    np.fill_diagonal(dense, -np.inf)
+    _, expected = top_k_rows(dense, k)
+    for row in range(features.shape[0]):
+        scores = neighbor_scores(index, row)
+        np.testing.assert_allclose(scores, expected[row][expected[row] > 0][:len(scores)], atol=1e-6)
+        assert len(scores) == min(k, (dense[row] > 0).sum())
+
+def test_extend_neighbor_index_matches_rebuild(features):
+    n_old = features.shape[0] - 25
+    extended = extend_neighbor_index(build_neighbor_index(features[:n_old], k=10), features, memory_budget_mb=0.05)
+    rebuilt = build_neighbor_index(features, k=10)
+
+    np.testing.assert_array_equal(extended.indptr, rebuilt.indptr)
+    for row in range(features.shape[0]):
+        np.testing.assert_allclose(neighbor_scores(extended, row), neighbor_scores(rebuilt, row), atol=1e-6)
+
+def test_top_k_rows_breaks_ties_by_lowest_column():
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        n_rows, n_cols = rng.integers(1, 10), rng.integers(2, 200)
+        k = int(rng.integers(1, n_cols + 1))
+        # Few distinct scores, so most rows have ties at the K-th score
+        block = rng.integers(0, 3, (n_rows, n_cols)).astype(np.float32)
+
+        indices, scores = top_k_rows(block, k)
+        expected = np.argsort(-block, axis=1, kind='stable')[:, :k]
+        np.testing.assert_array_equal(indices, expected)
+        np.testing.assert_array_equal(scores, np.take_along_axis(block, expected, axis=1))
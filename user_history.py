@@ -0,0 +1,272 @@
+import numpy as np
+import os
+import pandas as pd
+import scipy.sparse as sp
+from typing import Optional, Tuple
+
+def _upper_bound(values: np.ndarray, lo: np.ndarray, hi: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Vectorized binary search: first position in every sorted slice
+    ``values[lo:hi]`` holding a value greater than its target.
+    """
+    lo, hi = lo.copy(), hi.copy()
+    while True:
+        active = lo < hi
+        if not active.any():
+            return lo
+        mid = (lo + hi) // 2
+        greater = values[np.minimum(mid, len(values) - 1)] > targets
+        hi = np.where(active & greater, mid, hi)
+        lo = np.where(active & ~greater, mid + 1, lo)
+
+class UserHistoryIndex:
+    """
+    Rating histories indexed by user (CSR) and by movie (transposed CSR).
+
+    User ``u`` (the position of its id in the sorted ``user_ids``) rated the
+    catalog rows ``items[indptr[u]:indptr[u + 1]]`` (int32, ascending) with
+    ``ratings[indptr[u]:indptr[u + 1]]`` (float32). Movie row ``i`` was rated
+    by the user positions ``item_users[item_indptr[i]:item_indptr[i + 1]]``
+    with ``item_ratings`` in the same layout. Every lookup is a slice, so it
+    costs O(history length).
+    """
+
+    ARRAYS = (
+        'movie_ids', 'user_ids', 'indptr', 'items', 'ratings',
+        'item_indptr', 'item_users', 'item_ratings'
+    )
+
+    def __init__(
+        self,
+        movie_ids: np.ndarray,
+        user_ids: np.ndarray,
+        indptr: np.ndarray,
+        items: np.ndarray,
+        ratings: np.ndarray,
+        item_indptr: np.ndarray,
+        item_users: np.ndarray,
+        item_ratings: np.ndarray
+    ):
+        self.movie_ids = movie_ids
+        self.user_ids = user_ids
+        self.indptr = indptr
+        self.items = items
+        self.ratings = ratings
+        self.item_indptr = item_indptr
+        self.item_users = item_users
+        self.item_ratings = item_ratings
+
+    @classmethod
+    def from_ratings(cls, ratings_df: pd.DataFrame, movie_ids: np.ndarray) -> 'UserHistoryIndex':
+        """
+        Build the index from a ratings table.
+
+        Ratings of movies outside the catalog and missing ratings are skipped.
+
+        Args:
+            ratings_df (pd.DataFrame): Ratings with userId, movieId and rating columns
+            movie_ids (np.ndarray): movieId of every catalog row, in row order
+
+        Returns:
+            UserHistoryIndex: The built index
+        """
+        movie_ids = np.asarray(movie_ids)
+        item_rows = pd.Index(movie_ids).get_indexer(ratings_df['movieId'])
+        values = ratings_df['rating'].to_numpy(dtype=np.float64)
+        known = (item_rows >= 0) & ~np.isnan(values)
+        item_rows, values = item_rows[known], values[known]
+        codes, user_ids = pd.factorize(ratings_df['userId'].to_numpy()[known], sort=True)
+
+        # User side: sorted by (user, item)
+        order = np.lexsort((item_rows, codes))
+        indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(user_ids)), out=indptr[1:])
+        items = item_rows[order].astype(np.int32)
+        ratings = values[order].astype(np.float32)
+
+        # Item side: a stable sort by item keeps the users ascending
+        owners = np.repeat(np.arange(len(user_ids), dtype=np.int32), np.diff(indptr))
+        by_item = np.argsort(items, kind='stable')
+        item_indptr = np.zeros(len(movie_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(items, minlength=len(movie_ids)), out=item_indptr[1:])
+
+        return cls(
+            movie_ids, np.asarray(user_ids), indptr, items, ratings,
+            item_indptr, owners[by_item], ratings[by_item]
+        )
+
+    def with_ratings(self, ratings_df: pd.DataFrame) -> 'UserHistoryIndex':
+        """
+        Index with a batch of ratings appended, equal to rebuilding it from all
+        the ratings with from_ratings().
+
+        The batch is sorted on its own and its insertion points are found with
+        a binary search within the affected user and movie slices, so the
+        existing entries are copied once instead of sorted again. The arrays
+        of this index are not modified.
+
+        Args:
+            ratings_df (pd.DataFrame): New ratings with userId, movieId and rating columns
+
+        Returns:
+            UserHistoryIndex: The extended index
+        """
+        item_rows = pd.Index(self.movie_ids).get_indexer(ratings_df['movieId'])
+        values = ratings_df['rating'].to_numpy(dtype=np.float64)
+        known = (item_rows >= 0) & ~np.isnan(values)
+        if not known.any():
+            return self
+        item_rows, values = item_rows[known].astype(np.int32), values[known].astype(np.float32)
+        batch_users = ratings_df['userId'].to_numpy()[known]
+
+        # Users new to the index get positions among the existing ones
+        new_users = np.unique(batch_users)
+        new_users = new_users[self.user_positions(new_users) < 0]
+        user_ids = np.insert(self.user_ids, np.searchsorted(self.user_ids, new_users), new_users)
+        users = np.searchsorted(user_ids, batch_users).astype(np.int32)
+        # Position of every existing user in the extended index
+        moved = np.arange(self.n_users) + np.searchsorted(new_users, self.user_ids)
+
+        # User side: each entry goes after the user's entries for lower or equal items
+        order = np.lexsort((item_rows, users))
+        old_position = np.searchsorted(self.user_ids, batch_users[order])
+        known_user = self.user_positions(batch_users[order]) >= 0
+        lo = self.indptr[old_position]
+        hi = np.where(known_user, self.indptr[np.minimum(old_position + 1, self.n_users)], lo)
+        points = _upper_bound(self.items, lo, hi, item_rows[order])
+        items = np.insert(self.items, points, item_rows[order])
+        ratings = np.insert(self.ratings, points, values[order])
+        counts = np.zeros(len(user_ids), dtype=np.int64)
+        counts[moved] = np.diff(self.indptr)
+        counts += np.bincount(users, minlength=len(user_ids))
+        indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+
+        # Item side: each entry goes after the movie's entries of lower or equal users
+        item_users = moved[self.item_users].astype(np.int32) if len(new_users) else self.item_users
+        order = np.lexsort((users, item_rows))
+        points = _upper_bound(
+            item_users, self.item_indptr[item_rows[order]], self.item_indptr[item_rows[order] + 1], users[order]
+        )
+        item_indptr = self.item_indptr.copy()
+        item_indptr[1:] += np.cumsum(np.bincount(item_rows, minlength=self.n_items))
+
+        return type(self)(
+            self.movie_ids, user_ids, indptr, items, ratings, item_indptr,
+            np.insert(item_users, points, users[order]), np.insert(self.item_ratings, points, values[order])
+        )
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.movie_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def user_positions(self, user_ids) -> np.ndarray:
+        """
+        Map user ids to positions, -1 for users without ratings.
+
+        Args:
+            user_ids: One or more user ids
+
+        Returns:
+            np.ndarray: Position of every user id
+        """
+        user_ids = np.atleast_1d(np.asarray(user_ids))
+        if self.n_users == 0:
+            return np.full(len(user_ids), -1, dtype=np.int64)
+
+        positions = np.searchsorted(self.user_ids, user_ids)
+        clipped = np.minimum(positions, self.n_users - 1)
+        found = (positions < self.n_users) & (self.user_ids[clipped] == user_ids)
+        return np.where(found, positions, -1)
+
+    def history(self, user_id) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the movies a user rated and the ratings given.
+
+        Args:
+            user_id: Id of the user
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (catalog rows, ratings), empty for unknown users
+        """
+        position = self.user_positions(user_id)[0]
+        if position < 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+
+        start, end = self.indptr[position], self.indptr[position + 1]
+        return self.items[start:end], self.ratings[start:end]
+
+    def raters(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the users who rated a movie and their ratings.
+
+        Args:
+            row (int): Catalog row of the movie
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (user positions, ratings)
+        """
+        start, end = self.item_indptr[row], self.item_indptr[row + 1]
+        return self.item_users[start:end], self.item_ratings[start:end]
+
+    def owners(self) -> np.ndarray:
+        """
+        User position of every entry of the user side, in storage order.
+        """
+        return np.repeat(np.arange(self.n_users, dtype=np.int32), np.diff(self.indptr))
+
+    def user_matrix(self, values: Optional[np.ndarray] = None) -> sp.csr_matrix:
+        """
+        User x movie CSR matrix sharing the index arrays.
+
+        Args:
+            values (np.ndarray): Values per entry in storage order, defaults to the ratings
+
+        Returns:
+            sp.csr_matrix: (n_users x n_items) matrix
+        """
+        data = self.ratings if values is None else values
+        return sp.csr_matrix((data, self.items, self.indptr), shape=(self.n_users, self.n_items), copy=False)
+
+    def save(self, path: str, prefix: str = 'history_'):
+        """
+        Write the index arrays as .npy files into a directory.
+
+        Args:
+            path (str): Directory to write to
+            prefix (str): File name prefix of the arrays
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(path, f'{prefix}{name}.npy'), np.ascontiguousarray(getattr(self, name)), allow_pickle=False)
+
+    @classmethod
+    def exists(cls, path: str, prefix: str = 'history_') -> bool:
+        return all(os.path.exists(os.path.join(path, f'{prefix}{name}.npy')) for name in cls.ARRAYS)
+
+    @classmethod
+    def load(cls, path: str, prefix: str = 'history_', mmap: bool = True) -> 'UserHistoryIndex':
+        """
+        Load an index written by save().
+
+        Args:
+            path (str): Directory the index was saved to
+            prefix (str): File name prefix of the arrays
+            mmap (bool): Memory-map the arrays instead of reading them
+
+        Returns:
+            UserHistoryIndex: The loaded index
+        """
+        mmap_mode = 'r' if mmap else None
+        return cls(*[
+            np.load(os.path.join(path, f'{prefix}{name}.npy'), mmap_mode=mmap_mode)
+            for name in cls.ARRAYS
+        ])